@@ -0,0 +1,52 @@
+# gui/command_runner.py
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+class CommandRunner(QObject):
+    # Worker threads append output lines; the GUI thread picks them up in batches
+    output_ready = pyqtSignal(list)
+    finished = pyqtSignal(list)
+
+    def __init__(self, parent=None, batch_ms=100, **fanout_options):
+        super().__init__(parent)
+        # The fan-out engine pulls in paramiko, so it is created on first use
+        self.fanout_options = fanout_options
+        self.fanout = None
+        self._pending = []
+        self._results = None
+
+        self.batch_timer = QTimer(self)
+        self.batch_timer.setInterval(batch_ms)
+        self.batch_timer.timeout.connect(self.flush_output)
+
+    def is_running(self):
+        return bool(self.fanout and self.fanout.is_running()) or self.batch_timer.isActive()
+
+    def run(self, connections, command):
+        if self.fanout is None:
+            from connections.command_fanout import CommandFanout
+            self.fanout = CommandFanout(**self.fanout_options)
+        self._results = None
+        self.fanout.start(connections, command, self._queue_line, self._set_results)
+        self.batch_timer.start()
+
+    def cancel(self):
+        if self.fanout:
+            self.fanout.cancel()
+
+    def _queue_line(self, name, line):
+        self._pending.append(f"[{name}] {line}")
+
+    def _set_results(self, results):
+        self._results = results
+
+    def flush_output(self):
+        results = self._results
+        count = len(self._pending)
+        if count:
+            batch = self._pending[:count]
+            del self._pending[:count]
+            self.output_ready.emit(batch)
+        if results is not None and not self._pending:
+            self.batch_timer.stop()
+            self.finished.emit(results)
@@ -1,9 +1,13 @@
+import os
+
 from PyQt5.QtWidgets import (
     QDialog, QFormLayout, QLineEdit, QComboBox, QVBoxLayout, QPushButton,
-    QHBoxLayout, QTextEdit, QCheckBox
+    QHBoxLayout, QTextEdit, QCheckBox, QFileDialog
 )
 from PyQt5.QtCore import Qt
 
+DEFAULT_PORTS = {'SSH': 22, 'RDP': 3389, 'WinRM': 5985}
+
 class ConnectionConfigDialog(QDialog):
     def __init__(self, parent=None, connection_data=None):
         super().__init__(parent)
@@ -20,18 +24,34 @@ class ConnectionConfigDialog(QDialog):
         self.username_input = QLineEdit(self)
         self.password_input = QLineEdit(self)
         self.password_input.setEchoMode(QLineEdit.Password)
+        self.key_file_input = QLineEdit(self)
+        self.key_file_input.setPlaceholderText("Private key for SSH (optional)")
+        self.key_file_button = QPushButton("Browse...")
+        self.key_file_button.clicked.connect(self.browse_key_file)
+        key_file_layout = QHBoxLayout()
+        key_file_layout.addWidget(self.key_file_input)
+        key_file_layout.addWidget(self.key_file_button)
+        self.use_agent_checkbox = QCheckBox("Use keys from ssh-agent")
+        self.proxy_jump_input = QLineEdit(self)
+        self.proxy_jump_input.setPlaceholderText("bastion, user@jump2:2222 (saved connection names or [user@]host[:port])")
         self.connection_type_combo = QComboBox(self)
-        self.connection_type_combo.addItems(["SSH", "RDP"])
+        self.connection_type_combo.addItems(["SSH", "RDP", "WinRM"])
         self.ssh_options_input = QTextEdit(self)
-        self.open_browser_checkbox = QCheckBox("Open browser after connection")
+        self.port_forwards_input = QTextEdit(self)
+        self.port_forwards_input.setPlaceholderText("One per line: L 8080:localhost:80 or R 9000:localhost:3000")
+        self.open_browser_checkbox = QCheckBox("Open browser on the first local forward after connection")
 
         self.form_layout.addRow("Name", self.name_input)
         self.form_layout.addRow("Host", self.host_input)
         self.form_layout.addRow("Port", self.port_input)
         self.form_layout.addRow("Username", self.username_input)
         self.form_layout.addRow("Password", self.password_input)
+        self.form_layout.addRow("Key File", key_file_layout)
+        self.form_layout.addRow("", self.use_agent_checkbox)
+        self.form_layout.addRow("Jump Hosts", self.proxy_jump_input)
         self.form_layout.addRow("Connection Type", self.connection_type_combo)
         self.form_layout.addRow("SSH Options", self.ssh_options_input)
+        self.form_layout.addRow("Port Forwards", self.port_forwards_input)
         self.form_layout.addRow("", self.open_browser_checkbox)
 
         self.layout.addLayout(self.form_layout)
@@ -57,18 +77,33 @@ class ConnectionConfigDialog(QDialog):
         self.port_input.setText(str(self.connection_data.get('port', '')))
         self.username_input.setText(self.connection_data.get('username', ''))
         self.password_input.setText(self.connection_data.get('password', ''))
-        self.connection_type_combo.setCurrentText(self.connection_data.get('type', 'SSH'))
+        self.key_file_input.setText(self.connection_data.get('key_file', ''))
+        self.use_agent_checkbox.setChecked(self.connection_data.get('use_agent', False))
+        self.proxy_jump_input.setText(self.connection_data.get('proxy_jump', ''))
+        self.connection_type_combo.setCurrentText(self.connection_data.get('connection_type', 'SSH'))
         self.ssh_options_input.setPlainText('\n'.join(self.connection_data.get('ssh_options', [])))
+        self.port_forwards_input.setPlainText('\n'.join(self.connection_data.get('port_forwards', [])))
         self.open_browser_checkbox.setChecked(self.connection_data.get('open_browser', False))
 
     def get_connection_data(self):
         return {
             "name": self.name_input.text(),
             "host": self.host_input.text(),
-            "port": int(self.port_input.text()) if self.port_input.text().isdigit() else 22,
+            "port": int(self.port_input.text()) if self.port_input.text().isdigit() else DEFAULT_PORTS.get(
+                self.connection_type_combo.currentText(), 22),
             "username": self.username_input.text(),
             "password": self.password_input.text(),
-            "type": self.connection_type_combo.currentText(),
+            "key_file": self.key_file_input.text().strip(),
+            "use_agent": self.use_agent_checkbox.isChecked(),
+            "proxy_jump": self.proxy_jump_input.text().strip(),
+            "type": "connection",
+            "connection_type": self.connection_type_combo.currentText(),
             "ssh_options": self.ssh_options_input.toPlainText().split('\n'),
+            "port_forwards": [line.strip() for line in self.port_forwards_input.toPlainText().split('\n') if line.strip()],
             "open_browser": self.open_browser_checkbox.isChecked()
         }
+
+    def browse_key_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Select Private Key", os.path.expanduser('~/.ssh'))
+        if path:
+            self.key_file_input.setText(path)
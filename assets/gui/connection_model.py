@@ -0,0 +1,286 @@
+# gui/connection_model.py
+
+from PyQt5.QtCore import QAbstractItemModel, QModelIndex, Qt
+
+class ConnectionTreeModel(QAbstractItemModel):
+    # Reads straight from ConnectionManager; rows are exposed in batches as the
+    # view asks for them and tooltips are built only when requested.
+    def __init__(self, connection_manager, tooltip_provider=None, batch_size=500, parent=None):
+        super().__init__(parent)
+        self.connection_manager = connection_manager
+        self.tooltip_provider = tooltip_provider
+        self.batch_size = batch_size
+        self._loaded = {}
+        self._rows = {}
+        self._handles = {}
+        self._item_ids = []
+        self._filter = None
+
+    def item_id(self, index):
+        if not index.isValid():
+            return None
+        return self._item_ids[index.internalId()]
+
+    def item(self, index):
+        item_id = self.item_id(index)
+        return self.connection_manager.get_item(item_id) if item_id else None
+
+    def index_for_id(self, item_id):
+        if item_id is None or item_id not in self._rows:
+            return QModelIndex()
+        return self.createIndex(self._rows[item_id], 0, self._handle(item_id))
+
+    def index(self, row, column, parent=QModelIndex()):
+        if column != 0 or row < 0 or row >= self.rowCount(parent):
+            return QModelIndex()
+        item = self._children(self.item_id(parent))[row]
+        self._rows[item['id']] = row
+        return self.createIndex(row, column, self._handle(item['id']))
+
+    def parent(self, index):
+        if not index.isValid() or self._filter is not None:
+            return QModelIndex()
+        parent_id = self.connection_manager.get_parent_id(self.item_id(index))
+        return self.index_for_id(parent_id)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return self._loaded.get(self.item_id(parent), 0)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return bool(self._children(None))
+        if self._filter is not None:
+            return False
+        item = self.item(parent)
+        return item['type'] == 'folder' and bool(item.get('children'))
+
+    def canFetchMore(self, parent):
+        parent_id = self.item_id(parent)
+        if parent_id is not None and self.connection_manager.get_item(parent_id)['type'] != 'folder':
+            return False
+        total = len(self._children(parent_id))
+        return self._loaded.get(parent_id, 0) < total
+
+    def fetchMore(self, parent):
+        parent_id = self.item_id(parent)
+        children = self._children(parent_id)
+        loaded = self._loaded.get(parent_id, 0)
+        count = min(self.batch_size, len(children) - loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(parent, loaded, loaded + count - 1)
+        for row in range(loaded, loaded + count):
+            self._rows[children[row]['id']] = row
+        self._loaded[parent_id] = loaded + count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.item(index)
+        if role == Qt.DisplayRole:
+            return item['name']
+        if role == Qt.ToolTipRole and item['type'] == 'connection' and self.tooltip_provider:
+            return self.tooltip_provider(item)
+        if role == Qt.UserRole:
+            return item['id']
+        return None
+
+    def item_added(self, item_id):
+        # Call after ConnectionManager has added (or moved) the item
+        if self._filter is not None or item_id in self._rows:
+            # Already shown, e.g. fetched by a slot while its old row was removed
+            return
+        parent_id = self.connection_manager.get_parent_id(item_id)
+        parent_index = self.index_for_id(parent_id)
+        children = self.connection_manager.get_children(parent_id)
+        loaded = self._loaded.get(parent_id, 0)
+        total = len(children)
+        if parent_id is not None and parent_id not in self._rows:
+            return
+        if children[-1]['id'] == item_id:
+            row = total - 1
+        else:
+            row = next(row for row, child in enumerate(children) if child['id'] == item_id)
+        if row < loaded or loaded == total - 1:
+            # It lands among (or right after) the visible rows, so show it straight away
+            self.beginInsertRows(parent_index, row, row)
+            self._inserted(parent_id, item_id, row)
+            self.endInsertRows()
+        elif loaded == 0 and parent_id is not None:
+            # Lets the view draw an expand arrow on a folder that was empty
+            self.dataChanged.emit(parent_index, parent_index)
+
+    def item_changed(self, item_id):
+        index = self.index_for_id(item_id)
+        if index.isValid():
+            self.dataChanged.emit(index, index)
+
+    def item_about_to_be_removed(self, item_id):
+        # Call before ConnectionManager removes the item
+        index = self.index_for_id(item_id)
+        if not index.isValid():
+            return False
+        self.beginRemoveRows(index.parent(), index.row(), index.row())
+        if self._filter is not None:
+            del self._filter[index.row()]
+        return True
+
+    def item_removed(self, item_id, parent_id, removed):
+        if removed:
+            if self._filter is not None:
+                parent_id = None
+            self._rows.pop(item_id, None)
+            self._loaded[parent_id] -= 1
+            self._renumber(parent_id)
+            self.endRemoveRows()
+
+    def record_about_to_apply(self, record):
+        # With record_applied, keeps the view in step with a ConnectionManager record
+        # applied outside the usual edit paths, e.g. a change synced from disk. Rows
+        # are announced before the manager changes and the model catches up before the
+        # announcement ends, so slots connected to it see the two agree. A move among
+        # shown rows is a move; one out of them a remove, one into them an insert.
+        op = record['op']
+        item_id = record['item']['id'] if op == 'add' else record['id']
+        if self._filter is None and (op == 'move' or op == 'add' and self.connection_manager.get_item(item_id) is None):
+            source_index = self.index_for_id(item_id) if op == 'move' else QModelIndex()
+            parent_id = record['parent']
+            row = self._landing_row(parent_id, record.get('index'), source_index)
+            if row is not None:
+                parent_index = self.index_for_id(parent_id)
+                if not source_index.isValid():
+                    self.beginInsertRows(parent_index, row, row)
+                    return 'insert', parent_id, row
+                source_id = self.connection_manager.get_parent_id(item_id)
+                if source_id == parent_id and row == source_index.row():
+                    # Stays where it is; item_added finds it shown
+                    return None
+                # Qt counts the destination among the rows before the move
+                destination = row + 1 if source_id == parent_id and row > source_index.row() else row
+                if self.beginMoveRows(source_index.parent(), source_index.row(), source_index.row(),
+                                      parent_index, destination):
+                    return 'move', source_id, row
+        if op in ('move', 'remove'):
+            return 'remove', self.connection_manager.get_parent_id(item_id), self.item_about_to_be_removed(item_id)
+        return None
+
+    def record_applied(self, record, context):
+        kind = context[0] if context else None
+        if kind == 'insert':
+            _, parent_id, row = context
+            self._inserted(parent_id, record['item']['id'] if record['op'] == 'add' else record['id'], row)
+            self.endInsertRows()
+        elif kind == 'move':
+            _, source_id, row = context
+            parent_id = record['parent']
+            if source_id != parent_id:
+                self._loaded[source_id] -= 1
+                self._loaded[parent_id] = self._loaded.get(parent_id, 0) + 1
+                self._renumber(source_id)
+            self._renumber(parent_id)
+            self.endMoveRows()
+        elif kind == 'remove':
+            _, parent_id, removed = context
+            self.item_removed(record['id'], parent_id, removed)
+            if record['op'] == 'move':
+                self.item_added(record['id'])
+        elif record['op'] == 'add':
+            self.item_added(record['item']['id'])
+        elif record['op'] == 'move':
+            self.item_added(record['id'])
+        elif record['op'] == 'update':
+            self.item_changed(record['id'])
+
+    def reveal(self, item_id):
+        # Fetches rows down to item_id so it has an index, e.g. to expand it again after a reload
+        if self._filter is not None or self.connection_manager.get_item(item_id) is None:
+            return QModelIndex()
+        path = []
+        while item_id is not None:
+            path.append(item_id)
+            item_id = self.connection_manager.get_parent_id(item_id)
+        parent_id = None
+        for item_id in reversed(path):
+            if item_id not in self._rows:
+                row = next(row for row, child in enumerate(self._children(parent_id)) if child['id'] == item_id)
+                while self._loaded.get(parent_id, 0) <= row:
+                    self.fetchMore(self.index_for_id(parent_id))
+            parent_id = item_id
+        return self.index_for_id(parent_id)
+
+    def loaded_parent_ids(self):
+        # Folders whose rows have been fetched, parents before their children
+        return [item_id for item_id in self._loaded if item_id is not None]
+
+    def set_filter(self, item_ids):
+        # A list of ids shows just those items as a flat list; None restores the tree
+        self.beginResetModel()
+        if item_ids is None:
+            self._filter = None
+        else:
+            self._filter = [self.connection_manager.get_item(item_id) for item_id in item_ids]
+        self._clear()
+        self.endResetModel()
+
+    def is_filtered(self):
+        return self._filter is not None
+
+    def reload(self):
+        self.beginResetModel()
+        self._clear()
+        self.endResetModel()
+
+    def _clear(self):
+        self._loaded = {}
+        self._rows = {}
+        self._handles = {}
+        self._item_ids = []
+
+    def _children(self, parent_id):
+        if self._filter is not None:
+            return self._filter if parent_id is None else []
+        return self.connection_manager.get_children(parent_id)
+
+    def _landing_row(self, parent_id, index, source_index):
+        # The row an item added or moved under parent_id (at index, or last) will have,
+        # if it is one to show straight away as item_added would; otherwise None
+        if parent_id is not None and parent_id not in self._rows:
+            return None
+        total = len(self.connection_manager.get_children(parent_id)) + 1
+        loaded = self._loaded.get(parent_id, 0)
+        if source_index.isValid() and self.connection_manager.get_parent_id(self.item_id(source_index)) == parent_id:
+            # Leaves its old row in the same parent first
+            total -= 1
+            loaded -= 1
+        # Like list.insert, an index past the end appends
+        row = total - 1 if index is None else min(index, total - 1)
+        if row < loaded or loaded == total - 1:
+            return row
+        return None
+
+    def _inserted(self, parent_id, item_id, row):
+        loaded = self._loaded.get(parent_id, 0)
+        self._loaded[parent_id] = loaded + 1
+        if row == loaded:
+            self._rows[item_id] = row
+        else:
+            self._renumber(parent_id)
+
+    def _renumber(self, parent_id):
+        children = self._children(parent_id)
+        for row in range(self._loaded.get(parent_id, 0)):
+            self._rows[children[row]['id']] = row
+
+    def _handle(self, item_id):
+        handle = self._handles.get(item_id)
+        if handle is None:
+            handle = len(self._item_ids)
+            self._handles[item_id] = handle
+            self._item_ids.append(item_id)
+        return handle
@@ -0,0 +1,68 @@
+# gui/connection_stats.py
+
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QPushButton, QFileDialog,
+    QMessageBox, QHeaderView
+)
+from PyQt5.QtCore import QTimer
+
+COLUMNS = ['Host', 'Protocol', 'Phase', 'Samples', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)', 'Failures', 'Last Error']
+
+def format_ms(seconds):
+    return '' if seconds is None else f"{seconds * 1000:.1f}"
+
+class ConnectionStatsDialog(QDialog):
+    def __init__(self, metrics, parent=None, refresh_ms=2000):
+        super().__init__(parent)
+        self.setWindowTitle("Connection Stats")
+        self.setMinimumSize(900, 500)
+        self.metrics = metrics
+
+        self.layout = QVBoxLayout(self)
+        self.table = QTableWidget(0, len(COLUMNS), self)
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.layout.addWidget(self.table)
+
+        self.button_box = QHBoxLayout()
+        self.prometheus_button = QPushButton("Export Prometheus...")
+        self.prometheus_button.clicked.connect(lambda: self.export('prometheus'))
+        self.json_button = QPushButton("Export JSON...")
+        self.json_button.clicked.connect(lambda: self.export('json'))
+        self.close_button = QPushButton("Close")
+        self.close_button.clicked.connect(self.accept)
+        self.button_box.addWidget(self.prometheus_button)
+        self.button_box.addWidget(self.json_button)
+        self.button_box.addStretch()
+        self.button_box.addWidget(self.close_button)
+        self.layout.addLayout(self.button_box)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(refresh_ms)
+        self.refresh()
+
+    def refresh(self):
+        rows = self.metrics.summary()
+        self.table.setRowCount(len(rows))
+        for row_number, row in enumerate(rows):
+            values = [
+                row['host'], row['protocol'], row['phase'], str(row['samples']),
+                format_ms(row['p50']), format_ms(row['p95']), format_ms(row['p99']),
+                str(row['failures']), row['last_error'],
+            ]
+            for column, value in enumerate(values):
+                self.table.setItem(row_number, column, QTableWidgetItem(value))
+
+    def export(self, fmt):
+        default_name = 'remoconnect.prom' if fmt == 'prometheus' else 'connection_stats.json'
+        path, _ = QFileDialog.getSaveFileName(self, "Export Connection Stats", default_name)
+        if not path:
+            return
+        try:
+            self.metrics.export(path, fmt)
+        except OSError as e:
+            QMessageBox.warning(self, "Export Failed", f"Could not write {path}: {e}")
@@ -0,0 +1,39 @@
+# gui/file_watcher.py
+
+import os
+
+from PyQt5.QtCore import QFileSystemWatcher, QObject, QTimer, pyqtSignal
+
+class FileWatcher(QObject):
+    # Emits changed once a burst of modifications to the files settles. Sync tools
+    # usually write a temp file and rename it over the original, which drops the
+    # file from the watch list, so the directories are watched as well.
+    changed = pyqtSignal()
+
+    def __init__(self, paths, debounce_ms=300, parent=None):
+        super().__init__(parent)
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.schedule)
+        self.watcher.directoryChanged.connect(self.schedule)
+
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(debounce_ms)
+        self.debounce_timer.timeout.connect(self._settled)
+        self._watch()
+
+    def schedule(self, path=None):
+        self.debounce_timer.start()
+
+    def _settled(self):
+        self._watch()
+        self.changed.emit()
+
+    def _watch(self):
+        watched = set(self.watcher.files()) | set(self.watcher.directories())
+        wanted = [path for path in self.paths if os.path.exists(path)]
+        wanted += sorted({os.path.dirname(path) for path in self.paths})
+        missing = [path for path in wanted if path not in watched]
+        if missing:
+            self.watcher.addPaths(missing)
@@ -0,0 +1,20 @@
+# gui/health_monitor.py
+
+from PyQt5.QtCore import QObject, QTimer
+from connections.health_probe import HealthProbe
+
+class HealthMonitor(QObject):
+    # Sweeps run on the probe's own thread; results are only read when a tooltip
+    # asks for them, so nothing is handed back to the GUI as they arrive
+    def __init__(self, parent=None, interval_ms=60000, **probe_options):
+        super().__init__(parent)
+        self.probe = HealthProbe(**probe_options)
+
+        self.sweep_timer = QTimer(self)
+        self.sweep_timer.setInterval(interval_ms)
+
+    def start_sweep(self, targets, force=False):
+        return self.probe.start_sweep(targets, force=force)
+
+    def get_result(self, host, port):
+        return self.probe.get_result(host, port)
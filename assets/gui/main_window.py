@@ -1,24 +1,40 @@
 # gui/main_window.py
 
 from PyQt5.QtWidgets import (
-    QMainWindow, QSplitter, QTreeWidget, QTreeWidgetItem, QVBoxLayout, QWidget,
-    QPlainTextEdit, QMenu, QAction, QColorDialog, QMessageBox, QInputDialog
+    QMainWindow, QSplitter, QTreeView, QVBoxLayout, QWidget, QPlainTextEdit, QMenu, QAction,
+    QColorDialog, QMessageBox, QInputDialog, QLineEdit, QTabWidget, QFileDialog, QLabel
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont
 from gui.connection_config import ConnectionConfigDialog
 from gui.customizations import Customizations
-from connections.ssh_connection import SSHConnectionManager
-from connections.rdp_connection import RDPConnectionManager
+from gui.health_monitor import HealthMonitor
+from gui.command_runner import CommandRunner
+from gui.connection_model import ConnectionTreeModel
+from gui.file_watcher import FileWatcher
+from gui.terminal_widget import TerminalWidget
+from gui.transfer_dialog import TransferDialog
+from gui.transport_tuner import TransportTuner
+from gui.ssh_connector import SSHConnector
+from gui.transcript_search import TranscriptSearchDialog
+from gui.connection_stats import ConnectionStatsDialog
+from connections.backends import get_backend
+from connections.connect_metrics import get_default_metrics
+from connections.connections_manager import ConnectionManager
 from utils.settings_manager import SettingsManager
-import webbrowser
+from utils.search_index import SearchIndex
+from utils.transcript_store import TranscriptStore
+import os
+import sys
+import time
 
 class MainWindow(QMainWindow):
-    def __init__(self, log_manager, settings_manager):
+    def __init__(self, log_manager, settings_manager, connection_manager=None):
         super().__init__()
 
         self.log_manager = log_manager
         self.settings_manager = settings_manager
+        self.connection_manager = connection_manager if connection_manager else ConnectionManager()
 
         self.setWindowTitle("Connection Manager")
         self.setGeometry(100, 100, 1200, 800)
@@ -26,29 +42,97 @@ class MainWindow(QMainWindow):
         self.customizations = Customizations(self.settings_manager)
         self.apply_customizations()
 
+        # Results are shown for ttl seconds, by default until the next sweep
+        health_check_interval = self.settings_manager.get_setting('health_check_interval', 60)
+        self.health_monitor = HealthMonitor(
+            self,
+            interval_ms=health_check_interval * 1000,
+            concurrency=self.settings_manager.get_setting('health_check_concurrency', 256),
+            timeout=self.settings_manager.get_setting('health_check_timeout', 3.0),
+            ttl=self.settings_manager.get_setting('health_check_ttl', health_check_interval),
+            read_banner=self.settings_manager.get_setting('health_check_banner', False)
+        )
+        # Every host is probed again each interval; a result from late in the previous
+        # sweep would otherwise still count as fresh and wait another whole interval
+        self.health_monitor.sweep_timer.timeout.connect(lambda: self.check_reachability(force=True))
+
+        self.command_runner = CommandRunner(
+            self,
+            max_workers=self.settings_manager.get_setting('fanout_workers', 32),
+            timeout=self.settings_manager.get_setting('fanout_timeout', 60)
+        )
+        self.command_runner.output_ready.connect(self.append_output)
+        self.command_runner.finished.connect(self.show_fanout_results)
+
+        # Per-host cipher, compression and window sizes, measured in the background
+        self.transport_tuner = TransportTuner(
+            self,
+            duration=self.settings_manager.get_setting('transport_tune_seconds', 1.0),
+            sample_bytes=self.settings_manager.get_setting('transport_tune_bytes', 32 * 1024 * 1024)
+        )
+        self.transport_tuner.profile_ready.connect(self.save_transport_profile)
+        self.transport_tuner.tuning_failed.connect(self.transport_tuning_failed)
+        self.transport_tuner.drifted.connect(self.retune_drifted)
+        self.watching_drift = False
+
+        # SSH handshakes run in the background; the session opens once one completes
+        self.ssh_connector = SSHConnector(self)
+        self.ssh_connector.connected.connect(self.ssh_connected)
+        self.ssh_connector.failed.connect(self.ssh_connect_failed)
+
         self.splitter = QSplitter(Qt.Horizontal)
 
-        # Left pane: Tree widget for folders and connections
-        self.tree_widget = QTreeWidget()
-        self.tree_widget.setHeaderHidden(True)
-        self.tree_widget.setContextMenuPolicy(Qt.CustomContextMenu)
-        self.tree_widget.customContextMenuRequested.connect(self.show_context_menu)
-        self.tree_widget.itemDoubleClicked.connect(self.open_connection)
-        self.tree_widget.setToolTipDuration(5000)
+        # Left pane: Search box above the tree view for folders and connections
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search connections...")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textChanged.connect(self.filter_connections)
+        # Shown when a search matches more than can be listed
+        self.search_status = QLabel()
+        self.search_status.hide()
+
+        self.tree_view = QTreeView()
+        self.tree_view.setHeaderHidden(True)
+        self.tree_view.setUniformRowHeights(True)
+        self.tree_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.tree_view.customContextMenuRequested.connect(self.show_context_menu)
+        self.tree_view.doubleClicked.connect(self.open_connection)
+        self.tree_view.setToolTipDuration(5000)
         self.load_connections()
 
-        self.splitter.addWidget(self.tree_widget)
-
-        # Right pane: Terminal/Connection area
+        left_pane = QWidget()
+        left_layout = QVBoxLayout(left_pane)
+        left_layout.setContentsMargins(0, 0, 0, 0)
+        left_layout.addWidget(self.search_input)
+        left_layout.addWidget(self.search_status)
+        left_layout.addWidget(self.tree_view)
+        self.splitter.addWidget(left_pane)
+
+        # Right pane: Output area plus one tab per embedded terminal session
+        self.scrollback_lines = self.settings_manager.get_setting('scrollback_lines', 10000)
+        self.transfer_dialogs = []
+        # Connection id -> (ssh manager, forwards) for tunnels that are up
+        self.port_forwards = {}
+        # Session output is recorded under logs/ so it can be searched later
+        self.transcripts = TranscriptStore() if self.settings_manager.get_setting('record_transcripts', True) else None
+        self.output_transcript = None
         self.terminal_area = QPlainTextEdit()
         self.terminal_area.setReadOnly(True)
         self.terminal_area.setFont(QFont('Courier', 10))
+        self.terminal_area.setMaximumBlockCount(self.scrollback_lines)
         # Set default background and font colors
         bg_color = self.customizations.get_background_color()
         font_color = self.customizations.get_font_color()
         self.terminal_area.setStyleSheet(f"background-color: {bg_color}; color: {font_color};")
 
-        self.splitter.addWidget(self.terminal_area)
+        self.session_tabs = QTabWidget()
+        self.session_tabs.setTabsClosable(True)
+        self.session_tabs.tabCloseRequested.connect(self.close_session_tab)
+        self.session_tabs.addTab(self.terminal_area, "Output")
+        # The output tab stays put; only session tabs get a close button
+        self.session_tabs.tabBar().setTabButton(0, self.session_tabs.tabBar().RightSide, None)
+
+        self.splitter.addWidget(self.session_tabs)
 
         layout = QVBoxLayout()
         layout.addWidget(self.splitter)
@@ -59,6 +143,19 @@ class MainWindow(QMainWindow):
 
         self.create_menus()
 
+        self.check_reachability()
+        self.health_monitor.sweep_timer.start()
+        # Resolve the whole inventory in the background so first connects skip DNS
+        if self.settings_manager.get_setting('dns_prefetch', True):
+            self.prefetch_addresses()
+
+        # Optionally keep a Prometheus textfile up to date for node_exporter to pick up
+        self.metrics_textfile = self.settings_manager.get_setting('metrics_textfile', '')
+        if self.metrics_textfile:
+            self.metrics_timer = QTimer(self)
+            self.metrics_timer.timeout.connect(self.export_metrics)
+            self.metrics_timer.start(self.settings_manager.get_setting('metrics_export_interval', 60) * 1000)
+
     def apply_customizations(self):
         # Apply background and font color customizations
         bg_color = self.customizations.get_background_color()
@@ -71,16 +168,38 @@ class MainWindow(QMainWindow):
         file_menu = menu_bar.addMenu('File')
         help_menu = menu_bar.addMenu('Help')
 
+        import_action = QAction('Import Inventory...', self)
+        import_action.triggered.connect(self.import_inventory)
+        file_menu.addAction(import_action)
+
         customize_action = QAction('Customize Appearance', self)
         customize_action.triggered.connect(self.customize_appearance)
         file_menu.addAction(customize_action)
 
+        reachability_action = QAction('Check Reachability', self)
+        reachability_action.triggered.connect(lambda: self.check_reachability(force=True))
+        file_menu.addAction(reachability_action)
+
+        transcripts_action = QAction('Search Transcripts', self)
+        transcripts_action.triggered.connect(self.search_transcripts)
+        transcripts_action.setEnabled(self.transcripts is not None)
+        file_menu.addAction(transcripts_action)
+
+        lock_keys_action = QAction('Lock Keys', self)
+        lock_keys_action.triggered.connect(self.lock_keys)
+        file_menu.addAction(lock_keys_action)
+
+        stats_action = QAction('Connection Stats', self)
+        stats_action.triggered.connect(self.show_connection_stats)
+        file_menu.addAction(stats_action)
+
         about_action = QAction('About', self)
         about_action.triggered.connect(self.show_about_dialog)
         help_menu.addAction(about_action)
 
     def show_context_menu(self, position):
-        selected_item = self.tree_widget.itemAt(position)
+        selected_index = self.tree_view.indexAt(position)
+        selected_item = self.tree_model.item(selected_index)
         menu = QMenu()
 
         add_folder_action = QAction("Add Folder", self)
@@ -96,114 +215,554 @@ class MainWindow(QMainWindow):
             edit_action.triggered.connect(self.edit_item)
             menu.addAction(edit_action)
 
-        menu.exec_(self.tree_widget.viewport().mapToGlobal(position))
+            if selected_item['type'] == 'folder':
+                run_action = QAction("Run on Folder...", self)
+                run_action.triggered.connect(lambda: self.run_on_folder(selected_item))
+                run_action.setEnabled(not self.command_runner.is_running())
+                menu.addAction(run_action)
+            elif selected_item.get('connection_type') == 'SSH':
+                upload_action = QAction("Upload File...", self)
+                upload_action.triggered.connect(lambda: self.transfer_file(selected_item, 'upload'))
+                menu.addAction(upload_action)
+
+                download_action = QAction("Download File...", self)
+                download_action.triggered.connect(lambda: self.transfer_file(selected_item, 'download'))
+                menu.addAction(download_action)
+
+                tune_action = QAction("Tune Transport", self)
+                tune_action.triggered.connect(lambda: self.tune_transport(selected_item))
+                tune_action.setEnabled(not self.transport_tuner.is_tuning(selected_item['id']))
+                menu.addAction(tune_action)
+
+                if selected_item['id'] in self.port_forwards:
+                    stop_forwards_action = QAction("Stop Port Forwards", self)
+                    stop_forwards_action.triggered.connect(lambda: self.stop_port_forwards(selected_item['id']))
+                    menu.addAction(stop_forwards_action)
+
+        if self.command_runner.is_running():
+            cancel_action = QAction("Cancel Running Command", self)
+            cancel_action.triggered.connect(self.command_runner.cancel)
+            menu.addAction(cancel_action)
+
+        menu.exec_(self.tree_view.viewport().mapToGlobal(position))
 
     def add_folder(self):
         folder_name, ok = QInputDialog.getText(self, "New Folder", "Enter folder name:")
         if ok and folder_name:
-            folder_item = QTreeWidgetItem([folder_name])
-            folder_item.setData(0, Qt.UserRole, {'type': 'folder', 'name': folder_name})
-            self.tree_widget.addTopLevelItem(folder_item)
+            folder = self.connection_manager.add_folder(folder_name)
+            self.tree_model.item_added(folder['id'])
             self.log_manager.log('info', f"Folder added: {folder_name}")
-            # Save the folder to settings
-            self.settings_manager.add_folder({'name': folder_name})
 
     def add_connection(self):
-        selected_item = self.tree_widget.currentItem()
+        selected_item = self.tree_model.item(self.tree_view.currentIndex())
         dialog = ConnectionConfigDialog(self)
         if dialog.exec_() == dialog.Accepted:
-            connection_data = dialog.get_connection_data()
-            connection_item = QTreeWidgetItem([connection_data['name']])
-            connection_item.setData(0, Qt.UserRole, connection_data)
-            connection_item.setToolTip(0, self.get_connection_tooltip(connection_data))
-            if selected_item and selected_item.data(0, Qt.UserRole)['type'] == 'folder':
-                selected_item.addChild(connection_item)
-            else:
-                self.tree_widget.addTopLevelItem(connection_item)
+            parent_id = selected_item['id'] if selected_item and selected_item['type'] == 'folder' else None
+            connection_data = self.connection_manager.add_connection(dialog.get_connection_data(), parent_id)
+            self.tree_model.item_added(connection_data['id'])
             self.log_manager.log('info', f"Connection added: {connection_data['name']}")
-            # Save the connection to settings
-            self.settings_manager.add_connection(connection_data)
+            self.prefetch_addresses([connection_data['host']])
 
     def edit_item(self):
-        selected_item = self.tree_widget.currentItem()
-        if selected_item:
-            data = selected_item.data(0, Qt.UserRole)
+        data = self.tree_model.item(self.tree_view.currentIndex())
+        if data:
             if data['type'] == 'connection':
                 # Edit connection
                 dialog = ConnectionConfigDialog(self, data)
                 if dialog.exec_() == dialog.Accepted:
-                    connection_data = dialog.get_connection_data()
-                    selected_item.setText(0, connection_data['name'])
-                    selected_item.setData(0, Qt.UserRole, connection_data)
-                    selected_item.setToolTip(0, self.get_connection_tooltip(connection_data))
+                    fields = dialog.get_connection_data()
+                    if data.get('transport_profile') and any(
+                            fields.get(key) != data.get(key) for key in ('host', 'port', 'proxy_jump')):
+                        # Measured for another link
+                        fields['transport_profile'] = None
+                    connection_data = self.connection_manager.update_item(data['id'], fields)
+                    self.tree_model.item_changed(data['id'])
                     self.log_manager.log('info', f"Connection edited: {connection_data['name']}")
-                    # Update the connection in settings
-                    self.settings_manager.update_connection(connection_data)
+                    self.prefetch_addresses([connection_data['host']])
             elif data['type'] == 'folder':
                 # Edit folder
                 folder_name, ok = QInputDialog.getText(self, "Edit Folder", "Enter new folder name:", text=data['name'])
                 if ok and folder_name:
-                    selected_item.setText(0, folder_name)
-                    data['name'] = folder_name
-                    selected_item.setData(0, Qt.UserRole, data)
+                    self.connection_manager.update_item(data['id'], {'name': folder_name})
+                    self.tree_model.item_changed(data['id'])
                     self.log_manager.log('info', f"Folder renamed to: {folder_name}")
-                    # Update the folder in settings
-                    self.settings_manager.update_folder(data)
+
+    def import_inventory(self):
+        # ssh_config, CSV or Ansible inventory, into the selected folder
+        if self.import_timer.isActive():
+            QMessageBox.information(self, "Import Inventory", "An import is already running.")
+            return
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Import Inventory", os.path.expanduser('~/.ssh'),
+            "Inventories (config *.conf *.csv *.ini *.cfg *.yml *.yaml hosts);;All files (*)"
+        )
+        if not path:
+            return
+        from connections.inventory_import import InventoryImporter
+        selected_item = self.tree_model.item(self.tree_view.currentIndex())
+        parent_id = selected_item['id'] if selected_item and selected_item['type'] == 'folder' else None
+        importer = InventoryImporter(
+            self.connection_manager, batch_size=self.settings_manager.get_setting('import_batch_size', 1000)
+        )
+        self.import_batches = importer.run_batches(path, parent_id)
+        self.import_result = None
+        self.log_manager.log('info', f"Importing inventory: {path}")
+        self.import_timer.start(0)
+
+    def import_next_batch(self):
+        # One committed batch per tick keeps the window responsive during large imports
+        try:
+            self.import_result = next(self.import_batches)
+            return
+        except StopIteration:
+            pass
+        except Exception as e:
+            # Raised out of a timer slot, an error would abort the whole app; the
+            # batches committed so far stay
+            self.import_timer.stop()
+            self.log_manager.log('error', f"Import failed: {e}")
+            self.import_batches = None
+            self.tree_model.reload()
+            return
+        self.import_timer.stop()
+        self.import_batches = None
+        result = self.import_result
+        self.tree_model.reload()
+        if self.index_queue and not self.index_timer.isActive():
+            self.index_timer.start(0)
+        for error in result.errors:
+            self.log_manager.log('error', f"Import failed: {error}", source=result.source)
+        self.log_manager.log(
+            'info', f"Inventory imported: {result.describe()}", source=result.source,
+            added=result.added, updated=result.updated, unchanged=result.unchanged
+        )
+        if result.added or result.updated:
+            self.prefetch_addresses()
+        # Anything another process changed meanwhile
+        self.sync_connections()
 
     def customize_appearance(self):
         bg_color = QColorDialog.getColor().name()
         font_color = QColorDialog.getColor().name()
-        self.customizations.set_background_color(bg_color)
-        self.customizations.set_font_color(font_color)
+        with self.settings_manager.batch():
+            self.customizations.set_background_color(bg_color)
+            self.customizations.set_font_color(font_color)
         self.apply_customizations()
 
-    def open_connection(self, item, column):
-        data = item.data(0, Qt.UserRole)
+    def open_connection(self, index):
+        data = self.tree_model.item(index)
         if data and data['type'] == 'connection':
             connection_type = data.get('connection_type')
             if connection_type == 'SSH':
-                ssh_manager = SSHConnectionManager(
-                    hostname=data['host'],
-                    username=data['username'],
-                    password=data['password'],
-                    port=data.get('port', 22),
-                    ssh_options=data.get('ssh_options', [])
-                )
-                if ssh_manager.connect():
-                    self.terminal_area.appendPlainText(f"Connected to {data['host']}")
-                    # Optionally open browser after SSH connection
-                    if data.get('open_browser'):
-                        self.open_browser()
-                else:
-                    self.terminal_area.appendPlainText(f"Failed to connect to {data['host']}")
+                if not self.unlock_keys([data]):
+                    return
+                if self.ssh_connector.connect_to(data, self.ssh_manager_for(data)):
+                    self.terminal_area.appendPlainText(f"Connecting to {data['host']}...")
             elif connection_type == 'RDP':
-                rdp_manager = RDPConnectionManager(
+                rdp_manager = get_backend('RDP')(
                     hostname=data['host'],
                     username=data['username'],
                     password=data['password']
                 )
                 rdp_manager.connect()
+                self.log_manager.log('info', f"RDP session started for {data['name']}", host=data['host'], protocol='RDP')
+            elif connection_type == 'WinRM':
+                # Commands go through the host's pooled shell, streamed like a folder run
+                self.run_on_connections([data], data['name'])
         else:
             # It's a folder or has no data
             pass
 
+    def ssh_connected(self, data, ssh_manager, duration):
+        self.terminal_area.appendPlainText(f"Connected to {data['host']}")
+        self.log_manager.log('info', f"Connected to {data['name']}", host=data['host'],
+                             protocol='SSH', duration=round(duration, 3))
+        # Calibrating moves tens of MB over the link, so it only runs unasked when enabled
+        if not data.get('transport_profile') and self.settings_manager.get_setting(
+                'transport_auto_tune', False):
+            self.transport_tuner.tune(data['id'], ssh_manager)
+        if self.settings_manager.get_setting('external_terminal', False):
+            ssh_manager.launch_terminal()
+        else:
+            self.open_terminal(data, ssh_manager)
+        if data.get('port_forwards'):
+            self.start_port_forwards(data, ssh_manager)
+        # Optionally open browser on the forwarded port after SSH connection
+        if data.get('open_browser'):
+            self.open_browser(data)
+
+    def ssh_connect_failed(self, data, ssh_manager, duration):
+        self.terminal_area.appendPlainText(f"Failed to connect to {data['host']}")
+        self.log_manager.log('error', f"Failed to connect to {data['name']}", host=data['host'],
+                             protocol='SSH', duration=round(duration, 3))
+
+    def ssh_manager_for(self, data):
+        # Also hands the connection's transport profile to the pool
+        ssh_manager = get_backend('SSH')(
+            hostname=data['host'],
+            username=data['username'],
+            password=data['password'],
+            port=data.get('port', 22),
+            ssh_options=data.get('ssh_options', []),
+            key_filename=data.get('key_file'),
+            allow_agent=data.get('use_agent', False),
+            jump_hosts=self.jump_hosts_for(data),
+            transport_profile=data.get('transport_profile')
+        )
+        if not self.watching_drift:
+            profiles = ssh_manager.pool.profiles
+            profiles.drift = self.settings_manager.get_setting('transport_drift', 0.5)
+            profiles.add_listener(lambda key, profile, rate, baseline: self.transport_tuner.drifted.emit(key))
+            self.watching_drift = True
+        return ssh_manager
+
+    def tune_transport(self, data):
+        if self.unlock_keys([data]):
+            self.transport_tuner.tune(data['id'], self.ssh_manager_for(data))
+            self.log_manager.log('info', f"Tuning transport for {data['name']}", host=data['host'], protocol='SSH')
+
+    def save_transport_profile(self, connection_id, profile):
+        data = self.connection_manager.get_item(connection_id)
+        if data is None:
+            return
+        data = self.connection_manager.update_item(connection_id, {'transport_profile': profile})
+        self.tree_model.item_changed(connection_id)
+        # Applied from the next transport opened to the host
+        profile = self.ssh_manager_for(data).transport_profile()
+        self.log_manager.log('info', f"Transport tuned for {data['name']}: {profile.describe()}",
+                             host=data['host'], protocol='SSH')
+
+    def transport_tuning_failed(self, connection_id, error):
+        data = self.connection_manager.get_item(connection_id)
+        host = data['host'] if data else None
+        self.log_manager.log('warning', f"Transport tuning failed: {error}", host=host, protocol='SSH')
+
+    def retune_drifted(self, key):
+        # Throughput to a tuned host moved away from what it was; measure it again
+        from connections.ssh_pool import SSHTransportPool
+        for data in self.connection_manager.iter_connections():
+            if data.get('transport_profile') and SSHTransportPool.make_key(
+                    data['host'], data.get('port', 22), data['username'], self.jump_hosts_for(data)) == key:
+                if not self.settings_manager.get_setting('transport_auto_tune', False):
+                    self.log_manager.log('warning', f"Throughput drifted for {data['name']}; use Tune Transport "
+                                         f"to measure it again", host=data['host'], protocol='SSH')
+                    continue
+                self.log_manager.log('info', f"Throughput drifted, re-tuning {data['name']}",
+                                     host=data['host'], protocol='SSH')
+                self.transport_tuner.tune(data['id'], self.ssh_manager_for(data))
+
+    def jump_hosts_for(self, data):
+        # A hop naming a saved connection uses that connection's address and credentials;
+        # any other hop is [user@]host[:port] and authenticates like the target
+        spec = data.get('proxy_jump')
+        if not spec:
+            return []
+        from connections.ssh_connection import parse_jump_hosts
+        if self.connections_by_name is None:
+            self.connections_by_name = {item['name']: item for item in self.connection_manager.iter_connections()}
+        hops = []
+        for hop in parse_jump_hosts(spec):
+            saved = self.connections_by_name.get(hop['hostname']) if hop['port'] == 22 and not hop['username'] else None
+            if saved and saved is not data:
+                hops.append({
+                    'hostname': saved['host'],
+                    'port': saved.get('port', 22),
+                    'username': saved['username'],
+                    'password': saved.get('password'),
+                    'key_filename': saved.get('key_file') or None,
+                    'allow_agent': saved.get('use_agent', False),
+                })
+            else:
+                hops.append(dict(
+                    hop,
+                    username=hop['username'] or data['username'],
+                    key_filename=data.get('key_file') or None,
+                    allow_agent=data.get('use_agent', False),
+                ))
+        return hops
+
+    def unlock_keys(self, connections):
+        # Passphrases are asked for here, on the GUI thread, once per key file;
+        # connections opened afterwards (including fan-out workers) use the cached key
+        key_files = {data['key_file'] for data in connections if data.get('key_file')}
+        for data in connections:
+            key_files.update(hop['key_filename'] for hop in self.jump_hosts_for(data) if hop.get('key_filename'))
+        if not key_files:
+            return True
+        import paramiko
+        from connections.key_cache import WrongPassphrase, get_default_key_cache
+        key_cache = get_default_key_cache()
+        key_cache.ttl = self.settings_manager.get_setting('key_cache_ttl', 3600)
+        key_cache.max_keys = self.settings_manager.get_setting('key_cache_size', 32)
+        for key_file in sorted(key_files):
+            passphrase = None
+            while True:
+                try:
+                    key_cache.get(key_file, passphrase)
+                    break
+                except paramiko.PasswordRequiredException:
+                    prompt = f"Passphrase for {key_file}:"
+                except WrongPassphrase:
+                    prompt = f"Wrong passphrase, try again.\nPassphrase for {key_file}:"
+                except (paramiko.SSHException, OSError) as e:
+                    QMessageBox.warning(self, "Unlock Key", str(e))
+                    return False
+                passphrase, ok = QInputDialog.getText(self, "Unlock Key", prompt, QLineEdit.Password)
+                if not ok:
+                    return False
+        return True
+
+    def lock_keys(self):
+        if 'connections.key_cache' in sys.modules:
+            sys.modules['connections.key_cache'].get_default_key_cache().wipe()
+        self.log_manager.log('info', "Unlocked keys wiped from memory")
+
+    def open_terminal(self, data, ssh_manager):
+        from connections.terminal_session import TerminalSession
+        try:
+            recorder = self.transcripts.open_session(data['name'], data['host'], 'SSH') if self.transcripts else None
+            session = TerminalSession.open(ssh_manager, recorder=recorder)
+        except Exception as e:
+            self.terminal_area.appendPlainText(f"Failed to open a shell on {data['host']}: {e}")
+            self.log_manager.log('error', f"Shell failed on {data['host']}: {e}", host=data['host'], protocol='SSH')
+            return
+        terminal = TerminalWidget(session, scrollback_lines=self.scrollback_lines, log_manager=self.log_manager)
+        terminal.setStyleSheet(self.terminal_area.styleSheet())
+        index = self.session_tabs.addTab(terminal, data['name'])
+        self.session_tabs.setCurrentIndex(index)
+        terminal.setFocus()
+
+    def close_session_tab(self, index):
+        terminal = self.session_tabs.widget(index)
+        if isinstance(terminal, TerminalWidget):
+            self.session_tabs.removeTab(index)
+            terminal.close_session()
+            terminal.deleteLater()
+
+    def transfer_file(self, data, direction):
+        from connections.sftp_transfer import SFTPTransfer
+        if direction == 'upload':
+            local_path, _ = QFileDialog.getOpenFileName(self, "Upload File")
+            if not local_path:
+                return
+            remote_path, ok = QInputDialog.getText(
+                self, "Upload File", f"Remote path on {data['host']}:", text=os.path.basename(local_path)
+            )
+            if not ok or not remote_path:
+                return
+            source, destination = local_path, remote_path
+        else:
+            remote_path, ok = QInputDialog.getText(self, "Download File", f"Remote path on {data['host']}:")
+            if not ok or not remote_path:
+                return
+            local_path, _ = QFileDialog.getSaveFileName(self, "Save As", os.path.basename(remote_path))
+            if not local_path:
+                return
+            source, destination = remote_path, local_path
+
+        if not self.unlock_keys([data]):
+            return
+        transfer = SFTPTransfer(
+            self.ssh_manager_for(data),
+            channels=self.settings_manager.get_setting('transfer_channels', 4),
+            window_blocks=self.settings_manager.get_setting('transfer_window_blocks', 256)
+        )
+        dialog = TransferDialog(transfer, direction, source, destination, self)
+        dialog.finished.connect(lambda: self.transfer_dialogs.remove(dialog))
+        self.transfer_dialogs.append(dialog)
+        dialog.start()
+        self.log_manager.log('info', f"{direction.capitalize()} started: {source} -> {destination}",
+                             host=data['host'], protocol='SFTP')
+
+    def run_on_folder(self, folder_item):
+        connections = [
+            data for data in self.connection_manager.iter_connections(folder_item['id'])
+            if data.get('connection_type') in ('SSH', 'WinRM')
+        ]
+        if not connections:
+            QMessageBox.information(self, "Run on Folder", "This folder has no SSH or WinRM connections.")
+            return
+        self.run_on_connections(connections, f"folder {folder_item['name']}")
+
+    def run_on_connections(self, connections, label):
+        if self.command_runner.is_running():
+            QMessageBox.information(self, "Run Command", "A command is already running.")
+            return
+        command, ok = QInputDialog.getText(
+            self, "Run Command", f"Command to run on {len(connections)} hosts:"
+        )
+        if not ok or not command:
+            return
+        ssh_connections = [data for data in connections if data.get('connection_type') == 'SSH']
+        if not self.unlock_keys(ssh_connections):
+            return
+        if len(ssh_connections) < len(connections):
+            from connections.winrm_connection import get_default_winrm_pool
+            winrm_pool = get_default_winrm_pool()
+            winrm_pool.transport = self.settings_manager.get_setting('winrm_transport', 'ntlm')
+            winrm_pool.idle_timeout = self.settings_manager.get_setting('winrm_idle_timeout', 120)
+        # Hosts behind a bastion are reached through one shared bastion transport
+        connections = [
+            dict(data, jump_hosts=self.jump_hosts_for(data)) if data.get('proxy_jump') else data
+            for data in connections
+        ]
+        self.terminal_area.appendPlainText(f"$ {command}  ({label}, {len(connections)} hosts)")
+        self.log_manager.log('info', f"Running '{command}' on {label}", hosts=len(connections))
+        self.command_runner.run(connections, command)
+
+    def append_output(self, lines):
+        text = '\n'.join(lines)
+        self.terminal_area.appendPlainText(text)
+        if self.transcripts:
+            if self.output_transcript is None:
+                self.output_transcript = self.transcripts.open_session('Output')
+            self.output_transcript.write(text + '\n')
+
+    def show_connection_stats(self):
+        dialog = ConnectionStatsDialog(get_default_metrics(), self)
+        dialog.exec_()
+
+    def export_metrics(self):
+        try:
+            get_default_metrics().export(self.metrics_textfile)
+        except OSError as e:
+            self.log_manager.log('error', f"Metrics export failed: {e}")
+
+    def search_transcripts(self):
+        dialog = TranscriptSearchDialog(self.transcripts, self)
+        dialog.exec_()
+
+    def show_fanout_results(self, results):
+        self.append_output([result.describe() for result in results])
+        failed = sum(1 for result in results if result.error or result.exit_status)
+        for result in results:
+            self.log_manager.log(
+                'warning' if result.error or result.exit_status else 'info', result.describe(),
+                host=result.host, protocol='SSH', duration=round(result.duration, 3),
+                exit_status=result.exit_status, error=result.error or None
+            )
+        self.log_manager.log('info', f"Command finished on {len(results)} hosts, {failed} failed")
+
     def load_connections(self):
-        # Load connections and folders from settings
-        items = self.settings_manager.get_all_items()
-        for item_data in items:
-            item = self.create_tree_item(item_data)
-            self.tree_widget.addTopLevelItem(item)
-
-    def create_tree_item(self, item_data):
-        item = QTreeWidgetItem([item_data['name']])
-        item.setData(0, Qt.UserRole, item_data)
-        if item_data['type'] == 'connection':
-            item.setToolTip(0, self.get_connection_tooltip(item_data))
-        elif item_data['type'] == 'folder':
-            for child_data in item_data.get('children', []):
-                child_item = self.create_tree_item(child_data)
-                item.addChild(child_item)
-        return item
+        # Rows are fetched from the connection store on demand as folders are expanded
+        self.tree_model = ConnectionTreeModel(
+            self.connection_manager,
+            tooltip_provider=self.get_connection_tooltip,
+            batch_size=self.settings_manager.get_setting('tree_batch_size', 500),
+            parent=self
+        )
+        self.tree_view.setModel(self.tree_model)
+
+        # The search index is filled in small slices so startup never waits on it
+        self.search_index = SearchIndex()
+        self.search_limit = self.settings_manager.get_setting('search_limit', 500)
+        self.index_queue = list(self.connection_manager.items.values())
+        self.index_timer = QTimer(self)
+        self.index_timer.timeout.connect(self.index_next_batch)
+        self.index_timer.start(0)
+        self.connection_manager.add_listener(self.update_search_index)
+        # Name lookup for jump hosts, rebuilt on first use after any change
+        self.connections_by_name = None
+        self.connection_manager.add_listener(self.forget_connection_names)
+        self.import_timer = QTimer(self)
+        self.import_timer.timeout.connect(self.import_next_batch)
+        # Picks up edits made elsewhere, e.g. a connections.json shared through a synced folder
+        self.connections_watcher = None
+        if self.settings_manager.get_setting('watch_connections_file', True):
+            self.connections_watcher = FileWatcher(
+                [self.connection_manager.connections_file, self.connection_manager.journal.path],
+                debounce_ms=self.settings_manager.get_setting('watch_debounce_ms', 300), parent=self
+            )
+            self.connections_watcher.changed.connect(self.sync_connections)
+
+    def sync_connections(self):
+        # Applies only what changed on disk; the files are re-read only if their content changed
+        if self.import_timer.isActive():
+            # Checked again once the import finishes
+            return
+        try:
+            changes = self.connection_manager.external_changes()
+        except (OSError, ValueError, KeyError) as e:
+            # Usually a sync tool caught mid-write; its next change event retries
+            self.log_manager.log('warning', f"Reading changed connections file failed: {e}")
+            return
+        if changes is None:
+            return
+        started = time.perf_counter()
+        if self.tree_model.is_filtered() or len(changes.records) > self.settings_manager.get_setting(
+                'sync_reset_threshold', 1000):
+            # A large change is cheaper as one reset; expanded folders and the selection are restored by id
+            expanded = [
+                item_id for item_id in self.tree_model.loaded_parent_ids()
+                if self.tree_view.isExpanded(self.tree_model.index_for_id(item_id))
+            ]
+            current_id = self.tree_model.item_id(self.tree_view.currentIndex())
+            self.connection_manager.apply_external(changes)
+            self.tree_model.reload()
+            for item_id in expanded:
+                index = self.tree_model.reveal(item_id)
+                if index.isValid():
+                    self.tree_view.expand(index)
+            if current_id:
+                index = self.tree_model.reveal(current_id)
+                if index.isValid():
+                    self.tree_view.setCurrentIndex(index)
+            if self.tree_model.is_filtered():
+                self.filter_connections(self.search_input.text())
+        else:
+            self.connection_manager.apply_external(
+                changes, self.tree_model.record_about_to_apply, self.tree_model.record_applied
+            )
+        if not changes.records:
+            return
+        self.log_manager.log(
+            'info', f"Connections file changed on disk: {len(changes.records)} changes applied",
+            duration_ms=round((time.perf_counter() - started) * 1000, 1)
+        )
+        hosts = [record['item'].get('host') for record in changes.records
+                 if record['op'] == 'add' and record['item']['type'] == 'connection']
+        hosts += [record['fields']['host'] for record in changes.records
+                  if record['op'] == 'update' and 'host' in record['fields']]
+        if hosts:
+            self.prefetch_addresses(hosts)
+
+    def index_next_batch(self, batch_size=500):
+        batch = self.index_queue[-batch_size:]
+        del self.index_queue[-batch_size:]
+        for item in batch:
+            if item['id'] in self.connection_manager.items and item['id'] not in self.search_index:
+                self.search_index.add(item)
+        if not self.index_queue:
+            self.index_timer.stop()
+            if self.search_input.text():
+                self.filter_connections(self.search_input.text())
+
+    def update_search_index(self, record, item):
+        if record['op'] == 'remove':
+            stack = [item]
+            while stack:
+                removed = stack.pop()
+                self.search_index.remove(removed['id'])
+                stack.extend(removed.get('children', []))
+        elif record['op'] == 'add' and self.import_timer.isActive():
+            # Imported connections are indexed in slices once the import is done
+            self.index_queue.append(item)
+        elif record['op'] in ('add', 'update'):
+            self.search_index.add(item)
+
+    def forget_connection_names(self, record, item):
+        self.connections_by_name = None
+
+    def filter_connections(self, text):
+        if text.strip():
+            matches = self.search_index.search(text, limit=self.search_limit)
+            self.tree_model.set_filter(matches)
+        elif self.tree_model.is_filtered():
+            self.search_index.search('')
+            self.tree_model.set_filter(None)
+        if self.search_index.truncated:
+            self.search_status.setText(f"Showing {self.search_limit} of the matches; keep typing to narrow")
+        self.search_status.setVisible(self.search_index.truncated)
 
     def get_connection_tooltip(self, connection_data):
         tooltip = f"Host: {connection_data['host']}\n"
@@ -211,11 +770,106 @@ class MainWindow(QMainWindow):
         tooltip += f"Type: {connection_data['connection_type']}\n"
         if connection_data['connection_type'] == 'SSH':
             tooltip += f"SSH Options: {' '.join(connection_data.get('ssh_options', []))}\n"
+        result = self.health_monitor.get_result(connection_data['host'], connection_data.get('port', 22))
+        if result:
+            tooltip += f"Status: {result.describe()}\n"
+        for forward in self.port_forwards.get(connection_data['id'], (None, []))[1]:
+            tooltip += f"Forward: {forward.describe()}\n"
+        if connection_data.get('transport_profile'):
+            from connections.transport_tuning import TransportProfile
+            tooltip += f"Transport: {TransportProfile.from_dict(connection_data['transport_profile']).describe()}\n"
         return tooltip
 
-    def open_browser(self):
-        # Open default browser to localhost or specified URL
-        webbrowser.open('http://localhost')
+    def check_reachability(self, force=False):
+        targets = {
+            (data['host'], data.get('port', 22)) for data in self.connection_manager.iter_connections()
+        }
+        self.health_monitor.start_sweep(targets, force=force)
+
+    def prefetch_addresses(self, hosts=None):
+        from connections.resolver import get_default_resolver
+        resolver = get_default_resolver()
+        resolver.ttl = self.settings_manager.get_setting('dns_cache_ttl', 300)
+        if hosts is None:
+            hosts = [data['host'] for data in self.connection_manager.iter_connections()]
+        resolver.prefetch(hosts)
+
+    def start_port_forwards(self, data, ssh_manager):
+        # All tunnels share one event loop; the transport stays pinned in the pool while they listen
+        if data['id'] in self.port_forwards:
+            return
+        from connections.port_forwarding import get_default_engine, parse_forward
+        engine = get_default_engine()
+        engine.buffer_limit = self.settings_manager.get_setting('forward_buffer_limit', 256 * 1024)
+        forwards = []
+        for spec in data['port_forwards']:
+            try:
+                forward = parse_forward(spec)
+                if forward['kind'] == 'L':
+                    forwards.append(engine.add_local(forward, ssh_manager.open_channel))
+                else:
+                    forwards.append(engine.add_remote(forward, ssh_manager.transport))
+            except Exception as e:
+                self.terminal_area.appendPlainText(f"Port forward '{spec}' failed: {e}")
+                self.log_manager.log('error', f"Port forward failed for {data['name']}: {e}", host=data['host'],
+                                     forward=spec)
+                continue
+            self.terminal_area.appendPlainText(f"Forwarding {forwards[-1].describe()}")
+        if forwards:
+            ssh_manager.pool.pin(ssh_manager.pool_key())
+            self.port_forwards[data['id']] = (ssh_manager, forwards)
+            self.log_manager.log('info', f"Port forwards started for {data['name']}", host=data['host'],
+                                 forwards=len(forwards))
+
+    def stop_port_forwards(self, connection_id):
+        ssh_manager, forwards = self.port_forwards.pop(connection_id, (None, []))
+        if not forwards:
+            return
+        from connections.port_forwarding import get_default_engine
+        engine = get_default_engine()
+        for forward in forwards:
+            engine.remove(forward)
+            self.log_manager.log('info', f"Port forward stopped: {forward.describe()}", host=ssh_manager.hostname,
+                                 bytes_in=forward.bytes_in, bytes_out=forward.bytes_out,
+                                 connections=forward.total)
+        ssh_manager.pool.unpin(ssh_manager.pool_key())
+
+    def open_browser(self, data):
+        # Open the default browser on the local end of the connection's first -L forward
+        import webbrowser
+        _, forwards = self.port_forwards.get(data['id'], (None, []))
+        local = [forward for forward in forwards if forward.kind == 'L']
+        if not local:
+            self.terminal_area.appendPlainText(f"No local port forward to open a browser on for {data['name']}")
+            return
+        scheme = 'https' if local[0].port in (443, 8443) else 'http'
+        webbrowser.open(f'{scheme}://localhost:{local[0].bound_port}')
+
+    def closeEvent(self, event):
+        # An interrupted import keeps the batches it has already committed
+        self.import_timer.stop()
+        if self.connections_watcher:
+            # Our own final save below is not an external change
+            self.connections_watcher.blockSignals(True)
+        for index in range(self.session_tabs.count() - 1, 0, -1):
+            self.close_session_tab(index)
+        for dialog in list(self.transfer_dialogs):
+            dialog.close()
+        if self.transcripts:
+            if self.output_transcript:
+                self.output_transcript.close()
+            self.transcripts.close()
+        for connection_id in list(self.port_forwards):
+            self.stop_port_forwards(connection_id)
+        # Drop pooled SSH transports cleanly instead of leaving them to the reaper
+        if 'connections.ssh_pool' in sys.modules:
+            sys.modules['connections.ssh_pool'].get_default_pool().close_all()
+        if 'connections.winrm_connection' in sys.modules:
+            sys.modules['connections.winrm_connection'].get_default_winrm_pool().close_all()
+        if 'connections.key_cache' in sys.modules:
+            sys.modules['connections.key_cache'].get_default_key_cache().wipe()
+        self.connection_manager.close()
+        super().closeEvent(event)
 
     def show_about_dialog(self):
         about_text = """
@@ -0,0 +1,46 @@
+# gui/ssh_connector.py
+
+import threading
+import time
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+class SSHConnector(QObject):
+    # Handshakes (DNS, TCP, key exchange, auth) run on worker threads so a slow or
+    # unreachable host never blocks the GUI; the outcome comes back as a signal with
+    # the connection data, its SSH manager and how long connecting took.
+    connected = pyqtSignal(object, object, float)
+    failed = pyqtSignal(object, object, float)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def connect_to(self, data, ssh_manager):
+        # False if that connection is already being opened
+        with self._lock:
+            if data['id'] in self._pending:
+                return False
+            self._pending.add(data['id'])
+        threading.Thread(target=self._run, args=(data, ssh_manager), name='ssh-connect', daemon=True).start()
+        return True
+
+    def is_connecting(self, connection_id):
+        return connection_id in self._pending
+
+    def _run(self, data, ssh_manager):
+        started = time.monotonic()
+        try:
+            ok = ssh_manager.connect()
+        except Exception as e:
+            # connect() reports SSH and socket errors itself; anything else still ends the attempt
+            print(f"SSH connection failed: {e}")
+            ok = False
+        finally:
+            with self._lock:
+                self._pending.discard(data['id'])
+        if ok:
+            self.connected.emit(data, ssh_manager, time.monotonic() - started)
+        else:
+            self.failed.emit(data, ssh_manager, time.monotonic() - started)
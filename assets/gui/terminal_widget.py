@@ -0,0 +1,137 @@
+# gui/terminal_widget.py
+
+import codecs
+import re
+
+from PyQt5.QtWidgets import QApplication, QPlainTextEdit
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QFont, QTextCursor, QKeySequence
+
+ESCAPE_SEQUENCE = re.compile(r'\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)|\x1b[@-Z\\-_]')
+CONTROL_CHARACTERS = re.compile(r'[\x00-\x08\x0b-\x1f\x7f]')
+
+KEY_SEQUENCES = {
+    Qt.Key_Return: b'\r',
+    Qt.Key_Enter: b'\r',
+    Qt.Key_Backspace: b'\x7f',
+    Qt.Key_Tab: b'\t',
+    Qt.Key_Escape: b'\x1b',
+    Qt.Key_Up: b'\x1b[A',
+    Qt.Key_Down: b'\x1b[B',
+    Qt.Key_Right: b'\x1b[C',
+    Qt.Key_Left: b'\x1b[D',
+    Qt.Key_Home: b'\x1b[H',
+    Qt.Key_End: b'\x1b[F',
+    Qt.Key_Delete: b'\x1b[3~',
+    Qt.Key_PageUp: b'\x1b[5~',
+    Qt.Key_PageDown: b'\x1b[6~',
+}
+
+class TerminalWidget(QPlainTextEdit):
+    # Output is pulled from the session once per frame and appended in a single
+    # edit; the document never grows beyond the configured scrollback
+    session_closed = pyqtSignal()
+
+    def __init__(self, session, parent=None, scrollback_lines=10000, frame_ms=33, frame_bytes=128 * 1024,
+                 log_manager=None):
+        super().__init__(parent)
+        self.session = session
+        self.log_manager = log_manager
+        self.frame_bytes = frame_bytes
+        self.setFont(QFont('Courier', 10))
+        self.setMaximumBlockCount(scrollback_lines)
+        self.setUndoRedoEnabled(False)
+        self.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self._decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        self._dropped_bytes = 0
+        self._pty_size = None
+
+        # A window drag resizes many times a second; the pty follows once it settles
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(100)
+        self.resize_timer.timeout.connect(self.resize_pty)
+
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setInterval(frame_ms)
+        self.frame_timer.timeout.connect(self.render_frame)
+        self.frame_timer.start()
+
+    def render_frame(self):
+        data = self.session.drain()
+        if data:
+            skipped = self.session.dropped_bytes - self._dropped_bytes
+            self._dropped_bytes = self.session.dropped_bytes
+            if len(data) > self.frame_bytes:
+                # More than a frame's worth would scroll out of view immediately anyway
+                skipped += len(data) - self.frame_bytes
+                data = data[-self.frame_bytes:]
+                self._decoder.reset()
+            text = self._decoder.decode(data)
+            if skipped:
+                text = f"\n[... {skipped} bytes of output skipped ...]\n" + text
+            self.append_output(text)
+        if self.session.closed and not data:
+            self.frame_timer.stop()
+            if self.session.error:
+                self.append_output(f"\n[session closed: {self.session.error}]\n")
+            else:
+                self.append_output("\n[session closed]\n")
+            self.session_closed.emit()
+
+    def append_output(self, text):
+        text = ESCAPE_SEQUENCE.sub('', text).replace('\r\n', '\n')
+        text = CONTROL_CHARACTERS.sub('', text.replace('\r', ''))
+        scrollbar = self.verticalScrollBar()
+        follow = scrollbar.value() == scrollbar.maximum()
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        if follow:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.resize_timer.start()
+
+    def resize_pty(self):
+        # The remote side wraps and lays out full-screen programs to the visible columns and rows
+        metrics = self.fontMetrics()
+        viewport = self.viewport()
+        size = (max(1, viewport.width() // max(1, metrics.horizontalAdvance('M'))),
+                max(1, viewport.height() // max(1, metrics.lineSpacing())))
+        if size == self._pty_size or self.session.closed:
+            return
+        import paramiko
+        try:
+            self.session.resize(*size)
+        except (paramiko.SSHException, OSError, EOFError) as e:
+            # The channel went away; render_frame reports the closed session
+            if self.log_manager:
+                self.log_manager.log('warning', f"Terminal resize failed: {e}", host=self.session.host,
+                                     protocol='SSH')
+            return
+        self._pty_size = size
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.Copy) and self.textCursor().hasSelection():
+            # Ctrl+C copies a selection; without one it is sent as an interrupt
+            super().keyPressEvent(event)
+            return
+        if event.matches(QKeySequence.Paste):
+            self.insertFromMimeData(QApplication.clipboard().mimeData())
+            return
+        data = KEY_SEQUENCES.get(event.key())
+        if data is None and event.text():
+            data = event.text().encode('utf-8')
+        if data:
+            self.session.send(data)
+
+    def insertFromMimeData(self, source):
+        # Pasted text goes to the remote shell, which echoes it back
+        if source and source.hasText():
+            self.session.send(source.text().replace('\n', '\r').encode('utf-8'))
+
+    def close_session(self):
+        self.frame_timer.stop()
+        self.session.close()
@@ -0,0 +1,97 @@
+# gui/transcript_search.py
+
+import threading
+import time
+
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QListWidget, QListWidgetItem,
+    QPlainTextEdit, QSplitter, QLabel
+)
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QFont, QTextCursor
+
+class TranscriptSearchDialog(QDialog):
+    # Searches decompress whatever chunks may match, so they run on a worker thread;
+    # the matches, time taken and any error come back as a signal
+    search_finished = pyqtSignal(list, float, str)
+
+    def __init__(self, transcript_store, parent=None, limit=500):
+        super().__init__(parent)
+        self.setWindowTitle("Search Transcripts")
+        self.setMinimumSize(900, 600)
+        self.transcript_store = transcript_store
+        self.limit = limit
+        self.matches = []
+        self.searching = False
+        self.search_finished.connect(self.show_results)
+
+        self.layout = QVBoxLayout(self)
+
+        search_bar = QHBoxLayout()
+        self.query_input = QLineEdit(self)
+        self.query_input.setPlaceholderText("Words that must all appear on a line...")
+        self.query_input.returnPressed.connect(self.run_search)
+        self.search_button = QPushButton("Search")
+        self.search_button.clicked.connect(self.run_search)
+        search_bar.addWidget(self.query_input)
+        search_bar.addWidget(self.search_button)
+        self.layout.addLayout(search_bar)
+
+        self.status_label = QLabel("")
+        self.layout.addWidget(self.status_label)
+
+        splitter = QSplitter(Qt.Vertical)
+        self.results_list = QListWidget(self)
+        self.results_list.currentRowChanged.connect(self.show_match)
+        self.chunk_view = QPlainTextEdit(self)
+        self.chunk_view.setReadOnly(True)
+        self.chunk_view.setFont(QFont('Courier', 10))
+        self.chunk_view.setLineWrapMode(QPlainTextEdit.NoWrap)
+        splitter.addWidget(self.results_list)
+        splitter.addWidget(self.chunk_view)
+        self.layout.addWidget(splitter)
+
+    def run_search(self):
+        if self.searching:
+            return
+        self.searching = True
+        self.search_button.setEnabled(False)
+        self.status_label.setText("Searching...")
+        threading.Thread(target=self._search, args=(self.query_input.text(),), name='transcript-search',
+                         daemon=True).start()
+
+    def _search(self, query):
+        started = time.perf_counter()
+        matches, error = [], ''
+        try:
+            matches = self.transcript_store.search(query, limit=self.limit)
+        except (OSError, ValueError) as e:
+            # A transcript removed or damaged while being read
+            error = str(e)
+        self.search_finished.emit(matches, (time.perf_counter() - started) * 1000, error)
+
+    def show_results(self, matches, elapsed_ms, error):
+        self.searching = False
+        self.search_button.setEnabled(True)
+        self.matches = matches
+        self.results_list.clear()
+        self.chunk_view.clear()
+        for match in self.matches:
+            self.results_list.addItem(QListWidgetItem(match.describe()))
+        if error:
+            self.status_label.setText(f"Search failed: {error}")
+            return
+        more = "+" if len(self.matches) >= self.limit else ""
+        self.status_label.setText(f"{len(self.matches)}{more} matching lines in {elapsed_ms:.0f} ms")
+
+    def show_match(self, row):
+        if row < 0 or row >= len(self.matches):
+            return
+        match = self.matches[row]
+        # Only the chunk holding the match is decompressed
+        self.chunk_view.setPlainText(self.transcript_store.read_chunk(match.session, match.chunk))
+        block = self.chunk_view.document().findBlockByNumber(match.line_number)
+        cursor = QTextCursor(block)
+        cursor.select(QTextCursor.LineUnderCursor)
+        self.chunk_view.setTextCursor(cursor)
+        self.chunk_view.centerCursor()
@@ -0,0 +1,90 @@
+# gui/transfer_dialog.py
+
+import threading
+
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QProgressBar, QPushButton
+from PyQt5.QtCore import QTimer
+
+def format_bytes(count):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if count < 1024 or unit == 'GB':
+            return f"{count:.1f} {unit}" if unit != 'B' else f"{count} B"
+        count /= 1024
+
+class TransferDialog(QDialog):
+    # The transfer runs on a worker thread; the dialog polls its progress on a timer
+    def __init__(self, transfer, direction, source, destination, parent=None, poll_ms=250):
+        super().__init__(parent)
+        from connections.sftp_transfer import TransferProgress
+        self.setWindowTitle("Upload" if direction == 'upload' else "Download")
+        self.setMinimumWidth(450)
+        self.transfer = transfer
+        self.direction = direction
+        self.source = source
+        self.destination = destination
+        self.progress = TransferProgress()
+
+        self.layout = QVBoxLayout(self)
+        self.path_label = QLabel(f"{source}\n→ {destination}")
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setRange(0, 1000)
+        self.status_label = QLabel("Starting...")
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_transfer)
+
+        self.layout.addWidget(self.path_label)
+        self.layout.addWidget(self.progress_bar)
+        self.layout.addWidget(self.status_label)
+        self.layout.addWidget(self.cancel_button)
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(poll_ms)
+        self.poll_timer.timeout.connect(self.update_progress)
+
+        self.worker = threading.Thread(target=self._run, name='sftp-transfer', daemon=True)
+
+    def start(self):
+        self.worker.start()
+        self.poll_timer.start()
+        self.show()
+
+    def _run(self):
+        try:
+            if self.direction == 'upload':
+                self.transfer.upload(self.source, self.destination, self.progress)
+            else:
+                self.transfer.download(self.source, self.destination, self.progress)
+        except Exception as e:
+            self.progress.error = e
+
+    def update_progress(self):
+        progress = self.progress
+        if progress.total:
+            self.progress_bar.setValue(int(progress.transferred * 1000 / progress.total))
+        status = f"{format_bytes(progress.transferred)} of {format_bytes(progress.total)}"
+        status += f"  -  {format_bytes(progress.rate())}/s over {progress.channels} channel(s)"
+        if progress.resumed_from:
+            status += f"\nResumed at {format_bytes(progress.resumed_from)}"
+        self.status_label.setText(status)
+        if self.worker.is_alive():
+            return
+        self.poll_timer.stop()
+        self.cancel_button.setText("Close")
+        self.cancel_button.clicked.disconnect()
+        self.cancel_button.clicked.connect(self.accept)
+        if progress.cancelled.is_set():
+            self.status_label.setText(status + "\nCancelled - the partial file will be resumed next time")
+        elif progress.error:
+            self.status_label.setText(status + f"\nFailed: {progress.error}")
+        else:
+            self.progress_bar.setValue(1000)
+            self.status_label.setText(status + "\nDone")
+
+    def cancel_transfer(self):
+        self.progress.cancel()
+        self.cancel_button.setEnabled(False)
+
+    def closeEvent(self, event):
+        # Closing the window stops the transfer; what finished so far stays resumable
+        self.progress.cancel()
+        super().closeEvent(event)
@@ -0,0 +1,67 @@
+# gui/transport_tuner.py
+
+import collections
+import threading
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+class TransportTuner(QObject):
+    # Calibrations run one host at a time on a worker thread; the results come back
+    # to the GUI thread as signals. drifted may be emitted from any thread.
+    profile_ready = pyqtSignal(str, dict)
+    tuning_failed = pyqtSignal(str, str)
+    drifted = pyqtSignal(object)
+
+    def __init__(self, parent=None, **calibration_options):
+        super().__init__(parent)
+        # The calibrator pulls in paramiko, so it is created on first use
+        self.calibration_options = calibration_options
+        self.calibrator = None
+        self._queue = collections.deque()
+        self._queued = set()
+        self._running = False
+        self._lock = threading.Lock()
+
+    def tune(self, connection_id, ssh_manager):
+        # False if that connection is already waiting or being measured
+        with self._lock:
+            if connection_id in self._queued:
+                return False
+            self._queued.add(connection_id)
+            self._queue.append((connection_id, ssh_manager))
+            if self._running:
+                return True
+            self._running = True
+        threading.Thread(target=self._run, name='transport-tuner', daemon=True).start()
+        return True
+
+    def is_tuning(self, connection_id):
+        return connection_id in self._queued
+
+    def _run(self):
+        finished = False
+        try:
+            import paramiko
+            from connections.transport_tuning import TransportCalibrator
+            if self.calibrator is None:
+                self.calibrator = TransportCalibrator(**self.calibration_options)
+            while True:
+                with self._lock:
+                    if not self._queue:
+                        self._running = False
+                        finished = True
+                        return
+                    connection_id, ssh_manager = self._queue.popleft()
+                try:
+                    profile, _ = self.calibrator.calibrate(ssh_manager)
+                    self.profile_ready.emit(connection_id, profile.to_dict())
+                except (paramiko.SSHException, OSError, EOFError) as e:
+                    self.tuning_failed.emit(connection_id, str(e))
+                finally:
+                    with self._lock:
+                        self._queued.discard(connection_id)
+        finally:
+            if not finished:
+                # Stopped by an unexpected error; the next tune() starts a new worker
+                with self._lock:
+                    self._running = False
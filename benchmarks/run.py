@@ -0,0 +1,722 @@
+# benchmarks/run.py
+#
+# Headless benchmarks for the hot paths, against local stand-in servers only:
+#
+#   python -m benchmarks.run --output results.json
+#   python -m benchmarks.run --only connect sftp --sizes 1000 10000
+#
+# Results are printed (or written) as one JSON document so runs can be diffed
+# across versions.
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The GUI package lives under assets/ and is imported as gui.*
+for path in (ROOT, os.path.join(ROOT, 'assets')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+BENCHMARKS = ['connect', 'dns', 'session_reuse', 'fanout', 'bastion', 'sftp', 'forwarding', 'winrm', 'inventory', 'import', 'sync', 'memory', 'tuning']
+
+
+def timings(samples):
+    samples = sorted(samples)
+    return {
+        'count': len(samples),
+        'mean_ms': statistics.mean(samples) * 1000,
+        'p50_ms': samples[len(samples) // 2] * 1000,
+        'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+        'min_ms': samples[0] * 1000,
+        'max_ms': samples[-1] * 1000,
+    }
+
+
+def rss_bytes():
+    # Current resident set size where /proc exists, peak RSS otherwise
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def new_pool():
+    from connections.ssh_pool import SSHTransportPool
+    return SSHTransportPool(known_hosts_file=os.devnull)
+
+
+def bench_connect(server, iterations):
+    # Full handshake every time: a fresh pool per connect
+    from connections.connect_metrics import get_default_metrics
+    from connections.ssh_connection import SSHConnectionManager
+    samples = []
+    for _ in range(iterations):
+        pool = new_pool()
+        manager = SSHConnectionManager('127.0.0.1', 'bench', 'bench', port=server.port, pool=pool)
+        started = time.perf_counter()
+        if not manager.connect():
+            raise RuntimeError('connect to the stand-in server failed')
+        samples.append(time.perf_counter() - started)
+        pool.close_all()
+    phases = {
+        row['phase']: {'p50_ms': row['p50'] * 1000, 'p95_ms': row['p95'] * 1000}
+        for row in get_default_metrics().summary()
+        if row['host'] == '127.0.0.1' and row['protocol'] == 'SSH' and row['p50'] is not None
+    }
+    return {'connect': timings(samples), 'phases': phases}
+
+
+def bench_dns(server, hosts, delay):
+    # First connects to hosts behind a slow DNS server, resolved on demand and then
+    # prefetched. Each name has an AAAA record nothing listens on, so the connect
+    # also races IPv6 against IPv4.
+    from benchmarks.stand_in_servers import StubLookup
+    from connections.resolver import Resolver
+    from connections.ssh_pool import SSHTransportPool
+    names = [f'host{i}.bench.internal' for i in range(hosts)]
+    results = {'hosts': hosts, 'dns_delay_ms': delay * 1000}
+    for run in ('on_demand', 'prefetched'):
+        lookup = StubLookup({name: ['::1', '127.0.0.1'] for name in names}, delay)
+        resolver = Resolver(lookup=lookup)
+        pool = SSHTransportPool(known_hosts_file=os.devnull, resolver=resolver)
+        if run == 'prefetched':
+            resolver.prefetch(names).join()
+        samples = []
+        for name in names:
+            started = time.perf_counter()
+            pool.get_transport(name, server.port, 'bench', 'bench')
+            samples.append(time.perf_counter() - started)
+        pool.close_all()
+        results[run] = dict(timings(samples), queries=lookup.queries)
+    return results
+
+
+def bench_session_reuse(server, iterations):
+    # Command round trips over one pooled transport versus a new transport each time
+    from connections.ssh_connection import SSHConnectionManager
+    pool = new_pool()
+    manager = SSHConnectionManager('127.0.0.1', 'bench', 'bench', port=server.port, pool=pool)
+    manager.connect()
+    reused = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        manager.exec_command('true')
+        reused.append(time.perf_counter() - started)
+    pool.close_all()
+    fresh = []
+    for _ in range(iterations):
+        pool = new_pool()
+        manager = SSHConnectionManager('127.0.0.1', 'bench', 'bench', port=server.port, pool=pool)
+        started = time.perf_counter()
+        manager.exec_command('true')
+        fresh.append(time.perf_counter() - started)
+        pool.close_all()
+    return {'reused': timings(reused), 'fresh': timings(fresh)}
+
+
+def bench_fanout(server, hosts, workers):
+    # One transport per host: every fake host logs in as its own user
+    from connections.command_fanout import CommandFanout
+    connections = [
+        {'name': f'host{i}', 'host': '127.0.0.1', 'port': server.port, 'username': f'user{i}', 'password': 'bench'}
+        for i in range(hosts)
+    ]
+    lines = []
+    results = {}
+    for label in ('cold', 'warm'):
+        fanout = CommandFanout(max_workers=workers, pool=results.get('pool') or new_pool())
+        results['pool'] = fanout.pool
+        started = time.perf_counter()
+        host_results = fanout.run(connections, 'uptime', lambda name, line: lines.append(line))
+        elapsed = time.perf_counter() - started
+        failed = sum(1 for result in host_results if result.error or result.exit_status)
+        results[label] = {
+            'hosts': hosts,
+            'failed': failed,
+            'seconds': elapsed,
+            'hosts_per_second': hosts / elapsed,
+            'lines_per_second': len(lines) / elapsed,
+        }
+        lines.clear()
+    results.pop('pool').close_all()
+    return dict(results, workers=workers)
+
+
+def bench_bastion(server, hosts, workers):
+    # Fan-out to hosts that are only reachable through a jump host; the stand-in
+    # server plays both the bastion and the targets
+    from connections.command_fanout import CommandFanout
+    bastion = {'hostname': '127.0.0.1', 'port': server.port, 'username': 'bastion', 'password': 'bench'}
+    connections = [
+        {'name': f'host{i}', 'host': '127.0.0.1', 'port': server.port, 'username': f'user{i}',
+         'password': 'bench', 'jump_hosts': [bastion]}
+        for i in range(hosts)
+    ]
+    handshakes = server.handshakes
+    fanout = CommandFanout(max_workers=workers, pool=new_pool())
+    started = time.perf_counter()
+    host_results = fanout.run(connections, 'uptime', lambda name, line: None)
+    elapsed = time.perf_counter() - started
+    fanout.pool.close_all()
+    return {
+        'hosts': hosts,
+        'workers': workers,
+        'failed': sum(1 for result in host_results if result.error or result.exit_status),
+        'seconds': elapsed,
+        'hosts_per_second': hosts / elapsed,
+        # hosts + 1 when every target shares one bastion transport
+        'handshakes': server.handshakes - handshakes,
+    }
+
+
+def bench_sftp(server, root, size_mb):
+    from connections.sftp_transfer import SFTPTransfer
+    from connections.ssh_connection import SSHConnectionManager
+    source = os.path.join(root, 'source.bin')
+    with open(source, 'wb') as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(1024 * 1024))
+    pool = new_pool()
+    manager = SSHConnectionManager('127.0.0.1', 'bench', 'bench', port=server.port, pool=pool)
+    state_dir = os.path.join(root, 'transfers')
+    results = {'size_mb': size_mb}
+    for channels in (1, 4):
+        transfer = SFTPTransfer(manager, channels=channels, parallel_threshold=1, state_dir=state_dir)
+        for direction in ('download', 'upload'):
+            target = os.path.join(root, f'{direction}-{channels}.bin')
+            started = time.perf_counter()
+            if direction == 'download':
+                transfer.download('source.bin', target)
+            else:
+                transfer.upload(source, f'{direction}-{channels}.bin')
+            elapsed = time.perf_counter() - started
+            results[f'{direction}_{channels}ch_mb_per_s'] = size_mb / elapsed
+            os.remove(target)
+    pool.close_all()
+    return results
+
+
+def echo_server():
+    # Local TCP echo endpoint for tunnel traffic
+    import socket
+    import threading
+    listener = socket.create_server(('127.0.0.1', 0))
+    listener.listen(512)
+
+    def serve(sock):
+        with sock:
+            while True:
+                data = sock.recv(65536)
+                if not data:
+                    break
+                sock.sendall(data)
+
+    def accept_loop():
+        while True:
+            try:
+                sock, _ = listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=serve, args=(sock,), daemon=True).start()
+
+    threading.Thread(target=accept_loop, name='echo', daemon=True).start()
+    return listener
+
+
+def bench_forwarding(server, tunnels, size_mb):
+    # Concurrent tunnels through one -L and one -R forward, every byte echoed back
+    import socket
+    import threading
+    from connections.port_forwarding import ForwardingEngine, parse_forward
+    from connections.ssh_connection import SSHConnectionManager
+    echo = echo_server()
+    pool = new_pool()
+    manager = SSHConnectionManager('127.0.0.1', 'bench', 'bench', port=server.port, pool=pool)
+    manager.connect()
+    engine = ForwardingEngine()
+    payload = os.urandom(size_mb * 1024 * 1024)
+    echo_port = echo.getsockname()[1]
+    forwards = {
+        'local': engine.add_local(parse_forward(f'L 127.0.0.1:0:127.0.0.1:{echo_port}'), manager.open_channel),
+        'remote': engine.add_remote(parse_forward(f'R 127.0.0.1:0:127.0.0.1:{echo_port}'), manager.transport),
+    }
+
+    def client(port, failures):
+        with socket.create_connection(('127.0.0.1', port)) as sock:
+            writer = threading.Thread(target=lambda: (sock.sendall(payload), sock.shutdown(socket.SHUT_WR)))
+            writer.start()
+            received = bytearray()
+            while True:
+                data = sock.recv(65536)
+                if not data:
+                    break
+                received += data
+            writer.join()
+        if received != payload:
+            failures.append(port)
+
+    results = {'tunnels': tunnels, 'mb_per_tunnel': size_mb}
+    for name, forward in forwards.items():
+        failures = []
+        clients = [threading.Thread(target=client, args=(forward.bound_port, failures)) for _ in range(tunnels)]
+        started = time.perf_counter()
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        results[name] = {
+            'failed': len(failures),
+            'seconds': elapsed,
+            # Both directions of every tunnel
+            'mb_per_s': 2 * tunnels * size_mb / elapsed,
+            'forwarded_bytes': forward.bytes_in + forward.bytes_out,
+        }
+    # Everything above ran on the engine's one loop thread plus its connect workers
+    results['engine_threads'] = sum(
+        1 for thread in threading.enumerate() if thread.name.startswith(('port-forwarding', 'forward-connect'))
+    )
+    engine.stop()
+    pool.close_all()
+    echo.close()
+    return results
+
+
+def bench_winrm(iterations, hosts, workers):
+    from benchmarks.stand_in_servers import StubWinRMServer
+    import winrm
+    server = StubWinRMServer()
+    server.start()
+    try:
+        session = winrm.Session(server.endpoint, auth=('bench', 'bench'), transport='plaintext')
+        per_command = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            result = session.run_cmd('hostname')
+            per_command.append(time.perf_counter() - started)
+            if result.status_code != 0:
+                raise RuntimeError('stub WinRM command failed')
+        # One shell kept open for all commands, as a pooled backend would
+        protocol = session.protocol
+        shell_id = protocol.open_shell()
+        reused = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            command_id = protocol.run_command(shell_id, 'hostname')
+            protocol.get_command_output(shell_id, command_id)
+            protocol.cleanup_command(shell_id, command_id)
+            reused.append(time.perf_counter() - started)
+        protocol.close_shell(shell_id)
+        # The pooled backend, then a folder fan-out across many Windows "hosts"
+        from connections.command_fanout import CommandFanout
+        from connections.winrm_connection import WinRMConnectionManager, WinRMShellPool
+        pool = WinRMShellPool(transport='plaintext')
+        manager = WinRMConnectionManager('127.0.0.1', 'bench', 'bench', port=server.port, pool=pool)
+        pooled = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            manager.exec_command('hostname')
+            pooled.append(time.perf_counter() - started)
+        connections = [
+            {'name': f'win{i}', 'host': '127.0.0.1', 'port': server.port, 'username': f'user{i}',
+             'password': 'bench', 'connection_type': 'WinRM'}
+            for i in range(hosts)
+        ]
+        fanout = CommandFanout(max_workers=workers, winrm_pool=pool)
+        fanout_results = {}
+        for run in ('cold', 'warm'):
+            started = time.perf_counter()
+            host_results = fanout.run(connections, 'hostname', lambda name, line: None)
+            elapsed = time.perf_counter() - started
+            fanout_results[run] = {
+                'failed': sum(1 for result in host_results if result.error or result.exit_status),
+                'seconds': elapsed,
+                'hosts_per_second': hosts / elapsed,
+            }
+        pool.close_all()
+        return {
+            'shell_per_command': timings(per_command),
+            'shared_shell': timings(reused),
+            'pooled_shell': timings(pooled),
+            'fanout': dict(fanout_results, hosts=hosts, workers=workers),
+        }
+    finally:
+        server.stop()
+
+
+def make_inventory(size, folder_size=100):
+    # Folders of folder_size connections, nested two levels deep
+    import uuid
+    connections = []
+    for start in range(0, size, folder_size * 10):
+        group = {'id': uuid.uuid4().hex, 'name': f'region-{start // (folder_size * 10)}', 'type': 'folder', 'children': []}
+        for folder_start in range(start, min(size, start + folder_size * 10), folder_size):
+            folder = {'id': uuid.uuid4().hex, 'name': f'rack-{folder_start // folder_size}', 'type': 'folder', 'children': []}
+            for i in range(folder_start, min(size, folder_start + folder_size)):
+                folder['children'].append({
+                    'id': uuid.uuid4().hex,
+                    'type': 'connection',
+                    'name': f'server-{i:06d}',
+                    # A handful of distinct targets keeps the startup health sweep cheap
+                    'host': f'127.0.0.{1 + i % 8}',
+                    'port': 22,
+                    'username': f'admin{i % 50}',
+                    'password': '',
+                    'connection_type': 'SSH',
+                    'ssh_options': [],
+                    'tags': f'rack-{folder_start // folder_size} prod',
+                })
+            group['children'].append(folder)
+        connections.append(group)
+    return {'sequence': 0, 'connections': connections}
+
+
+def bench_inventory(size):
+    # Runs in its own process (see run_inventory) so RSS is not skewed by earlier runs
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    from connections.connections_manager import ConnectionManager
+    from gui.main_window import MainWindow
+    from utils.log_manager import LogManager
+    from utils.settings_manager import SettingsManager
+
+    class TimedMainWindow(MainWindow):
+        def load_connections(self):
+            started = time.perf_counter()
+            super().load_connections()
+            self.load_connections_seconds = time.perf_counter() - started
+
+    with open('connections.json', 'w') as f:
+        json.dump(make_inventory(size), f)
+    settings = SettingsManager('app_settings.json')
+    settings.settings['license_accepted'] = True
+    log_manager = LogManager('logs/app.log')
+
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    connection_manager = ConnectionManager('connections.json')
+    store_loaded = time.perf_counter()
+    window = TimedMainWindow(log_manager, settings, connection_manager)
+    load_finished = time.perf_counter()
+    # The search index is built in slices on the event loop; wait for it to finish
+    while window.index_timer.isActive():
+        app.processEvents()
+    indexed = time.perf_counter()
+    result = {
+        'entries': size,
+        'store_load_ms': (store_loaded - started) * 1000,
+        'main_window_ms': (load_finished - store_loaded) * 1000,
+        'load_connections_ms': window.load_connections_seconds * 1000,
+        'search_index_ms': (indexed - load_finished) * 1000,
+        'rss_before_mb': rss_before / 1e6,
+        'rss_after_mb': rss_bytes() / 1e6,
+    }
+    window.close()
+    settings.close()
+    log_manager.close()
+    return result
+
+
+def run_inventory(size):
+    with tempfile.TemporaryDirectory() as directory:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.run', '--inventory-child', str(size)],
+            cwd=directory, env=dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.path.join(ROOT, 'assets')])),
+            capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def write_import_sources(directory, hosts):
+    # The same hosts as a CSV with folder paths and as an Ansible INI with nested groups
+    csv_path = os.path.join(directory, 'hosts.csv')
+    ini_path = os.path.join(directory, 'hosts.ini')
+    with open(csv_path, 'w') as f:
+        f.write('name,host,port,user,group\n')
+        for i in range(hosts):
+            f.write(f'node{i:06d},10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255},22,admin{i % 50},'
+                    f'region-{i // 10000}/rack-{i // 100}\n')
+    with open(ini_path, 'w') as f:
+        for rack in range(0, hosts, 100):
+            f.write(f'[rack-{rack // 100}]\n')
+            f.write(f'node[{rack:06d}:{min(hosts, rack + 100) - 1:06d}] ansible_user=admin\n')
+        for region in range(0, hosts, 10000):
+            f.write(f'[region-{region // 10000}:children]\n')
+            f.write(''.join(f'rack-{rack // 100}\n' for rack in range(region, min(hosts, region + 10000), 100)))
+    return {'csv': csv_path, 'ini': ini_path}
+
+
+def bench_import(hosts):
+    # Runs in its own process (see run_import) so RSS reflects only the import
+    from connections.connections_manager import ConnectionManager
+    from connections.inventory_import import InventoryImporter
+    sources = write_import_sources(os.getcwd(), hosts)
+    results = {'hosts': hosts}
+    for file_format, path in sources.items():
+        connection_manager = ConnectionManager(f'connections-{file_format}.json')
+        importer = InventoryImporter(connection_manager)
+        runs = {}
+        for run in ('first', 'reimport'):
+            sequence = connection_manager.sequence
+            rss_before = rss_bytes()
+            started = time.perf_counter()
+            result = importer.import_file(path)
+            runs[run] = {
+                'seconds': time.perf_counter() - started,
+                'added': result.added,
+                'unchanged': result.unchanged,
+                'writes': connection_manager.sequence - sequence,
+                'rss_growth_mb': (rss_bytes() - rss_before) / 1e6,
+            }
+        connection_manager.close()
+        results[file_format] = runs
+    results['rss_mb'] = rss_bytes() / 1e6
+    return results
+
+
+def run_import(hosts):
+    with tempfile.TemporaryDirectory() as directory:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.run', '--import-child', str(hosts)],
+            cwd=directory, env=dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.path.join(ROOT, 'assets')])),
+            capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def bench_sync(size, edits=10):
+    # Picking up edits another process made to a shared connections.json: appended to
+    # its journal, or compacted into a rewritten snapshot, against a full reload
+    from connections.connections_manager import ConnectionManager
+    from gui.connection_model import ConnectionTreeModel
+    results = {'entries': size, 'edits': edits}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'connections.json')
+        with open(path, 'w') as f:
+            json.dump(make_inventory(size), f)
+        connection_manager = ConnectionManager(path)
+        model = ConnectionTreeModel(connection_manager)
+        for run in ('journal', 'snapshot'):
+            other = ConnectionManager(path)
+            for connection in list(other.iter_connections())[::size // edits][:edits]:
+                other.update_item(connection['id'], {'username': f'{run}-edit'})
+            if run == 'snapshot':
+                other.save_connections()
+            other.journal.close()
+            started = time.perf_counter()
+            changes = connection_manager.external_changes()
+            connection_manager.apply_external(changes, model.record_about_to_apply, model.record_applied)
+            results[f'{run}_sync_ms'] = (time.perf_counter() - started) * 1000
+            results[f'{run}_records'] = len(changes.records)
+        started = time.perf_counter()
+        connection_manager.load_connections()
+        model.reload()
+        results['full_reload_ms'] = (time.perf_counter() - started) * 1000
+        connection_manager.close()
+    return results
+
+
+def bench_memory(size):
+    # Python heap held per connection once connections.json is loaded: as plain
+    # dicts (the layout before ConnectionRecord) and as the record store. Overhead
+    # is what is left after the id, name and host strings every layout has to keep.
+    import gc
+    import tracemalloc
+    from connections.connections_manager import ConnectionManager
+    from connections.records import to_json
+    inventory = make_inventory(size)
+    connections = [connection for region in inventory['connections']
+                   for rack in region['children'] for connection in rack['children']]
+    for connection in connections:
+        # The fields the connection dialog saves as well
+        connection.update(key_file='', use_agent=False, proxy_jump='', port_forwards=[], open_browser=False)
+    payload = sum(sys.getsizeof(connection[field]) for connection in connections for field in ('id', 'name', 'host'))
+
+    def load_dicts(path):
+        with open(path) as f:
+            connections = json.load(f)['connections']
+        items, parents = {}, {}
+        stack = [(item, None) for item in connections]
+        while stack:
+            item, parent_id = stack.pop()
+            items[item['id']] = item
+            parents[item['id']] = parent_id
+            stack.extend((child, item['id']) for child in item.get('children', ()))
+        return connections, items, parents
+
+    results = {'entries': size, 'payload_bytes_per_connection': payload / size}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'connections.json')
+        with open(path, 'w') as f:
+            json.dump(inventory, f)
+        del inventory, connections
+        for layout in ('dicts', 'records'):
+            gc.collect()
+            tracemalloc.start()
+            if layout == 'dicts':
+                connections, items, parents = load_dicts(path)
+            else:
+                connection_manager = ConnectionManager(path)
+                connections = connection_manager.connections
+            gc.collect()
+            held = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            started = time.perf_counter()
+            json.dumps({'sequence': 0, 'connections': connections}, separators=(',', ':'), default=to_json)
+            results[layout] = {
+                'bytes_per_connection': held / size,
+                'overhead_bytes_per_connection': (held - payload) / size,
+                'serialize_ms': (time.perf_counter() - started) * 1000,
+            }
+            if layout == 'dicts':
+                del items, parents
+            else:
+                connection_manager.close()
+                del connection_manager
+            del connections
+    return results
+
+
+def bench_tuning(server, duration, latency, bandwidth):
+    # Calibrates against the stand-in server directly (LAN) and through a relay that
+    # adds latency and caps bandwidth (WAN), then compares pooled transports opened
+    # with paramiko's defaults and with the chosen profile
+    from benchmarks.stand_in_servers import SlowLink
+    from connections.ssh_connection import SSHConnectionManager
+    from connections.ssh_pool import SSHTransportPool
+    from connections.transport_tuning import TransportCalibrator, TransportProfiles
+    link = SlowLink(server.port, latency, bandwidth)
+    link.start()
+    calibrator = TransportCalibrator(duration=duration)
+    results = {'duration_s': duration, 'wan_latency_ms': latency * 1000, 'wan_bandwidth_mb_per_s': bandwidth / 1e6}
+    try:
+        for name, port in (('lan', server.port), ('wan', link.port)):
+            pool = SSHTransportPool(known_hosts_file=os.devnull, profiles=TransportProfiles())
+            manager = SSHConnectionManager('127.0.0.1', 'bench', 'bench', port=port, pool=pool)
+            started = time.perf_counter()
+            best, candidates = calibrator.calibrate(manager)
+            result = {
+                'calibration_s': time.perf_counter() - started,
+                'candidates': [candidate.to_dict() for candidate in candidates],
+                'chosen': best.describe(),
+            }
+            key = pool.make_key('127.0.0.1', port, 'bench')
+            for label in ('default', 'tuned'):
+                if label == 'tuned':
+                    pool.close(key)
+                    pool.profiles.set(key, best)
+                transport = pool.get_transport('127.0.0.1', port, 'bench', 'bench')
+                result[f'{label}_mb_per_s'] = calibrator.download(transport) / 1e6
+                result[f'{label}_negotiated'] = f"{transport.local_cipher}, {transport.local_compression}"
+            pool.close_all()
+            results[name] = result
+    finally:
+        link.stop()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the headless benchmark suite.')
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000])
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--fanout-hosts', type=int, default=200)
+    parser.add_argument('--fanout-workers', type=int, default=32)
+    parser.add_argument('--sftp-mb', type=int, default=64)
+    parser.add_argument('--dns-hosts', type=int, default=20)
+    parser.add_argument('--dns-delay', type=float, default=0.5, help='seconds per stub DNS query')
+    parser.add_argument('--tunnels', type=int, default=50)
+    parser.add_argument('--tunnel-mb', type=int, default=2)
+    parser.add_argument('--import-hosts', type=int, default=100000)
+    parser.add_argument('--sync-entries', type=int, default=40000)
+    parser.add_argument('--memory-entries', type=int, default=100000)
+    parser.add_argument('--tune-seconds', type=float, default=1.0, help='seconds per calibration candidate')
+    parser.add_argument('--wan-latency', type=float, default=0.05, help='one-way seconds added by the WAN relay')
+    parser.add_argument('--wan-mb', type=float, default=4, help='MB/s the WAN relay passes each way')
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    parser.add_argument('--inventory-child', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--import-child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.inventory_child:
+        print(json.dumps(bench_inventory(args.inventory_child)))
+        return
+    if args.import_child:
+        print(json.dumps(bench_import(args.import_child)))
+        return
+
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': {},
+    }
+    try:
+        results['commit'] = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        pass
+
+    with tempfile.TemporaryDirectory() as root:
+        server = None
+        if set(args.only) & {'connect', 'dns', 'session_reuse', 'fanout', 'bastion', 'sftp', 'forwarding', 'tuning'}:
+            from benchmarks.stand_in_servers import StandInSSHServer
+            server = StandInSSHServer(root)
+            server.start()
+        try:
+            for name in args.only:
+                print(f"running {name}...", file=sys.stderr)
+                if name == 'connect':
+                    results['results'][name] = bench_connect(server, args.iterations)
+                elif name == 'dns':
+                    results['results'][name] = bench_dns(server, args.dns_hosts, args.dns_delay)
+                elif name == 'session_reuse':
+                    results['results'][name] = bench_session_reuse(server, args.iterations)
+                elif name == 'fanout':
+                    results['results'][name] = bench_fanout(server, args.fanout_hosts, args.fanout_workers)
+                elif name == 'bastion':
+                    results['results'][name] = bench_bastion(server, args.fanout_hosts, args.fanout_workers)
+                elif name == 'sftp':
+                    results['results'][name] = bench_sftp(server, root, args.sftp_mb)
+                elif name == 'forwarding':
+                    results['results'][name] = bench_forwarding(server, args.tunnels, args.tunnel_mb)
+                elif name == 'winrm':
+                    results['results'][name] = bench_winrm(args.iterations, args.fanout_hosts, args.fanout_workers)
+                elif name == 'inventory':
+                    results['results'][name] = {str(size): run_inventory(size) for size in args.sizes}
+                elif name == 'import':
+                    results['results'][name] = run_import(args.import_hosts)
+                elif name == 'sync':
+                    results['results'][name] = bench_sync(args.sync_entries)
+                elif name == 'memory':
+                    results['results'][name] = bench_memory(args.memory_entries)
+                elif name == 'tuning':
+                    results['results'][name] = bench_tuning(
+                        server, args.tune_seconds, args.wan_latency, int(args.wan_mb * 1e6)
+                    )
+        finally:
+            if server:
+                server.stop()
+
+    data = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(data + '\n')
+    else:
+        print(data)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,441 @@
+# benchmarks/stand_in_servers.py
+
+import base64
+import os
+import queue
+import re
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import paramiko
+from paramiko import SFTPAttributes, SFTPHandle, SFTPServer, SFTPServerInterface, SFTP_OK, SFTP_FAILURE
+
+
+class _Handle(SFTPHandle):
+    def stat(self):
+        return SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+    def chattr(self, attr):
+        if attr.st_size is not None:
+            self.writefile.truncate(attr.st_size)
+        return SFTP_OK
+
+
+class _SFTPRoot(SFTPServerInterface):
+    # Serves the local filesystem below the server's root directory
+    def __init__(self, server, *args, **kwargs):
+        super().__init__(server, *args, **kwargs)
+        self.root = server.root
+
+    def _path(self, path):
+        return os.path.join(self.root, os.path.normpath('/' + path).lstrip('/'))
+
+    def stat(self, path):
+        try:
+            return SFTPAttributes.from_stat(os.stat(self._path(path)))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    lstat = stat
+
+    def open(self, path, flags, attr):
+        try:
+            fd = os.open(self._path(path), flags, 0o644)
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        if flags & os.O_RDWR:
+            mode = 'r+b'
+        elif flags & os.O_WRONLY:
+            mode = 'ab' if flags & os.O_APPEND else 'wb'
+        else:
+            mode = 'rb'
+        handle = _Handle(flags)
+        handle.filename = path
+        handle.readfile = handle.writefile = os.fdopen(fd, mode)
+        return handle
+
+    def remove(self, path):
+        try:
+            os.remove(self._path(path))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    def rename(self, oldpath, newpath):
+        if os.path.exists(self._path(newpath)):
+            return SFTP_FAILURE
+        os.rename(self._path(oldpath), self._path(newpath))
+        return SFTP_OK
+
+    def posix_rename(self, oldpath, newpath):
+        os.replace(self._path(oldpath), self._path(newpath))
+        return SFTP_OK
+
+    def chattr(self, path, attr):
+        if attr.st_size is not None:
+            os.truncate(self._path(path), attr.st_size)
+        return SFTP_OK
+
+
+class _SSHServer(paramiko.ServerInterface):
+    # Accepts any password or key; exec requests print a fixed number of lines and exit 0
+    def __init__(self, owner):
+        self.owner = owner
+        self.root = owner.root
+        self.forwards = {}
+
+    def get_allowed_auths(self, username):
+        return 'password,publickey'
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_auth_publickey(self, username, key):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED_OPEN_FAILED
+
+    def check_channel_direct_tcpip_request(self, chanid, origin, destination):
+        # Acts as a bastion: the accepted channel is piped to destination
+        self.forwards[chanid] = destination
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_port_forward_request(self, address, port):
+        # ssh -R: listen here and open a forwarded-tcpip channel back for every connection
+        listener = socket.create_server((address, port))
+        self.owner._listeners.append(listener)
+        threading.Thread(target=self.owner._remote_forward_loop, args=(self.transport, listener), daemon=True).start()
+        return listener.getsockname()[1]
+
+    def cancel_port_forward_request(self, address, port):
+        for listener in list(self.owner._listeners):
+            if listener.getsockname()[1] == port:
+                self.owner._listeners.remove(listener)
+                listener.close()
+
+    def check_channel_exec_request(self, channel, command):
+        threading.Thread(target=self.owner.run_command, args=(channel, command), daemon=True).start()
+        return True
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        threading.Thread(target=self.owner.run_command, args=(channel, b'shell'), daemon=True).start()
+        return True
+
+
+class StandInSSHServer:
+    # A local paramiko server for benchmarks: password and key auth, exec, shell,
+    # SFTP, direct-tcpip forwarding (so it can also stand in for a bastion) and
+    # remote port forwards
+    def __init__(self, root, output_lines=10, host_key_bits=2048, close_timeout=30):
+        self.root = root
+        self.output_lines = output_lines
+        self.close_timeout = close_timeout
+        self.host_key = paramiko.RSAKey.generate(host_key_bits)
+        self.port = None
+        self._socket = None
+        self._transports = []
+        self._listeners = []
+        self._pipe_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.handshakes = 0
+
+    def start(self):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(('127.0.0.1', 0))
+        self._socket.listen(256)
+        self.port = self._socket.getsockname()[1]
+        threading.Thread(target=self._accept_loop, name='stand-in-ssh', daemon=True).start()
+        return self.port
+
+    def stop(self):
+        self._stopped.set()
+        self._socket.close()
+        for transport in self._transports:
+            transport.close()
+        for listener in self._listeners:
+            listener.close()
+
+    def _accept_loop(self):
+        while not self._stopped.is_set():
+            try:
+                client, _ = self._socket.accept()
+            except OSError:
+                return
+            transport = paramiko.Transport(client)
+            transport.add_server_key(self.host_key)
+            # Offered like OpenSSH does; clients still get none unless they ask
+            transport.use_compression(True)
+            transport.set_subsystem_handler('sftp', SFTPServer, _SFTPRoot)
+            self._transports.append(transport)
+            self.handshakes += 1
+            server = _SSHServer(self)
+            server.transport = transport
+            try:
+                transport.start_server(server=server)
+            except (paramiko.SSHException, EOFError, OSError):
+                # Clients that only probe the port (health checks, RDP timing) hang up early
+                transport.close()
+                continue
+            threading.Thread(target=self._forward_loop, args=(transport, server), daemon=True).start()
+
+    def _forward_loop(self, transport, server):
+        # accept() also hands out session channels (exec, shell, SFTP). paramiko only
+        # holds channels weakly, so those are kept here until they close; dropping
+        # them would let them be collected, and closed, under their handlers.
+        sessions = set()
+        while transport.is_active():
+            channel = transport.accept(1)
+            sessions = {session for session in sessions if not session.closed}
+            if channel is None:
+                continue
+            if channel.get_id() not in server.forwards:
+                sessions.add(channel)
+                continue
+            try:
+                sock = socket.create_connection(server.forwards.pop(channel.get_id()), timeout=5)
+            except OSError:
+                channel.close()
+                continue
+            sock.settimeout(None)
+            threading.Thread(target=self._pipe, args=(channel.recv, sock.sendall, sock, channel), daemon=True).start()
+            threading.Thread(target=self._pipe, args=(sock.recv, channel.sendall, sock, channel), daemon=True).start()
+
+    def _remote_forward_loop(self, transport, listener):
+        address, port = listener.getsockname()[:2]
+        while transport.is_active():
+            try:
+                sock, origin = listener.accept()
+            except OSError:
+                return
+            try:
+                channel = transport.open_forwarded_tcpip_channel(origin[:2], (address, port))
+            except paramiko.SSHException:
+                sock.close()
+                continue
+            threading.Thread(target=self._pipe, args=(channel.recv, sock.sendall, sock, channel), daemon=True).start()
+            threading.Thread(target=self._pipe, args=(sock.recv, channel.sendall, sock, channel), daemon=True).start()
+
+    def _pipe(self, receive, send, sock, channel):
+        # Copies one direction; EOF is passed on as a half-close, and whichever
+        # direction ends last closes both ends
+        try:
+            while True:
+                data = receive(65536)
+                if not data:
+                    break
+                send(data)
+            if receive == channel.recv:
+                sock.shutdown(socket.SHUT_WR)
+            else:
+                channel.shutdown_write()
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self._pipe_lock:
+                finished = getattr(channel, 'pipes_finished', 0) + 1
+                channel.pipes_finished = finished
+            if finished == 2 or channel.closed:
+                channel.close()
+                sock.close()
+
+    def run_command(self, channel, command):
+        # paramiko sends the exec reply only after check_channel_exec_request returns,
+        # and a channel closed before that fails the client's exec with "Channel closed".
+        # So output, exit status and EOF go out at once, but the client closes first.
+        try:
+            if b'seed=' in command:
+                # The transport calibration's source command: read a sample to EOF, then
+                # repeat it until the client closes the channel
+                seed = b''
+                while True:
+                    data = channel.recv(65536)
+                    if not data:
+                        break
+                    seed += data
+                while not channel.closed:
+                    channel.sendall(seed)
+                return
+            line = b'output of ' + command + b'\n'
+            channel.sendall(line * self.output_lines)
+            channel.send_exit_status(0)
+            channel.shutdown_write()
+            channel.settimeout(self.close_timeout)
+            while channel.recv(65536):
+                pass
+        except (EOFError, OSError):
+            pass
+        finally:
+            channel.close()
+
+
+class SlowLink:
+    # A TCP relay to a local port that adds one-way latency and caps bandwidth in
+    # each direction, so a local server can stand in for a host across a WAN
+    def __init__(self, target_port, latency=0.05, bandwidth=8 * 1024 * 1024):
+        self.target_port = target_port
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.port = None
+        self._socket = None
+        self._sockets = []
+
+    def start(self):
+        self._socket = socket.create_server(('127.0.0.1', 0))
+        self.port = self._socket.getsockname()[1]
+        threading.Thread(target=self._accept_loop, name='slow-link', daemon=True).start()
+        return self.port
+
+    def stop(self):
+        self._socket.close()
+        for sock in self._sockets:
+            sock.close()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                client, _ = self._socket.accept()
+            except OSError:
+                return
+            upstream = socket.create_connection(('127.0.0.1', self.target_port))
+            self._sockets += [client, upstream]
+            for source, destination in ((client, upstream), (upstream, client)):
+                packets = queue.Queue()
+                threading.Thread(target=self._read, args=(source, packets), daemon=True).start()
+                threading.Thread(target=self._write, args=(destination, packets), daemon=True).start()
+
+    def _read(self, sock, packets):
+        while True:
+            try:
+                data = sock.recv(65536)
+            except OSError:
+                data = b''
+            packets.put((time.monotonic() + self.latency, data))
+            if not data:
+                return
+
+    def _write(self, sock, packets):
+        # Each packet leaves latency after it arrived, and no faster than bandwidth allows
+        try:
+            while True:
+                due, data = packets.get()
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                if not data:
+                    sock.shutdown(socket.SHUT_WR)
+                    return
+                sock.sendall(data)
+                time.sleep(len(data) / self.bandwidth)
+        except OSError:
+            pass
+
+
+class StubLookup:
+    # Stands in for a slow internal DNS server: fixed A/AAAA records, a fixed
+    # delay per query. Pass it as Resolver(lookup=...).
+    def __init__(self, records, delay=0.5):
+        self.records = records
+        self.delay = delay
+        self.queries = 0
+
+    def __call__(self, hostname):
+        self.queries += 1
+        time.sleep(self.delay)
+        if hostname not in self.records:
+            raise socket.gaierror(socket.EAI_NONAME, f'{hostname} not found')
+        return [
+            (socket.AF_INET6, (address, 0, 0, 0)) if ':' in address else (socket.AF_INET, (address, 0))
+            for address in self.records[hostname]
+        ]
+
+
+WSMAN_RESPONSE = (
+    '<s:Envelope xmlns:s="http://www.w3.org/2003/05/soap-envelope" '
+    'xmlns:a="http://schemas.xmlsoap.org/ws/2004/08/addressing" '
+    'xmlns:w="http://schemas.dmtf.org/wbem/wsman/1/wsman.xsd" '
+    'xmlns:rsp="http://schemas.microsoft.com/wbem/wsman/1/windows/shell">'
+    '<s:Header><a:RelatesTo>{relates_to}</a:RelatesTo></s:Header>'
+    '<s:Body>{body}</s:Body></s:Envelope>'
+)
+
+
+class _WinRMHandler(BaseHTTPRequestHandler):
+    # Just enough WS-Management for pywinrm: create shell, command, receive, signal, delete
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        request = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8')
+        action = re.search(r'<a:Action[^>]*>([^<]+)</a:Action>', request).group(1).rsplit('/', 1)[-1]
+        message_id = re.search(r'<a:MessageID>([^<]+)</a:MessageID>', request).group(1)
+        commands = self.server.commands
+        body = ''
+        if action == 'Create':
+            body = f'<w:SelectorSet><w:Selector Name="ShellId">{uuid.uuid4()}</w:Selector></w:SelectorSet>'
+        elif action == 'Command':
+            command_id = str(uuid.uuid4()).upper()
+            command = re.search(r'<rsp:Command>([^<]*)</rsp:Command>', request)
+            commands[command_id] = command.group(1) if command else ''
+            body = f'<rsp:CommandResponse><rsp:CommandId>{command_id}</rsp:CommandId></rsp:CommandResponse>'
+        elif action == 'Receive':
+            command_id = re.search(r'CommandId="([^"]+)"', request).group(1)
+            output = f"output of {commands.pop(command_id, '')}\r\n" * self.server.output_lines
+            stream = base64.b64encode(output.encode('utf-8')).decode('ascii')
+            body = (
+                '<rsp:ReceiveResponse>'
+                f'<rsp:Stream Name="stdout" CommandId="{command_id}">{stream}</rsp:Stream>'
+                f'<rsp:Stream Name="stdout" CommandId="{command_id}" End="true"></rsp:Stream>'
+                f'<rsp:CommandState CommandId="{command_id}" '
+                'State="http://schemas.microsoft.com/wbem/wsman/1/windows/shell/CommandState/Done">'
+                '<rsp:ExitCode>0</rsp:ExitCode></rsp:CommandState>'
+                '</rsp:ReceiveResponse>'
+            )
+        response = WSMAN_RESPONSE.format(relates_to=message_id, body=body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/soap+xml;charset=UTF-8')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _WinRMHTTPServer(ThreadingHTTPServer):
+    # Fan-out benchmarks connect many clients at once
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class StubWinRMServer:
+    # Plain-HTTP WS-Man endpoint at /wsman that answers every command with canned output
+    def __init__(self, output_lines=10):
+        self.output_lines = output_lines
+        self.port = None
+        self._server = None
+
+    def start(self):
+        self._server = _WinRMHTTPServer(('127.0.0.1', 0), _WinRMHandler)
+        self._server.commands = {}
+        self._server.output_lines = self.output_lines
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name='stub-winrm', daemon=True).start()
+        return self.port
+
+    @property
+    def endpoint(self):
+        return f'http://127.0.0.1:{self.port}/wsman'
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,15 @@
+# connections/backends.py
+
+import importlib
+
+# Protocol backends are imported the first time a connection of that type is
+# used, so paramiko and friends stay out of the startup path
+BACKENDS = {
+    'SSH': ('connections.ssh_connection', 'SSHConnectionManager'),
+    'RDP': ('connections.rdp_connection', 'RDPConnectionManager'),
+    'WinRM': ('connections.winrm_connection', 'WinRMConnectionManager'),
+}
+
+def get_backend(connection_type):
+    module_name, class_name = BACKENDS[connection_type]
+    return getattr(importlib.import_module(module_name), class_name)
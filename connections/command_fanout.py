@@ -0,0 +1,160 @@
+# connections/command_fanout.py
+
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import paramiko
+
+from connections.ssh_connection import SSHConnectionManager
+
+
+class HostResult:
+    def __init__(self, name, host, exit_status=None, error='', duration=0.0):
+        self.name = name
+        self.host = host
+        self.exit_status = exit_status
+        self.error = error
+        self.duration = duration
+
+    def describe(self):
+        if self.error:
+            return f"{self.name} ({self.host}): {self.error} after {self.duration:.1f}s"
+        return f"{self.name} ({self.host}): exit {self.exit_status} in {self.duration:.1f}s"
+
+
+class CommandFanout:
+    # Runs one command on many SSH and WinRM hosts at once over pooled transports
+    # and shells, streaming lines as they arrive
+    def __init__(self, max_workers=32, timeout=60, pool=None, winrm_pool=None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.pool = pool
+        self.winrm_pool = winrm_pool
+        self._cancelled = threading.Event()
+        self._thread = None
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def start(self, connections, command, on_output, on_finished):
+        self._cancelled.clear()
+
+        def run():
+            # on_finished always runs, or the caller would wait on this run forever
+            results = []
+            try:
+                results = self.run(connections, command, on_output)
+            finally:
+                on_finished(results)
+        self._thread = threading.Thread(target=run, name='command-fanout', daemon=True)
+        self._thread.start()
+
+    def run(self, connections, command, on_output):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self._run_host, connection, command, on_output)
+                for connection in connections
+            ]
+            return [future.result() for future in futures]
+
+    def _run_host(self, connection, command, on_output):
+        start = time.monotonic()
+        try:
+            return self._run_connection(connection, command, on_output, start)
+        except Exception as e:
+            # Bad connection data, a host name that cannot be encoded, ...: one failed
+            # host, not a failed run
+            return HostResult(connection.get('name', ''), connection.get('host', ''),
+                              error=f'{type(e).__name__}: {e}', duration=time.monotonic() - start)
+
+    def _run_connection(self, connection, command, on_output, start):
+        name = connection['name']
+        if self._cancelled.is_set():
+            return HostResult(name, connection['host'], error='cancelled')
+        if connection.get('connection_type') == 'WinRM':
+            return self._run_winrm_host(connection, command, on_output, start)
+        manager = SSHConnectionManager(
+            hostname=connection['host'],
+            username=connection['username'],
+            password=connection.get('password'),
+            port=connection.get('port', 22),
+            pool=self.pool,
+            key_filename=connection.get('key_file'),
+            allow_agent=connection.get('use_agent', False),
+            jump_hosts=connection.get('jump_hosts'),
+            transport_profile=connection.get('transport_profile')
+        )
+        try:
+            channel = manager.open_session()
+        except (paramiko.SSHException, OSError) as e:
+            return HostResult(name, connection['host'], error=str(e), duration=time.monotonic() - start)
+        deadline = start + self.timeout
+        buffer = b''
+        error = ''
+        try:
+            channel.set_combine_stderr(True)
+            channel.settimeout(0.2)
+            channel.exec_command(command)
+            while True:
+                if self._cancelled.is_set():
+                    error = 'cancelled'
+                    break
+                if time.monotonic() > deadline:
+                    error = f'timed out after {self.timeout}s'
+                    break
+                try:
+                    data = channel.recv(32768)
+                except socket.timeout:
+                    continue
+                if not data:
+                    break
+                buffer += data
+                *lines, buffer = buffer.split(b'\n')
+                for line in lines:
+                    on_output(name, line.decode('utf-8', 'replace'))
+            if buffer:
+                on_output(name, buffer.decode('utf-8', 'replace'))
+            exit_status = None if error else channel.recv_exit_status()
+        except (paramiko.SSHException, OSError) as e:
+            exit_status, error = None, str(e)
+        finally:
+            channel.close()
+        return HostResult(name, connection['host'], exit_status, error, time.monotonic() - start)
+
+    def _run_winrm_host(self, connection, command, on_output, start):
+        # pywinrm is only imported once a folder actually contains Windows hosts
+        from connections.winrm_connection import WINRM_ERRORS, WinRMConnectionManager
+        name = connection['name']
+        manager = WinRMConnectionManager(
+            hostname=connection['host'],
+            username=connection['username'],
+            password=connection.get('password'),
+            port=connection.get('port', 5985),
+            pool=self.winrm_pool
+        )
+        buffers = {'stdout': b'', 'stderr': b''}
+
+        def emit(stream, data):
+            buffers[stream] += data
+            *lines, buffers[stream] = buffers[stream].split(b'\n')
+            for line in lines:
+                on_output(name, line.rstrip(b'\r').decode('utf-8', 'replace'))
+
+        exit_status, error = None, ''
+        try:
+            exit_status, _, _ = manager.exec_command(
+                command, timeout=self.timeout, on_output=emit, cancelled=self._cancelled
+            )
+        except WINRM_ERRORS as e:
+            error = str(e)
+            if error == 'timed out':
+                error = f'timed out after {self.timeout}s'
+        for data in buffers.values():
+            if data:
+                on_output(name, data.rstrip(b'\r').decode('utf-8', 'replace'))
+        return HostResult(name, connection['host'], exit_status, error, time.monotonic() - start)
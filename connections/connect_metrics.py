@@ -0,0 +1,164 @@
+# connections/connect_metrics.py
+
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from utils.file_utils import atomic_write
+
+# Connect phases in the order they happen; 'total' covers DNS through auth.
+# 'channel' is the first channel after a connect, 'reused_channel' one on a pooled transport
+PHASES = ('dns', 'tcp', 'kex', 'auth', 'channel', 'first_byte', 'total', 'reused_channel')
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class RollingHistogram:
+    # Keeps the most recent samples (bounded by count and age) for quantiles,
+    # plus running totals that never reset, as Prometheus expects
+    def __init__(self, window=900, max_samples=1024):
+        self.window = window
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.total = 0.0
+        self.failures = 0
+        self.last_error = ''
+
+    def add(self, seconds, now=None):
+        self.samples.append((now or time.monotonic(), seconds))
+        self.count += 1
+        self.total += seconds
+
+    def add_failure(self, error):
+        self.failures += 1
+        self.last_error = error
+
+    def values(self, now=None):
+        cutoff = (now or time.monotonic()) - self.window
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+        return sorted(seconds for _, seconds in self.samples)
+
+    def quantiles(self, quantiles=QUANTILES):
+        values = self.values()
+        if not values:
+            return {q: None for q in quantiles}
+        # Nearest-rank: the smallest sample with at least q of the window at or below it
+        return {q: values[max(0, math.ceil(q * len(values)) - 1)] for q in quantiles}
+
+
+class ConnectTimer:
+    # Times the phases of one connect attempt against one host
+    def __init__(self, metrics, host, protocol):
+        self.metrics = metrics
+        self.host = host
+        self.protocol = protocol
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.metrics.record_failure(self.host, self.protocol, name, e)
+            raise
+        self.metrics.record(self.host, self.protocol, name, time.perf_counter() - started)
+
+    def finish(self):
+        self.metrics.record(self.host, self.protocol, 'total', time.perf_counter() - self.started)
+
+
+class ConnectMetrics:
+    def __init__(self, window=900, max_samples=1024):
+        self.window = window
+        self.max_samples = max_samples
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def timer(self, host, protocol):
+        return ConnectTimer(self, host, protocol)
+
+    def _histogram(self, host, protocol, phase):
+        key = (host, protocol, phase)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = RollingHistogram(self.window, self.max_samples)
+        return histogram
+
+    def record(self, host, protocol, phase, seconds):
+        with self._lock:
+            self._histogram(host, protocol, phase).add(seconds)
+
+    def record_failure(self, host, protocol, phase, error):
+        with self._lock:
+            self._histogram(host, protocol, phase).add_failure(f"{type(error).__name__}: {error}")
+
+    def summary(self):
+        # One row per (host, protocol, phase), phases in connect order
+        with self._lock:
+            rows = []
+            for (host, protocol, phase), histogram in self._histograms.items():
+                quantiles = histogram.quantiles()
+                rows.append({
+                    'host': host,
+                    'protocol': protocol,
+                    'phase': phase,
+                    'samples': len(histogram.samples),
+                    'count': histogram.count,
+                    'sum': histogram.total,
+                    'failures': histogram.failures,
+                    'last_error': histogram.last_error,
+                    'p50': quantiles[0.5],
+                    'p95': quantiles[0.95],
+                    'p99': quantiles[0.99],
+                })
+        order = {phase: index for index, phase in enumerate(PHASES)}
+        rows.sort(key=lambda row: (row['host'], row['protocol'], order.get(row['phase'], len(order))))
+        return rows
+
+    def to_json(self):
+        return json.dumps({'window_seconds': self.window, 'generated': time.time(), 'phases': self.summary()}, indent=2)
+
+    def to_prometheus(self):
+        lines = [
+            '# HELP remoconnect_connect_phase_seconds Connect phase latency over the rolling window.',
+            '# TYPE remoconnect_connect_phase_seconds summary',
+        ]
+        failures = [
+            '# HELP remoconnect_connect_phase_failures_total Connect attempts that failed in a phase.',
+            '# TYPE remoconnect_connect_phase_failures_total counter',
+        ]
+        for row in self.summary():
+            labels = f'host="{escape_label(row["host"])}",protocol="{row["protocol"]}",phase="{row["phase"]}"'
+            for quantile in QUANTILES:
+                value = row[f"p{int(quantile * 100)}"]
+                if value is not None:
+                    lines.append(f'remoconnect_connect_phase_seconds{{{labels},quantile="{quantile}"}} {value:.6f}')
+            lines.append(f'remoconnect_connect_phase_seconds_sum{{{labels}}} {row["sum"]:.6f}')
+            lines.append(f'remoconnect_connect_phase_seconds_count{{{labels}}} {row["count"]}')
+            failures.append(f'remoconnect_connect_phase_failures_total{{{labels}}} {row["failures"]}')
+        return '\n'.join(lines + failures) + '\n'
+
+    def export(self, path, fmt='prometheus'):
+        # Written atomically so a textfile collector never reads a partial file
+        data = self.to_prometheus() if fmt == 'prometheus' else self.to_json()
+        atomic_write(path, data)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+_default_metrics = None
+_default_metrics_lock = threading.Lock()
+
+
+def get_default_metrics():
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = ConnectMetrics()
+        return _default_metrics
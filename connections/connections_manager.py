@@ -1,35 +1,487 @@
+import gc
+import hashlib
 import json
 import os
+import uuid
+from contextlib import contextmanager
+
+from connections.records import ConnectionRecord, RecordStore, to_json
+from utils.file_utils import atomic_write
+from utils.journal import Journal, read_records
+
+
+@contextmanager
+def _gc_paused():
+    # Loading allocates a few objects per connection and no cycles; collections
+    # triggered along the way would only rescan them, doubling the load time
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _read(path):
+    # A missing file reads as empty, as load_connections treats it
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return b''
+
+
+class ExternalChanges:
+    # What another process or a sync tool changed on disk, as records to apply in order
+    def __init__(self, records, sequence, journal_count, signature, snapshot_digest, journal_digest):
+        self.records = records
+        self.sequence = sequence
+        self.journal_count = journal_count
+        self.signature = signature
+        self.snapshot_digest = snapshot_digest
+        self.journal_digest = journal_digest
+
 
 class ConnectionManager:
-    def __init__(self, connections_file='connections.json'):
+    # connections.json holds a compacted snapshot; every mutation is appended to
+    # connections.json.journal and the two are merged on load. Connections are
+    # held once, as ConnectionRecords; folders stay plain dicts.
+    def __init__(self, connections_file='connections.json', compact_threshold=1000):
         self.connections_file = connections_file
+        self.compact_threshold = compact_threshold
+        self.journal = Journal(connections_file + '.journal', default=to_json)
+        self.records = RecordStore()
         self.connections = []
+        self.items = {}
+        self.parents = {}
+        self.sequence = 0
+        self.listeners = []
+        self._batch_depth = 0
+        # Stat and content fingerprints of the files as this process last wrote or read
+        # them; the journal keeps its own digest
+        self._disk_signature = None
+        self._snapshot_digest = None
         self.load_connections()
 
     def load_connections(self):
-        if os.path.exists(self.connections_file):
-            with open(self.connections_file, 'r') as f:
-                self.connections = json.load(f)
-        else:
-            self.connections = []
+        self.journal.close()
+        with _gc_paused():
+            snapshot = {}
+            data = b''
+            if os.path.exists(self.connections_file):
+                with open(self.connections_file, 'rb') as f:
+                    data = f.read()
+                snapshot = json.loads(data)
+            self._snapshot_digest = hashlib.sha1(data).digest()
+            if isinstance(snapshot, list):
+                # Files written before the journal existed are a bare list of items
+                snapshot = {'sequence': 0, 'connections': snapshot}
+            self.connections = snapshot.get('connections', [])
+            self.sequence = snapshot.get('sequence', 0)
+            self.items = {}
+            self.parents = {}
+            self.records.clear()
+            migrated = self._index(self.connections, None)
+            for record in self.journal.replay():
+                if record['sequence'] > self.sequence:
+                    self._apply(record)
+                    self.sequence = record['sequence']
+        if migrated:
+            self.save_connections()
+        self._disk_signature = self._signature()
 
     def save_connections(self):
-        with open(self.connections_file, 'w') as f:
-            json.dump(self.connections, f, indent=4)
-
-    def add_folder(self, folder_name):
-        folder = {'name': folder_name, 'type': 'folder', 'children': []}
-        self.connections.append(folder)
-        self.save_connections()
-
-    def add_connection(self, connection_details):
-        connection = {
-            'name': connection_details['name'],
-            'type': 'connection',
-            'details': connection_details
-        }
-        # Add to the current folder (in a real app, you'd track which folder is selected)
-        if self.connections:
-            self.connections[-1]['children'].append(connection)
-        self.save_connections()
+        # Compaction: atomically replace the snapshot, then start a fresh journal
+        snapshot = {'sequence': self.sequence, 'connections': self.connections}
+        data = json.dumps(snapshot, separators=(',', ':'), default=to_json).encode('utf-8')
+        atomic_write(self.connections_file, data)
+        self._snapshot_digest = hashlib.sha1(data).digest()
+        self.journal.truncate()
+        self._disk_signature = self._signature()
+
+    def external_changes(self):
+        # None if the files are as this process left them; otherwise the records that
+        # turn the in-memory tree into what load_connections would now read, keyed by id
+        signature = self._signature()
+        if signature == self._disk_signature:
+            return None
+        snapshot_data = snapshot_digest = None
+        if self._disk_signature is not None and signature[0] != self._disk_signature[0]:
+            snapshot_data = _read(self.connections_file)
+            snapshot_digest = hashlib.sha1(snapshot_data).digest()
+        if snapshot_digest in (None, self._snapshot_digest):
+            # Sync tools rewrite files they copy back unchanged; only the journal may differ
+            changes = self._journal_tail(signature)
+            if changes is not None:
+                return changes
+        if snapshot_data is None:
+            snapshot_data = _read(self.connections_file)
+            snapshot_digest = hashlib.sha1(snapshot_data).digest()
+        journal_data = _read(self.journal.path)
+        journal_digest = hashlib.sha1(journal_data)
+        if snapshot_digest == self._snapshot_digest and journal_digest.digest() == self.journal.digest.digest():
+            # Touched or rewritten with the same content
+            self._disk_signature = signature
+            return None
+        with _gc_paused():
+            snapshot = json.loads(snapshot_data) if snapshot_data.strip() else {}
+            if isinstance(snapshot, list):
+                snapshot = {'sequence': 0, 'connections': snapshot}
+            sequence = snapshot.get('sequence', 0)
+            disk = self._shadow(snapshot.get('connections', []))
+            journal_count = 0
+            for record in read_records(journal_data):
+                journal_count += 1
+                if record['sequence'] > sequence:
+                    disk._apply(record)
+                    sequence = record['sequence']
+            records = self._diff(disk)
+            # Freed while collection is off too, or the first collection after it
+            # would scan every object of the disk copy
+            del snapshot, disk
+        return ExternalChanges(records, sequence, journal_count, signature, snapshot_digest, journal_digest)
+
+    def apply_external(self, changes, before=None, after=None):
+        # Applies external_changes() without journaling them, since they are already on
+        # disk; before(record) runs ahead of each change and after(record, its result) after
+        for record in changes.records:
+            context = before(record) if before else None
+            self._apply(record)
+            if after:
+                after(record, context)
+        self.sequence = changes.sequence
+        # A sync tool may have replaced the journal file; append to the new one
+        self.journal.close()
+        self.journal.count = changes.journal_count
+        self.journal.digest = changes.journal_digest
+        self._snapshot_digest = changes.snapshot_digest
+        self._disk_signature = changes.signature
+
+    def close(self):
+        if self.journal.count:
+            self.save_connections()
+        self.journal.close()
+
+    def get_all_items(self):
+        return self.connections
+
+    def get_item(self, item_id):
+        return self.items.get(item_id)
+
+    def get_parent_id(self, item_id):
+        return self.parents.get(item_id)
+
+    def get_children(self, parent_id=None):
+        if parent_id is None:
+            return self.connections
+        return self.items[parent_id].get('children', [])
+
+    def iter_connections(self, parent_id=None):
+        stack = list(reversed(self.get_children(parent_id)))
+        while stack:
+            item = stack.pop()
+            if item['type'] == 'connection':
+                yield item
+            else:
+                stack.extend(reversed(item.get('children', [])))
+
+    def add_folder(self, folder_name, parent_id=None):
+        folder = {'id': self._new_id(), 'name': folder_name, 'type': 'folder', 'children': []}
+        self._commit({'op': 'add', 'parent': parent_id, 'item': folder})
+        return self.items[folder['id']]
+
+    def add_connection(self, connection_details, parent_id=None):
+        connection = dict(connection_details)
+        connection.update({'id': self._new_id(), 'type': 'connection'})
+        self._commit({'op': 'add', 'parent': parent_id, 'item': connection})
+        return self.items[connection['id']]
+
+    def update_item(self, item_id, fields):
+        fields = {key: value for key, value in fields.items() if key not in ('id', 'children')}
+        self._commit({'op': 'update', 'id': item_id, 'fields': fields})
+        return self.items[item_id]
+
+    def move_item(self, item_id, parent_id=None, index=None):
+        # Checked before anything is journaled; a folder moved under itself would
+        # drop out of the tree, and replaying the record would repeat that
+        if item_id not in self.items:
+            raise KeyError(item_id)
+        if parent_id is not None:
+            parent = self.items.get(parent_id)
+            if parent is None or parent['type'] != 'folder':
+                raise ValueError(f"Cannot move into {parent_id}: not a folder")
+            ancestor = parent_id
+            while ancestor is not None:
+                if ancestor == item_id:
+                    raise ValueError(f"Cannot move folder {item_id} into itself or one of its subfolders")
+                ancestor = self.parents[ancestor]
+        self._commit({'op': 'move', 'id': item_id, 'parent': parent_id, 'index': index})
+
+    def remove_item(self, item_id):
+        self._commit({'op': 'remove', 'id': item_id})
+
+    @contextmanager
+    def batch(self):
+        # Changes inside share one fsync and compact at most once, at the end. A run
+        # of batches (an import) only compacts once the journal is as large as the
+        # snapshot, so the snapshot is not rewritten after every batch.
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.journal.sync()
+                if self.journal.count >= max(self.compact_threshold, len(self.items)):
+                    self.save_connections()
+                else:
+                    self._disk_signature = self._signature()
+
+    def _new_id(self):
+        return uuid.uuid4().hex
+
+    def _commit(self, record):
+        self.sequence += 1
+        record['sequence'] = self.sequence
+        self._apply(record)
+        self.journal.append(record, sync=not self._batch_depth)
+        if self._batch_depth:
+            return
+        if self.journal.count >= self.compact_threshold:
+            self.save_connections()
+        else:
+            self._disk_signature = self._signature()
+
+    def add_listener(self, listener):
+        # Listeners are called as listener(record, item) after each change is applied
+        self.listeners.append(listener)
+
+    def _apply(self, record):
+        op = record['op']
+        if op == 'add':
+            item = record['item']
+            if item['id'] in self.items:
+                return
+            added = [item]
+            self._index(added, record['parent'])
+            item = added[0]
+            self.get_children(record['parent']).append(item)
+        elif op == 'update':
+            item = self.items[record['id']]
+            if type(item) is ConnectionRecord:
+                self.records.update(item, record['fields'], record.get('unset', ()))
+            else:
+                item.update(record['fields'])
+                for key in record.get('unset', ()):
+                    item.pop(key, None)
+        elif op == 'move':
+            item = self.items[record['id']]
+            self.get_children(self.parents[record['id']]).remove(item)
+            siblings = self.get_children(record['parent'])
+            index = record.get('index')
+            siblings.insert(len(siblings) if index is None else index, item)
+            self.parents[record['id']] = record['parent']
+        elif op == 'remove':
+            item = self.items[record['id']]
+            self.get_children(self.parents[record['id']]).remove(item)
+            self._unindex(item)
+        for listener in self.listeners:
+            listener(record, item)
+
+    def _index(self, items, parent_id):
+        migrated = False
+        for position, item in enumerate(items):
+            if type(item) is ConnectionRecord:
+                self.items[item['id']] = item
+                self.parents[item['id']] = parent_id
+                continue
+            if 'id' not in item:
+                item['id'] = self._new_id()
+                migrated = True
+            if 'details' in item:
+                # Older connection entries nested their fields under 'details'
+                details = item.pop('details')
+                item.update({key: value for key, value in details.items() if key != 'type'})
+                item.setdefault('connection_type', details.get('type', 'SSH'))
+                migrated = True
+            if item['type'] == 'connection' and self.records is not None:
+                item = items[position] = self.records.make(item)
+            self.items[item['id']] = item
+            self.parents[item['id']] = parent_id
+            if item['type'] == 'folder':
+                migrated = self._index(item.setdefault('children', []), item['id']) or migrated
+        return migrated
+
+    def _unindex(self, item):
+        self.items.pop(item['id'], None)
+        self.parents.pop(item['id'], None)
+        for child in item.get('children', []):
+            self._unindex(child)
+
+    def _signature(self):
+        signature = []
+        for path in (self.connections_file, self.journal.path):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_size, stat.st_mtime_ns, stat.st_ino))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _journal_tail(self, signature):
+        # The common case: another process appended to the journal and the snapshot
+        # holds what it did, so the appended records are the changes. A journal replaced
+        # by a sync tool (a copy renamed over it) has a new inode but counts as appended
+        # to while it starts with the bytes already applied. None means read everything.
+        known = self._disk_signature
+        if known is None or signature[1] is None:
+            return None
+        # A journal that did not exist yet counts as empty
+        size, _, inode = known[1] or (0, None, signature[1][2])
+        if signature[1][0] < size:
+            return None
+        with open(self.journal.path, 'rb') as f:
+            if signature[1][2] == inode:
+                f.seek(size)
+                data = f.read()
+            else:
+                data = f.read()
+                if hashlib.sha1(data[:size]).digest() != self.journal.digest.digest():
+                    return None
+                data = data[size:]
+        # A record still being written is picked up on the next change
+        end = data.rfind(b'\n') + 1
+        records = list(read_records(data[:end]))
+        if len(records) != data.count(b'\n', 0, end):
+            return None
+        sequence = self.sequence
+        for record in records:
+            if record['sequence'] <= sequence:
+                # Interleaved with our own writes; replay order decides, as on load
+                return None
+            sequence = record['sequence']
+        signature = (signature[0], (size + end,) + signature[1][1:])
+        digest = self.journal.digest.copy()
+        digest.update(data[:end])
+        return ExternalChanges(records, sequence, self.journal.count + len(records), signature,
+                               self._snapshot_digest, digest)
+
+    def _shadow(self, connections):
+        # The same tree logic over another copy of the data, without files or listeners
+        shadow = object.__new__(type(self))
+        shadow.connections = connections
+        shadow.items = {}
+        shadow.parents = {}
+        shadow.listeners = []
+        # Items stay the plain dicts json.loads made; building records for them
+        # would cost more than comparing them against ours in _diff
+        shadow.records = None
+        shadow._index(connections, None)
+        return shadow
+
+    def _diff(self, disk):
+        # Adds (folders empty, parents first), moves to a new parent, removes, then
+        # reorders and field updates. Every step is a normal record, so listeners and
+        # the tree model see them like local edits.
+        records = []
+        moves = []
+        updates = []
+        added = []
+        # Child id order per parent as the records so far leave it
+        order = {None: [item.id if type(item) is ConnectionRecord else item['id'] for item in self.connections]}
+        departed = {}
+        for item_id, item in self.items.items():
+            if type(item) is not ConnectionRecord and item['type'] == 'folder':
+                order[item_id] = [child.id if type(child) is ConnectionRecord else child['id']
+                                  for child in item['children']]
+
+        # Both loops below run for every item of a large tree, so they stay in C where
+        # they can: a set difference finds the new and moved items, map fetches ours
+        placed = disk.parents.items() - self.parents.items()
+        if placed:
+            placed = dict(placed)
+            for item_id in [item_id for item_id in disk.items if item_id in placed]:
+                if item_id not in self.items:
+                    added.append(item_id)
+                    continue
+                moves.append({'op': 'move', 'id': item_id, 'parent': placed[item_id], 'index': None})
+                departed.setdefault(self.parents[item_id], set()).add(item_id)
+        loaded = {}
+        for old, item in zip(map(self.items.get, disk.items), disk.items.values()):
+            if old is None:
+                continue
+            item_id = item['id']
+            if type(old) is ConnectionRecord and item['type'] == 'connection':
+                changes = old.changes(item, loaded)
+                if changes is None:
+                    continue
+                fields, unset = changes
+            else:
+                # Children are compared through their own entries, not the nested lists
+                item = {key: value for key, value in item.items() if key != 'children'}
+                old = {key: value for key, value in old.items() if key != 'children'}
+                if old == item:
+                    continue
+                fields = {key: value for key, value in item.items() if key not in old or old[key] != value}
+                unset = [key for key in old if key not in item]
+            record = {'op': 'update', 'id': item_id, 'fields': fields}
+            if unset:
+                record['unset'] = unset
+            updates.append(record)
+
+        def depth(item_id):
+            count = 0
+            while item_id is not None:
+                item_id = disk.parents[item_id]
+                count += 1
+            return count
+        for item_id in sorted(added, key=depth):
+            item = disk.items[item_id]
+            parent_id = disk.parents[item_id]
+            item = {key: value for key, value in item.items() if key != 'children'}
+            if item['type'] == 'folder':
+                item['children'] = []
+                order[item_id] = []
+            records.append({'op': 'add', 'parent': parent_id, 'item': item})
+            order[parent_id].append(item_id)
+        for record in moves:
+            records.append(record)
+            order[record['parent']].append(record['id'])
+
+        for item_id, parent_id in self.parents.items():
+            if item_id not in disk.items and (parent_id is None or parent_id in disk.items):
+                # Only the top of a removed subtree; anything kept inside was moved out above
+                records.append({'op': 'remove', 'id': item_id})
+                departed.setdefault(parent_id, set()).add(item_id)
+        for parent_id, item_ids in departed.items():
+            order[parent_id] = [item_id for item_id in order[parent_id] if item_id not in item_ids]
+
+        for parent_id, current in order.items():
+            if parent_id is not None and parent_id not in disk.items:
+                continue
+            target = [item['id'] for item in disk.get_children(parent_id)]
+            if current == target:
+                continue
+            start, end = 0, len(target)
+            while current[start] == target[start]:
+                start += 1
+            while current[end - 1] == target[end - 1]:
+                end -= 1
+            current = current[start:end]
+            reordered = 0
+            for offset, item_id in enumerate(target[start:end]):
+                if current[offset] == item_id:
+                    continue
+                if reordered == 256:
+                    # A large reshuffle (e.g. a sort): place the rest in turn
+                    for index in range(start + offset, end):
+                        records.append({'op': 'move', 'id': target[index], 'parent': parent_id, 'index': index})
+                    break
+                records.append({'op': 'move', 'id': item_id, 'parent': parent_id, 'index': start + offset})
+                current.remove(item_id)
+                current.insert(offset, item_id)
+                reordered += 1
+
+        records.extend(updates)
+        return records
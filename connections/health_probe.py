@@ -0,0 +1,110 @@
+# connections/health_probe.py
+
+import threading
+import time
+
+
+class ProbeResult:
+    def __init__(self, host, port, status, latency_ms=None, banner='', error=''):
+        self.host = host
+        self.port = port
+        self.status = status
+        self.latency_ms = latency_ms
+        self.banner = banner
+        self.error = error
+        self.checked_at = time.monotonic()
+
+    def describe(self):
+        if self.status == 'up':
+            return f"up ({self.latency_ms:.0f} ms)"
+        if self.error:
+            return f"{self.status} ({self.error})"
+        return self.status
+
+
+class HealthProbe:
+    # Async TCP reachability sweep; results are cached per (host, port) for ttl seconds
+    def __init__(self, concurrency=256, timeout=3.0, ttl=60, read_banner=False):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.ttl = ttl
+        self.read_banner = read_banner
+        self._results = {}
+        self._lock = threading.Lock()
+        self._sweep_thread = None
+
+    def get_result(self, host, port):
+        with self._lock:
+            result = self._results.get((host, int(port)))
+        if result and time.monotonic() - result.checked_at < self.ttl:
+            return result
+        return None
+
+    def is_sweeping(self):
+        return bool(self._sweep_thread and self._sweep_thread.is_alive())
+
+    def start_sweep(self, targets, on_result=None, on_finished=None, force=False):
+        # Runs the sweep on its own event loop so the caller (the Qt thread) never blocks
+        if self.is_sweeping():
+            return False
+        self._sweep_thread = threading.Thread(
+            target=self.sweep, args=(targets, on_result, on_finished, force),
+            name='health-probe', daemon=True
+        )
+        self._sweep_thread.start()
+        return True
+
+    def sweep(self, targets, on_result=None, on_finished=None, force=False):
+        # asyncio is imported here, on the probe thread, to keep it off the startup path
+        import asyncio
+        pending = {(host, int(port)) for host, port in targets if host}
+        if not force:
+            pending = {target for target in pending if not self.get_result(*target)}
+        try:
+            if pending:
+                asyncio.run(self._sweep(pending, on_result))
+        finally:
+            if on_finished:
+                on_finished()
+
+    async def _sweep(self, targets, on_result):
+        import asyncio
+        semaphore = asyncio.Semaphore(self.concurrency)
+        probes = [self._probe(semaphore, host, port, on_result) for host, port in targets]
+        await asyncio.gather(*probes)
+
+    async def _probe(self, semaphore, host, port, on_result):
+        import asyncio
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(host, port), self.timeout
+                )
+            except asyncio.TimeoutError:
+                result = ProbeResult(host, port, 'timeout')
+            except OSError as e:
+                result = ProbeResult(host, port, 'down', error=e.strerror or str(e))
+            except Exception as e:
+                # e.g. UnicodeError for a name idna cannot encode; one bad host must not end the sweep
+                result = ProbeResult(host, port, 'down', error=f'{type(e).__name__}: {e}')
+            else:
+                latency_ms = (time.perf_counter() - start) * 1000
+                banner = ''
+                if self.read_banner:
+                    try:
+                        line = await asyncio.wait_for(reader.readline(), self.timeout)
+                        banner = line.decode('utf-8', 'replace').strip()
+                    except (asyncio.TimeoutError, OSError):
+                        pass
+                writer.close()
+                try:
+                    # Lets the transport finish closing before the loop shuts down
+                    await asyncio.wait_for(writer.wait_closed(), self.timeout)
+                except (asyncio.TimeoutError, OSError):
+                    pass
+                result = ProbeResult(host, port, 'up', latency_ms, banner)
+        with self._lock:
+            self._results[(host, port)] = result
+        if on_result:
+            on_result(result)
@@ -0,0 +1,516 @@
+# connections/inventory_import.py
+
+import csv
+import fnmatch
+import glob
+import hashlib
+import json
+import os
+import re
+import shlex
+
+# Fields an import owns; anything else on a connection (password, forwards, ...) is left alone
+IMPORTED_FIELDS = ('name', 'host', 'port', 'username', 'connection_type', 'key_file', 'proxy_jump')
+DEFAULT_PORTS = {'SSH': 22, 'RDP': 3389, 'WinRM': 5985}
+HOST_RANGE = re.compile(r'\[([0-9]+|[a-zA-Z]):([0-9]+|[a-zA-Z])(?::([0-9]+))?\]')
+PROXY_JUMP = re.compile(r'(?:ProxyJump[= ]|-J\s*)([^\s\'"]+)')
+
+
+def entry(name, host=None, port=None, username='', connection_type='SSH', key_file='', proxy_jump='', group=()):
+    # One host to import; group is the folder path it belongs in
+    try:
+        port = int(port) if port else DEFAULT_PORTS.get(connection_type, 22)
+    except (TypeError, ValueError):
+        return error_entry(f"{name}: invalid port {port!r}")
+    return {
+        'name': name,
+        'host': host or name,
+        'port': port,
+        'username': username or '',
+        'connection_type': connection_type,
+        'key_file': key_file or '',
+        'proxy_jump': proxy_jump or '',
+        'group': tuple(group),
+    }
+
+
+def error_entry(message):
+    # Yielded in place of a host that cannot be imported; the import records it and goes on
+    return {'error': message}
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.yml', '.yaml'):
+        return 'yaml'
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(('#', ';')):
+                continue
+            keyword = re.split(r'[\s=]', line, 1)[0].lower()
+            return 'ssh_config' if keyword in ('host', 'match', 'include') else 'ini'
+    return 'ini'
+
+
+def parse_file(path, file_format=None):
+    parsers = {'ssh_config': parse_ssh_config, 'csv': parse_csv, 'ini': parse_ansible_ini, 'yaml': parse_ansible_yaml}
+    return parsers[file_format or detect_format(path)](path)
+
+
+# ssh_config
+
+def _ssh_config_lines(path, depth=0):
+    # (keyword, args) pairs, following Include directives
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            keyword, value = _split_keyword(line)
+            keyword = keyword.lower()
+            if keyword == 'include' and depth < 8:
+                for pattern in shlex.split(value):
+                    pattern = os.path.expanduser(pattern)
+                    if not os.path.isabs(pattern):
+                        pattern = os.path.join(os.path.expanduser('~/.ssh'), pattern)
+                    for included in sorted(glob.glob(pattern)):
+                        yield from _ssh_config_lines(included, depth + 1)
+            else:
+                yield keyword, value
+
+
+def _split_keyword(line):
+    # "Keyword value" or "Keyword=value"
+    match = re.match(r'([^\s=]+)(?:\s*=\s*|\s+)(.*)', line)
+    if not match:
+        return line, ''
+    return match.group(1), match.group(2).strip()
+
+
+def _matches(patterns, name):
+    matched = False
+    for pattern in patterns:
+        if pattern.startswith('!'):
+            if fnmatch.fnmatch(name, pattern[1:]):
+                return False
+        elif fnmatch.fnmatch(name, pattern):
+            matched = True
+    return matched
+
+
+def parse_ssh_config(path):
+    # ssh takes each option from the first block that matches, in file order, and
+    # "Host *" defaults usually come last; so a first pass collects the (few)
+    # wildcard blocks and a second pass streams the concrete hosts
+    path = os.path.expanduser(path)
+    wildcard_blocks = []
+    block = None
+    position = 0
+    for keyword, value in _ssh_config_lines(path):
+        if keyword in ('host', 'match'):
+            position += 1
+            patterns = shlex.split(value) if keyword == 'host' else []
+            block = None
+            if any(char in pattern for pattern in patterns for char in '*?!'):
+                block = (position, patterns, {})
+                wildcard_blocks.append(block)
+        elif block is not None:
+            block[2].setdefault(keyword, value)
+
+    def finish(names, position, options):
+        for name in names:
+            if any(char in name for char in '*?!'):
+                continue
+            merged = {}
+            blocks = [(position, [name], options)] + [b for b in wildcard_blocks if _matches(b[1], name)]
+            for _, _, block_options in sorted(blocks, key=lambda b: b[0]):
+                for keyword, value in block_options.items():
+                    merged.setdefault(keyword, value)
+            identity_file = merged.get('identityfile', '').replace('%h', name)
+            yield entry(
+                name, host=merged.get('hostname', '').replace('%h', name), port=merged.get('port'), username=merged.get('user'),
+                key_file=os.path.expanduser(identity_file.strip('"')) if identity_file else '',
+                proxy_jump=merged.get('proxyjump', '') if merged.get('proxyjump', '').lower() != 'none' else ''
+            )
+
+    names, options, position = None, {}, 0
+    for keyword, value in _ssh_config_lines(path):
+        if keyword in ('host', 'match'):
+            position += 1
+            if names:
+                yield from finish(names, position - 1, options)
+            names = shlex.split(value) if keyword == 'host' else None
+            options = {}
+        elif names:
+            options.setdefault(keyword, value)
+    if names:
+        yield from finish(names, position, options)
+
+
+# CSV
+
+CSV_COLUMNS = {
+    'name': ('name', 'alias', 'label'),
+    'host': ('host', 'hostname', 'address', 'ip'),
+    'port': ('port',),
+    'username': ('username', 'user', 'login'),
+    'connection_type': ('connection_type', 'type', 'protocol'),
+    'key_file': ('key_file', 'identity_file', 'key'),
+    'proxy_jump': ('proxy_jump', 'jump_hosts', 'bastion'),
+    'group': ('group', 'folder', 'path'),
+}
+CONNECTION_TYPES = {'ssh': 'SSH', 'rdp': 'RDP', 'winrm': 'WinRM'}
+
+
+def parse_csv(path):
+    # Header names are matched loosely (host/hostname/address, user/username, ...);
+    # group is a folder path like "emea/web"
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = [column.strip().lower() for column in next(reader, [])]
+        columns = {}
+        for field, aliases in CSV_COLUMNS.items():
+            for alias in aliases:
+                if alias in header:
+                    columns[field] = header.index(alias)
+                    break
+        if 'host' not in columns and 'name' not in columns:
+            raise ValueError(f"{path}: no host or name column in the header")
+
+        for row in reader:
+            values = {field: row[index].strip() for field, index in columns.items() if index < len(row)}
+            name = values.get('name') or values.get('host')
+            if not name:
+                continue
+            yield entry(
+                name, host=values.get('host'), port=values.get('port'),
+                username=values.get('username'),
+                connection_type=CONNECTION_TYPES.get(values.get('connection_type', '').lower(), 'SSH'),
+                key_file=values.get('key_file'), proxy_jump=values.get('proxy_jump'),
+                group=[part.strip() for part in re.split(r'[/\\]', values.get('group', '')) if part.strip()]
+            )
+
+
+# Ansible
+
+def expand_host_range(pattern):
+    # Ansible host ranges: web[01:03].example.com, db-[a:c], node[0:10:2]
+    match = HOST_RANGE.search(pattern)
+    if not match:
+        yield pattern
+        return
+    start, end, step = match.group(1), match.group(2), int(match.group(3) or 1) or 1
+    prefix, suffix = pattern[:match.start()], pattern[match.end():]
+    if start.isdigit():
+        width = len(start) if start.startswith('0') else 0
+        values = (str(number).zfill(width) for number in range(int(start), int(end) + 1, step))
+    else:
+        values = (chr(code) for code in range(ord(start), ord(end) + 1, step))
+    for value in values:
+        yield from expand_host_range(prefix + value + suffix)
+
+
+def _ansible_entry(name, variables, group):
+    connection = variables.get('ansible_connection', 'ssh')
+    connection_type = 'WinRM' if connection in ('winrm', 'psrp') else 'SSH'
+    # YAML may give these as numbers or lists; str() keeps the search from raising
+    proxy_jump = PROXY_JUMP.search(str(variables.get('ansible_ssh_common_args') or '') + ' ' +
+                                   str(variables.get('ansible_ssh_extra_args') or ''))
+    return entry(
+        name, host=variables.get('ansible_host') or variables.get('ansible_ssh_host'),
+        port=variables.get('ansible_port') or variables.get('ansible_ssh_port'),
+        username=variables.get('ansible_user') or variables.get('ansible_ssh_user'),
+        connection_type=connection_type,
+        key_file=variables.get('ansible_ssh_private_key_file') or variables.get('ansible_private_key_file'),
+        proxy_jump=proxy_jump.group(1) if proxy_jump else '',
+        group=group
+    )
+
+
+def _parse_ini_vars(text):
+    variables = {}
+    for token in shlex.split(text, comments=True):
+        key, separator, value = token.partition('=')
+        if separator:
+            variables[key] = value
+    return variables
+
+
+def _group_paths(parents):
+    # Folder path per group, following the first parent each group was listed under
+    paths = {}
+
+    def path_for(group, seen=()):
+        if group not in paths:
+            parent = parents.get(group)
+            if parent is None or parent in seen:
+                paths[group] = (group,)
+            else:
+                paths[group] = path_for(parent, seen + (group,)) + (group,)
+        return paths[group]
+    return path_for
+
+
+def parse_ansible_ini(path):
+    # First pass: group structure and [group:vars], which may appear anywhere;
+    # second pass streams the host lines
+    parents = {}
+    group_vars = {}
+    section, kind = 'ungrouped', 'hosts'
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(('#', ';')):
+                continue
+            if line.startswith('['):
+                section, _, kind = line.strip('[]').partition(':')
+                kind = kind or 'hosts'
+            elif kind == 'children':
+                child = line.split()[0]
+                if section != 'all':
+                    parents.setdefault(child, section)
+            elif kind == 'vars':
+                group_vars.setdefault(section, {}).update(_parse_ini_vars(line))
+    path_for = _group_paths(parents)
+
+    def inherited(group):
+        variables = dict(group_vars.get('all', {}))
+        for ancestor in path_for(group):
+            variables.update(group_vars.get(ancestor, {}))
+        return variables
+
+    section, kind = 'ungrouped', 'hosts'
+    variables = inherited(section)
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(('#', ';')):
+                continue
+            if line.startswith('['):
+                section, _, kind = line.strip('[]').partition(':')
+                kind = kind or 'hosts'
+                variables = inherited(section)
+                continue
+            if kind != 'hosts':
+                continue
+            pattern, _, host_vars = line.partition(' ')
+            group = () if section in ('all', 'ungrouped') else path_for(section)
+            try:
+                host_variables = dict(variables, **_parse_ini_vars(host_vars))
+            except ValueError as e:
+                # e.g. an unbalanced quote
+                yield error_entry(f"{pattern}: {e}")
+                continue
+            for name in expand_host_range(pattern):
+                yield _ansible_entry(name, host_variables, group)
+
+
+def parse_ansible_yaml(path):
+    # YAML inventories need PyYAML and are parsed whole; they are rarely the large ones
+    try:
+        import yaml
+    except ImportError:
+        raise ValueError("Importing YAML inventories needs PyYAML (pip install pyyaml)")
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            inventory = yaml.safe_load(f) or {}
+        except yaml.YAMLError as e:
+            raise ValueError(f"{path}: {e}")
+    if not isinstance(inventory, dict):
+        raise ValueError(f"{path}: expected a mapping of groups at the top level")
+
+    def mapping(value, what):
+        # hosts, vars and children are mappings; anything else skips just that part
+        if value is None or isinstance(value, dict):
+            return value or {}, None
+        return {}, error_entry(f"{path}: {what} should be a mapping, not {type(value).__name__}")
+
+    def named(variables, what):
+        # Variable names must be strings; YAML also allows keys like 1 or true, which are dropped
+        invalid = [key for key in variables if not isinstance(key, str)]
+        if not invalid:
+            return variables, None
+        error = error_entry(f"{path}: {what} has names that are not strings: {', '.join(map(repr, invalid))}")
+        return {key: value for key, value in variables.items() if isinstance(key, str)}, error
+
+    def walk(name, group, folder, variables):
+        group, error = mapping(group, f"group {name}")
+        if error:
+            yield error
+        group_vars, error = mapping(group.get('vars'), f"vars of group {name}")
+        if error:
+            yield error
+        group_vars, error = named(group_vars, f"vars of group {name}")
+        if error:
+            yield error
+        variables = {**variables, **group_vars}
+        folder = folder if name in ('all', 'ungrouped') else folder + (str(name),)
+        hosts, error = mapping(group.get('hosts'), f"hosts of group {name}")
+        if error:
+            yield error
+        for pattern, host_vars in hosts.items():
+            host_vars, error = mapping(host_vars, f"vars of host {pattern}")
+            if error:
+                yield error
+                continue
+            host_vars, error = named(host_vars, f"vars of host {pattern}")
+            if error:
+                yield error
+            for host in expand_host_range(str(pattern)):
+                yield _ansible_entry(host, {**variables, **host_vars}, folder)
+        children, error = mapping(group.get('children'), f"children of group {name}")
+        if error:
+            yield error
+        for child, child_group in children.items():
+            yield from walk(child, child_group, folder, variables)
+
+    for name, group in inventory.items():
+        yield from walk(name, group, (), {})
+
+
+# Import
+
+def content_hash(fields):
+    return hashlib.sha1(json.dumps([fields.get(field) for field in IMPORTED_FIELDS]).encode('utf-8')).hexdigest()[:16]
+
+
+def endpoint_key(item):
+    return (str(item.get('host', '')).lower(), int(item.get('port') or 22), item.get('username', ''),
+            item.get('connection_type', 'SSH'))
+
+
+class ImportResult:
+    def __init__(self, source):
+        self.source = source
+        self.added = 0
+        self.updated = 0
+        self.moved = 0
+        self.unchanged = 0
+        self.duplicates = 0
+        self.folders = 0
+        self.errors = []
+
+    def describe(self):
+        text = (f"{self.added} added, {self.updated} updated, {self.moved} moved, {self.unchanged} unchanged, "
+                f"{self.duplicates} duplicates skipped, {self.folders} folders created")
+        if self.errors:
+            text += f", {len(self.errors)} errors"
+        return text
+
+
+class InventoryImporter:
+    # Streams entries into a ConnectionManager in batches. Every imported
+    # connection carries its import_source, import_key (its name in that source)
+    # and a hash of its imported fields, so re-importing the same file only writes what changed. Hosts whose
+    # address, port, user and type match a hand-made connection are skipped.
+    def __init__(self, connection_manager, batch_size=1000):
+        self.connection_manager = connection_manager
+        self.batch_size = batch_size
+        self._imported = None
+        self._endpoints = None
+        self._folders = None
+
+    def import_file(self, path, parent_id=None, file_format=None):
+        # Returns once everything is committed; run_batches() lets the caller yield in between
+        result = None
+        for result in self.run_batches(path, parent_id, file_format):
+            pass
+        return result
+
+    def run_batches(self, path, parent_id=None, file_format=None):
+        # A generator that commits one batch per step and yields the running ImportResult
+        source = os.path.abspath(os.path.expanduser(path))
+        result = ImportResult(source)
+        self._build_index()
+        seen = set()
+        batch = []
+        try:
+            for item in parse_file(source, file_format):
+                if 'error' in item:
+                    result.errors.append(item['error'])
+                    continue
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    self._commit(batch, source, parent_id, seen, result)
+                    batch = []
+                    yield result
+        except (OSError, ValueError, csv.Error) as e:
+            result.errors.append(str(e))
+        if batch:
+            self._commit(batch, source, parent_id, seen, result)
+        yield result
+
+    def _build_index(self):
+        # (import_source, import_key) -> connection id, and endpoints of connections
+        # not created by an import
+        self._imported = {}
+        self._endpoints = set()
+        self._folders = {}
+        for item in self.connection_manager.iter_connections():
+            if item.get('import_key'):
+                source = item.get('import_source')
+                if source is None:
+                    # Earlier imports stored 'source#name' in import_key
+                    source, _, name = item['import_key'].rpartition('#')
+                    self._imported[(source, name)] = item['id']
+                else:
+                    self._imported[(source, item['import_key'])] = item['id']
+            else:
+                self._endpoints.add(endpoint_key(item))
+
+    def _commit(self, batch, source, parent_id, seen, result):
+        manager = self.connection_manager
+        with manager.batch():
+            for item in batch:
+                import_key = (source, item['name'])
+                if import_key in seen:
+                    # e.g. an Ansible host listed under several groups: the first one places it
+                    result.duplicates += 1
+                    continue
+                seen.add(import_key)
+                folder_id = self._folder(parent_id, item['group'], result)
+                fields = {field: item[field] for field in IMPORTED_FIELDS}
+                digest = content_hash(fields)
+                existing_id = self._imported.get(import_key)
+                existing = manager.get_item(existing_id) if existing_id else None
+                if existing is None:
+                    if endpoint_key(fields) in self._endpoints:
+                        result.duplicates += 1
+                        continue
+                    connection = manager.add_connection(dict(
+                        fields, password='', use_agent=False, ssh_options=[], port_forwards=[],
+                        open_browser=False, import_source=source, import_key=item['name'], import_hash=digest
+                    ), folder_id)
+                    self._imported[import_key] = connection['id']
+                    result.added += 1
+                    continue
+                if existing.get('import_hash') != digest:
+                    changed = {key: value for key, value in fields.items() if existing.get(key) != value}
+                    changed['import_hash'] = digest
+                    manager.update_item(existing_id, changed)
+                    result.updated += 1
+                else:
+                    result.unchanged += 1
+                if manager.get_parent_id(existing_id) != folder_id:
+                    manager.move_item(existing_id, folder_id)
+                    result.moved += 1
+
+    def _folder(self, parent_id, path, result):
+        # Reuses a same-named folder at each level, creating the rest
+        for name in path:
+            key = (parent_id, name)
+            if key not in self._folders:
+                folder_id = None
+                for child in self.connection_manager.get_children(parent_id):
+                    if child['type'] == 'folder' and child['name'] == name:
+                        folder_id = child['id']
+                        break
+                if folder_id is None:
+                    folder_id = self.connection_manager.add_folder(name, parent_id)['id']
+                    result.folders += 1
+                self._folders[key] = folder_id
+            parent_id = self._folders[key]
+        return parent_id
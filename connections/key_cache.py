@@ -0,0 +1,159 @@
+# connections/key_cache.py
+
+import base64
+import os
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+import paramiko
+
+KEY_CLASSES = (paramiko.Ed25519Key, paramiko.ECDSAKey, paramiko.RSAKey, paramiko.DSSKey)
+# By the PEM header of a traditional key file
+PEM_KEY_CLASSES = {'RSA': paramiko.RSAKey, 'DSA': paramiko.DSSKey, 'EC': paramiko.ECDSAKey}
+# By the algorithm name in the public key of an OpenSSH format file
+OPENSSH_KEY_CLASSES = {
+    'ssh-ed25519': paramiko.Ed25519Key,
+    'ssh-rsa': paramiko.RSAKey,
+    'ssh-dss': paramiko.DSSKey,
+    'ecdsa-sha2-nistp256': paramiko.ECDSAKey,
+    'ecdsa-sha2-nistp384': paramiko.ECDSAKey,
+    'ecdsa-sha2-nistp521': paramiko.ECDSAKey,
+}
+PEM_HEADER = re.compile(rb'-----BEGIN ([A-Z0-9 ]+) PRIVATE KEY-----')
+
+
+class WrongPassphrase(paramiko.SSHException):
+    pass
+
+
+def key_type(data):
+    # (key class or None if unknown, whether the key is encrypted), read from the
+    # parts of a private key file that are never encrypted
+    match = PEM_HEADER.search(data)
+    if match is None:
+        return None, False
+    kind = match.group(1).decode()
+    if kind != 'OPENSSH':
+        return PEM_KEY_CLASSES.get(kind), b'ENCRYPTED' in data[:match.end() + 200]
+    end = data.find(b'-----END', match.end())
+    try:
+        blob = base64.b64decode(b''.join(data[match.end():end].split()))
+        if not blob.startswith(b'openssh-key-v1\0'):
+            return None, False
+        # ciphername, kdfname, kdfoptions, number of keys, then the first public key,
+        # which starts with its algorithm name
+        fields, offset = [], len(b'openssh-key-v1\0')
+        for _ in range(3):
+            length, = struct.unpack_from('>I', blob, offset)
+            fields.append(blob[offset + 4:offset + 4 + length])
+            offset += 4 + length
+        offset += 8
+        length, = struct.unpack_from('>I', blob, offset)
+        name = blob[offset + 4:offset + 4 + length].decode('ascii')
+    except (ValueError, struct.error, UnicodeDecodeError):
+        return None, False
+    return OPENSSH_KEY_CLASSES.get(name), fields[0] != b'none'
+
+
+class CachedKey:
+    def __init__(self, key, mtime):
+        self.key = key
+        self.mtime = mtime
+        self.unlocked_at = time.monotonic()
+
+
+class KeyCache:
+    # Unlocked private keys shared by every connection in the process. The KDF of
+    # an encrypted key runs once per file; entries expire ttl seconds after they
+    # were unlocked, the least recently used go first beyond max_keys, and wipe()
+    # drops them all.
+    def __init__(self, ttl=3600, max_keys=32):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._keys = OrderedDict()
+        self._path_locks = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._keys)
+
+    def get(self, path, passphrase=None):
+        # Raises paramiko.PasswordRequiredException for an encrypted key that is not
+        # cached yet and no passphrase was given, WrongPassphrase if it does not unlock it
+        path = os.path.abspath(os.path.expanduser(path))
+        mtime = os.stat(path).st_mtime
+        with self._lock:
+            path_lock = self._path_locks.setdefault(path, threading.Lock())
+        # Concurrent callers for the same file wait for a single unlock
+        with path_lock:
+            with self._lock:
+                cached = self._keys.get(path)
+                if cached and cached.mtime == mtime and not self._expired(cached):
+                    self._keys.move_to_end(path)
+                    return cached.key
+            key = self._load(path, passphrase)
+            with self._lock:
+                self._keys[path] = CachedKey(key, mtime)
+                self._keys.move_to_end(path)
+                while len(self._keys) > self.max_keys:
+                    self._keys.popitem(last=False)
+            return key
+
+    def is_unlocked(self, path):
+        path = os.path.abspath(os.path.expanduser(path))
+        with self._lock:
+            cached = self._keys.get(path)
+            return bool(cached and not self._expired(cached))
+
+    def evict_expired(self):
+        with self._lock:
+            expired = [path for path, cached in self._keys.items() if self._expired(cached)]
+            for path in expired:
+                del self._keys[path]
+        return expired
+
+    def wipe(self):
+        with self._lock:
+            self._keys.clear()
+
+    def _expired(self, cached):
+        return self.ttl is not None and time.monotonic() - cached.unlocked_at >= self.ttl
+
+    def _load(self, path, passphrase):
+        # Only the class for the file's key type is tried, so the KDF of an encrypted
+        # key (bcrypt for the OpenSSH format) runs once
+        with open(path, 'rb') as f:
+            known_class, encrypted = key_type(f.read())
+        error = None
+        for key_class in (known_class,) if known_class else KEY_CLASSES:
+            try:
+                return key_class.from_private_key_file(path, password=passphrase)
+            except paramiko.PasswordRequiredException:
+                raise
+            except (paramiko.SSHException, ValueError) as e:
+                error = e
+        if known_class and encrypted and passphrase is not None:
+            raise WrongPassphrase(f"Wrong passphrase for key {path}")
+        raise paramiko.SSHException(f"Could not load key {path}: {error or 'unsupported key type'}")
+
+
+def agent_keys():
+    # Keys offered by a running ssh-agent, if any; the caller closes the agent
+    agent = paramiko.Agent()
+    return agent, agent.get_keys()
+
+
+_default_key_cache = None
+_default_key_cache_lock = threading.Lock()
+
+
+def get_default_key_cache():
+    global _default_key_cache
+    with _default_key_cache_lock:
+        if _default_key_cache is None:
+            _default_key_cache = KeyCache()
+        return _default_key_cache
@@ -0,0 +1,433 @@
+# connections/port_forwarding.py
+
+import logging
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.log_manager import LOGGER_NAME
+
+
+def parse_forward(spec):
+    # "L [bind_address:]port:host:hostport" (ssh -L) or "R ..." (ssh -R)
+    kind, _, rest = spec.strip().partition(' ')
+    kind = kind.upper().lstrip('-')
+    parts = rest.strip().split(':')
+    if kind not in ('L', 'R') or len(parts) not in (3, 4) or not all(p.isdigit() for p in parts[-3::2]):
+        raise ValueError(f"Invalid port forward '{spec}', expected 'L [bind:]port:host:hostport'")
+    if len(parts) == 3:
+        parts = ['localhost'] + parts
+    bind_host, bind_port, host, port = parts
+    return {'kind': kind, 'bind_host': bind_host or 'localhost', 'bind_port': int(bind_port),
+            'host': host, 'port': int(port)}
+
+
+def format_bytes(count):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if count < 1024 or unit == 'GB':
+            return f"{count:.0f} {unit}" if unit == 'B' else f"{count:.1f} {unit}"
+        count /= 1024
+
+
+class Forward:
+    # One -L/-R forward and its counters; bytes_out flows towards the far side
+    def __init__(self, kind, bind_host, bind_port, host, port):
+        self.kind = kind
+        self.bind_host = bind_host
+        self.bind_port = bind_port
+        self.host = host
+        self.port = port
+        self.bound_port = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.active = 0
+        self.total = 0
+        self.errors = 0
+        self.last_error = ''
+        self.closed = False
+        self._sample = (time.monotonic(), 0)
+        self._rate = 0.0
+
+    def rate(self):
+        # Bytes per second in both directions, averaged since the previous sample
+        now = time.monotonic()
+        sampled_at, sampled_bytes = self._sample
+        transferred = self.bytes_in + self.bytes_out
+        if now - sampled_at >= 1.0:
+            self._rate = (transferred - sampled_bytes) / (now - sampled_at)
+            self._sample = (now, transferred)
+        return self._rate
+
+    def describe(self):
+        text = f"{self.kind} {self.bind_host}:{self.bound_port or self.bind_port} -> {self.host}:{self.port}"
+        text += f"  {self.active} open, {self.total} total, {format_bytes(self.bytes_in)} in / "
+        text += f"{format_bytes(self.bytes_out)} out, {format_bytes(self.rate())}/s"
+        if self.errors:
+            text += f", {self.errors} failed ({self.last_error})"
+        return text
+
+
+class _Tunnel:
+    def __init__(self, forward, sock, channel):
+        self.forward = forward
+        self.sock = sock
+        self.channel = channel
+        self.to_channel = bytearray()
+        self.to_socket = bytearray()
+        self.sock_eof = False
+        self.channel_eof = False
+        self.sock_events = 0
+        self.channel_events = 0
+
+
+class ForwardingEngine:
+    # Every tunnel of every forward is driven by one selector thread. Each side of
+    # a tunnel has a buffer_limit; when the buffer towards a slow side is full the
+    # other side is no longer read, so backpressure reaches the sender instead of
+    # growing memory. Channel opens and local connects can wait a round trip, so
+    # they run on a small executor and hand the result back to the loop. A callback
+    # that fails closes only the tunnel it was serving; the loop and the others go on.
+    def __init__(self, buffer_limit=256 * 1024, read_size=65536, connect_workers=4, connect_timeout=10):
+        self.buffer_limit = buffer_limit
+        self.read_size = read_size
+        self.connect_timeout = connect_timeout
+        self._selector = selectors.DefaultSelector()
+        self._executor = ThreadPoolExecutor(max_workers=connect_workers, thread_name_prefix='forward-connect')
+        self._pending = deque()
+        self._tunnels = set()
+        self._remote = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+        self._wakeup_read, self._wakeup_write = socket.socketpair()
+        self._wakeup_read.setblocking(False)
+        self._wakeup_write.setblocking(False)
+
+    def add_local(self, spec, open_channel):
+        # open_channel(destination, origin) returns a direct-tcpip channel
+        forward = Forward('L', spec['bind_host'], spec['bind_port'], spec['host'], spec['port'])
+        listener = socket.create_server((spec['bind_host'], spec['bind_port']))
+        listener.setblocking(False)
+        forward.listener = listener
+        forward.bound_port = listener.getsockname()[1]
+        forward.open_channel = open_channel
+        self._call_soon(self._selector.register, listener, selectors.EVENT_READ,
+                        (lambda mask: self._accept(forward), None))
+        return forward
+
+    def add_remote(self, spec, transport):
+        # The server listens on bind_host:bind_port and hands each connection back over transport
+        forward = Forward('R', spec['bind_host'], spec['bind_port'], spec['host'], spec['port'])
+        with self._lock:
+            handlers = self._remote.setdefault(transport, {})
+        # paramiko keeps one handler per transport, so every forward on it shares one
+        # that routes by the server-side port
+        handler = lambda channel, origin, server: self._remote_connection(handlers, channel, server)
+        bound_port = transport.request_port_forward(spec['bind_host'], spec['bind_port'], handler)
+        forward.bound_port = bound_port
+        forward.transport = transport
+        with self._lock:
+            handlers[bound_port] = forward
+        self._start()
+        return forward
+
+    def remove(self, forward):
+        forward.closed = True
+        if forward.kind == 'L':
+            self._call_soon(self._close_listener, forward)
+        else:
+            with self._lock:
+                handlers = self._remote.get(forward.transport, {})
+                handlers.pop(forward.bound_port, None)
+                if not handlers:
+                    self._remote.pop(forward.transport, None)
+            try:
+                forward.transport.cancel_port_forward(forward.bind_host, forward.bound_port)
+            except Exception:
+                pass
+        self._call_soon(self._close_forward_tunnels, forward)
+
+    def stop(self):
+        self._stopped = True
+        self._wake()
+        if self._thread:
+            self._thread.join()
+        self._executor.shutdown(wait=False)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._selector.register(self._wakeup_read, selectors.EVENT_READ,
+                                        (lambda mask: self._drain_wakeup(), None))
+                self._thread = threading.Thread(target=self._loop, name='port-forwarding', daemon=True)
+                self._thread.start()
+
+    def _call_soon(self, function, *args):
+        self._pending.append((function, args))
+        self._start()
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wakeup_write.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass
+
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup_read.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def _loop(self):
+        while not self._stopped:
+            while self._pending:
+                function, args = self._pending.popleft()
+                self._dispatch(None, function, *args)
+            # A channel whose send window is full has no fd to wait on, so poll while any is blocked
+            blocked = any(tunnel.to_channel for tunnel in self._tunnels)
+            for key, mask in self._selector.select(0.02 if blocked else 1.0):
+                callback, tunnel = key.data
+                self._dispatch(tunnel, callback, mask)
+            for tunnel in list(self._tunnels):
+                if tunnel.to_channel:
+                    self._dispatch(tunnel, self._write_channel, tunnel)
+        for tunnel in list(self._tunnels):
+            self._close_tunnel(tunnel)
+
+    def _dispatch(self, tunnel, function, *args):
+        try:
+            function(*args)
+        except Exception as e:
+            self._callback_failed(tunnel, e)
+
+    def _callback_failed(self, tunnel, error):
+        fields = {}
+        if tunnel is not None:
+            forward = tunnel.forward
+            forward.errors += 1
+            forward.last_error = str(error)
+            fields = {'forward': f"{forward.kind} {forward.bind_host}:{forward.bound_port or forward.bind_port} "
+                                 f"-> {forward.host}:{forward.port}"}
+        logging.getLogger(LOGGER_NAME).error(
+            f"Port forwarding callback failed: {error!r}", exc_info=error, extra={'fields': fields}
+        )
+        if tunnel is not None:
+            self._close_tunnel(tunnel)
+
+    def _accept(self, forward):
+        try:
+            sock, origin = forward.listener.accept()
+        except (BlockingIOError, OSError):
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def open_channel():
+            try:
+                channel = forward.open_channel((forward.host, forward.port), origin[:2])
+            except Exception as e:
+                self._call_soon(self._connect_failed, forward, sock, e)
+                return
+            self._call_soon(self._add_tunnel, forward, sock, channel)
+        self._executor.submit(open_channel)
+
+    def _remote_connection(self, handlers, channel, server):
+        with self._lock:
+            forward = handlers.get(server[1])
+        if forward is None or forward.closed:
+            channel.close()
+            return
+
+        def connect():
+            try:
+                sock = socket.create_connection((forward.host, forward.port), timeout=self.connect_timeout)
+            except OSError as e:
+                self._call_soon(self._connect_failed, forward, channel, e)
+                return
+            sock.setblocking(False)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._call_soon(self._add_tunnel, forward, sock, channel)
+        self._executor.submit(connect)
+
+    def _connect_failed(self, forward, endpoint, error):
+        forward.errors += 1
+        forward.last_error = str(error)
+        self._close_endpoints(endpoint)
+
+    def _add_tunnel(self, forward, sock, channel):
+        try:
+            if forward.closed:
+                self._close_endpoints(sock, channel)
+                return
+            tunnel = _Tunnel(forward, sock, channel)
+            self._tunnels.add(tunnel)
+        except Exception as e:
+            # There is no tunnel yet for _callback_failed to close, so both ends are closed here
+            forward.errors += 1
+            forward.last_error = str(e)
+            self._close_endpoints(sock, channel)
+            raise
+        forward.active += 1
+        forward.total += 1
+        self._dispatch(tunnel, self._start_tunnel, tunnel)
+
+    @staticmethod
+    def _close_endpoints(*endpoints):
+        for endpoint in endpoints:
+            try:
+                endpoint.close()
+            except Exception:
+                pass
+
+    def _start_tunnel(self, tunnel):
+        tunnel.channel.setblocking(0)
+        self._update(tunnel)
+
+    def _update(self, tunnel):
+        # Recomputes what each side should wait for, given the buffer levels
+        sock_events = 0
+        if not tunnel.sock_eof and len(tunnel.to_channel) < self.buffer_limit:
+            sock_events |= selectors.EVENT_READ
+        if tunnel.to_socket:
+            sock_events |= selectors.EVENT_WRITE
+        channel_events = 0
+        if not tunnel.channel_eof and len(tunnel.to_socket) < self.buffer_limit:
+            channel_events = selectors.EVENT_READ
+        tunnel.sock_events = self._reregister(tunnel.sock, tunnel.sock_events, sock_events,
+                                              (lambda mask: self._socket_ready(tunnel, mask), tunnel))
+        tunnel.channel_events = self._reregister(tunnel.channel, tunnel.channel_events, channel_events,
+                                                 (lambda mask: self._channel_ready(tunnel), tunnel))
+
+    def _reregister(self, fileobj, current, wanted, data):
+        # data is (callback, tunnel); the loop hands the tunnel to _dispatch
+        if current == wanted:
+            return wanted
+        if not wanted:
+            self._selector.unregister(fileobj)
+        elif not current:
+            self._selector.register(fileobj, wanted, data)
+        else:
+            self._selector.modify(fileobj, wanted, data)
+        return wanted
+
+    def _socket_ready(self, tunnel, mask):
+        try:
+            if mask & selectors.EVENT_READ:
+                data = tunnel.sock.recv(self.read_size)
+                if data:
+                    tunnel.to_channel += data
+                    tunnel.forward.bytes_out += len(data)
+                else:
+                    tunnel.sock_eof = True
+                self._write_channel(tunnel)
+            if mask & selectors.EVENT_WRITE and tunnel.to_socket:
+                sent = tunnel.sock.send(tunnel.to_socket)
+                del tunnel.to_socket[:sent]
+                if not tunnel.to_socket and tunnel.channel_eof:
+                    tunnel.sock.shutdown(socket.SHUT_WR)
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            self._close_tunnel(tunnel)
+            return
+        self._finish_or_update(tunnel)
+
+    def _channel_ready(self, tunnel):
+        try:
+            data = tunnel.channel.recv(self.read_size)
+        except socket.timeout:
+            return
+        except OSError:
+            self._close_tunnel(tunnel)
+            return
+        if data:
+            tunnel.to_socket += data
+            tunnel.forward.bytes_in += len(data)
+            try:
+                sent = tunnel.sock.send(tunnel.to_socket)
+                del tunnel.to_socket[:sent]
+            except (BlockingIOError, InterruptedError):
+                pass
+            except OSError:
+                self._close_tunnel(tunnel)
+                return
+        else:
+            tunnel.channel_eof = True
+            if not tunnel.to_socket:
+                try:
+                    tunnel.sock.shutdown(socket.SHUT_WR)
+                except OSError:
+                    pass
+        self._finish_or_update(tunnel)
+
+    def _write_channel(self, tunnel):
+        if tunnel not in self._tunnels:
+            return
+        if tunnel.channel.closed:
+            # The far side is gone; what it already sent still goes out to the socket
+            tunnel.to_channel.clear()
+            self._finish_or_update(tunnel)
+            return
+        try:
+            while tunnel.to_channel and tunnel.channel.send_ready():
+                sent = tunnel.channel.send(bytes(tunnel.to_channel[:self.read_size]))
+                if not sent:
+                    break
+                del tunnel.to_channel[:sent]
+            if not tunnel.to_channel and tunnel.sock_eof:
+                tunnel.channel.shutdown_write()
+        except socket.timeout:
+            pass
+        except OSError:
+            self._close_tunnel(tunnel)
+            return
+        self._finish_or_update(tunnel)
+
+    def _finish_or_update(self, tunnel):
+        if tunnel not in self._tunnels:
+            return
+        done = tunnel.sock_eof and tunnel.channel_eof and not tunnel.to_socket and not tunnel.to_channel
+        if done or (tunnel.channel.closed and tunnel.channel_eof and not tunnel.to_socket):
+            self._close_tunnel(tunnel)
+        else:
+            self._update(tunnel)
+
+    def _close_tunnel(self, tunnel):
+        if tunnel not in self._tunnels:
+            return
+        self._tunnels.discard(tunnel)
+        tunnel.forward.active -= 1
+        for fileobj, events in ((tunnel.sock, tunnel.sock_events), (tunnel.channel, tunnel.channel_events)):
+            if events:
+                try:
+                    self._selector.unregister(fileobj)
+                except (KeyError, ValueError):
+                    # Closed by a callback that failed before its events were recorded
+                    pass
+        tunnel.sock.close()
+        tunnel.channel.close()
+
+    def _close_listener(self, forward):
+        self._selector.unregister(forward.listener)
+        forward.listener.close()
+
+    def _close_forward_tunnels(self, forward):
+        for tunnel in [tunnel for tunnel in self._tunnels if tunnel.forward is forward]:
+            self._close_tunnel(tunnel)
+
+
+_default_engine = None
+_default_engine_lock = threading.Lock()
+
+
+def get_default_engine():
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            _default_engine = ForwardingEngine()
+        return _default_engine
@@ -1,12 +1,36 @@
+import socket
 import subprocess
+import threading
+
+from connections.connect_metrics import get_default_metrics
 
 class RDPConnectionManager:
-    def __init__(self, hostname, username, password):
+    def __init__(self, hostname, username, password, port=3389, timeout=5):
         self.hostname = hostname
         self.username = username
         self.password = password
+        self.port = port
+        self.timeout = timeout
+
+    def measure_connect(self):
+        # The RDP client does its own handshake, so only DNS and TCP connect can be timed here
+        timer = get_default_metrics().timer(self.hostname, 'RDP')
+        try:
+            with timer.phase('dns'):
+                address = socket.getaddrinfo(self.hostname, int(self.port), 0, socket.SOCK_STREAM)[0]
+            with timer.phase('tcp'):
+                sock = socket.socket(address[0], address[1], address[2])
+                try:
+                    sock.settimeout(self.timeout)
+                    sock.connect(address[4])
+                finally:
+                    sock.close()
+            timer.finish()
+        except OSError:
+            pass
 
     def connect(self):
+        threading.Thread(target=self.measure_connect, name='rdp-connect-timer', daemon=True).start()
         try:
             command = [
                 'open',
@@ -0,0 +1,204 @@
+# connections/records.py
+
+from collections.abc import Mapping
+from operator import attrgetter, itemgetter
+
+_MISSING = object()
+
+# Values that usually differ between connections get a slot each
+OWN_FIELDS = ('id', 'name', 'host', 'username', 'import_key', 'import_hash')
+# The rest are mostly the same across a fleet, so they are kept together in one
+# tuple and connections with the same values share it
+SHARED_FIELDS = ('port', 'connection_type', 'password', 'key_file', 'use_agent', 'proxy_jump', 'ssh_options',
+                 'port_forwards', 'open_browser', 'tags', 'import_source')
+_SHARED_INDEX = {field: index for index, field in enumerate(SHARED_FIELDS)}
+_OWN = frozenset(OWN_FIELDS)
+_FIELDS = ('type',) + OWN_FIELDS + SHARED_FIELDS
+# Every slot is always set, absent fields to _MISSING, so this never raises
+_own_values = attrgetter(*OWN_FIELDS)
+_EMPTY_SHARED = (_MISSING,) * len(SHARED_FIELDS)
+# Merged under a connection dict, gives it every field so these never raise either
+_ABSENT = dict.fromkeys(_FIELDS, _MISSING)
+_own_items = itemgetter(*OWN_FIELDS)
+_shared_items = itemgetter(*SHARED_FIELDS)
+
+
+class ConnectionRecord(Mapping):
+    # A connection, read like the dict it is stored as in connections.json. Only
+    # ConnectionManager changes records (through its RecordStore); everything else,
+    # the tree model and search index included, refers to them by id.
+    __slots__ = OWN_FIELDS + ('shared', 'extra')
+
+    # __getitem__ and get are on every hot path (tree, search, sweeps), so neither calls the other
+    def __getitem__(self, key):
+        if key in _OWN:
+            value = getattr(self, key)
+        elif key in _SHARED_INDEX:
+            value = self.shared[_SHARED_INDEX[key]]
+        elif key == 'type':
+            return 'connection'
+        else:
+            value = self.extra.get(key, _MISSING) if self.extra else _MISSING
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        if key in _OWN:
+            value = getattr(self, key)
+        elif key in _SHARED_INDEX:
+            value = self.shared[_SHARED_INDEX[key]]
+        elif key == 'type':
+            return 'connection'
+        else:
+            value = self.extra.get(key, _MISSING) if self.extra else _MISSING
+        return default if value is _MISSING else value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self):
+        yield 'type'
+        for field, value in zip(OWN_FIELDS, _own_values(self)):
+            if value is not _MISSING:
+                yield field
+        for field, value in zip(SHARED_FIELDS, self.shared):
+            if value is not _MISSING:
+                yield field
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __eq__(self, other):
+        # Ids first: list.remove compares a record against its siblings
+        if type(other) is ConnectionRecord:
+            return (self.id == other.id and self.shared == other.shared
+                    and _own_values(self) == _own_values(other) and self.extra == other.extra)
+        if isinstance(other, Mapping):
+            return other.get('type') == 'connection' and self.to_dict() == {
+                key: tuple(value) if type(value) is list else value for key, value in other.items()}
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'ConnectionRecord({self.to_dict()!r})'
+
+    def changes(self, data, loaded=None):
+        # None if the connection dict data (as json.loads made it) holds what this record
+        # does, else the (fields, unset keys) update that makes it so. Syncing a rewritten
+        # connections.json runs this for every connection, so the common case is a few
+        # tuple comparisons. loaded caches shared tuples in their list form by id; pass
+        # the same dict for a whole pass, while the records it covers are alive.
+        loaded = {} if loaded is None else loaded
+        shared = loaded.get(id(self.shared))
+        if shared is None:
+            shared = loaded[id(self.shared)] = tuple([list(value) if type(value) is tuple else value
+                                                      for value in self.shared])
+        full = {**_ABSENT, **data}
+        if (_own_items(full) == _own_values(self) and _shared_items(full) == shared
+                and full['type'] == 'connection'):
+            # Same values; equal only if data has no keys beyond them (and extra's)
+            if not self.extra:
+                if len(full) == len(_FIELDS):
+                    return None
+            elif len(full) == len(_FIELDS) + len(self.extra) and all(
+                    full.get(key) == value for key, value in self.extra.items()):
+                return None
+        current = self.to_dict()
+        fields = {key: value for key, value in data.items() if _plain(current.get(key, _MISSING)) != _plain(value)}
+        unset = [key for key in current if key not in data]
+        return fields, unset
+
+    def to_dict(self):
+        # List fields stay tuples, which json writes as arrays all the same
+        data = {field: value for field, value in zip(_FIELDS, ('connection', *_own_values(self), *self.shared))
+                if value is not _MISSING}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+def _plain(value):
+    # Lists are held as tuples; compare them as such
+    return tuple(value) if type(value) is list else value
+
+
+def to_json(value):
+    # json.dumps(default=...) hook so snapshots and journal records serialize records directly
+    if isinstance(value, ConnectionRecord):
+        return value.to_dict()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _pool_key(value):
+    # Typed, so False, 0 and 0.0 (equal as dict keys) are pooled apart
+    if type(value) is tuple:
+        return value, tuple(map(type, value))
+    return value, type(value)
+
+
+class RecordStore:
+    # Makes and updates ConnectionRecords, interning the values connections repeat
+    # (users and the shared tuple), so 100k connections to a few dozen
+    # accounts hold a few dozen copies of those values.
+    def __init__(self):
+        self._pool = {}
+
+    def make(self, fields):
+        record = ConnectionRecord()
+        for field in OWN_FIELDS:
+            setattr(record, field, _MISSING)
+        record.shared = _EMPTY_SHARED
+        record.extra = None
+        return self.update(record, fields)
+
+    def update(self, record, fields, unset=()):
+        # Runs for every connection on load, so kept to plain loops
+        shared = None
+        for key, value in fields.items():
+            index = _SHARED_INDEX.get(key)
+            if index is not None:
+                if shared is None:
+                    shared = list(record.shared)
+                # Only the whole tuple is pooled, which keeps one copy of its contents
+                shared[index] = tuple(value) if type(value) is list else value
+            elif key in _OWN:
+                if key == 'username':
+                    value = self.intern(value)
+                elif key == 'import_key' and value == record.name:
+                    # Usually the name it was imported under; share the string
+                    value = record.name
+                setattr(record, key, value)
+            elif key != 'type':
+                if record.extra is None:
+                    record.extra = {}
+                record.extra[key] = value
+        for key in unset:
+            index = _SHARED_INDEX.get(key)
+            if index is not None:
+                if shared is None:
+                    shared = list(record.shared)
+                shared[index] = _MISSING
+            elif key in _OWN:
+                setattr(record, key, _MISSING)
+            elif record.extra:
+                record.extra.pop(key, None)
+                if not record.extra:
+                    record.extra = None
+        if shared is not None:
+            record.shared = self.intern(tuple(shared))
+        return record
+
+    def intern(self, value):
+        try:
+            # A str only ever equals another str, so it is its own key
+            return self._pool.setdefault(value if type(value) is str else _pool_key(value), value)
+        except TypeError:
+            # Unhashable, e.g. a dict option; kept as is
+            return value
+
+    def clear(self):
+        self._pool.clear()
@@ -0,0 +1,242 @@
+# connections/resolver.py
+
+import errno
+import os
+import selectors
+import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+IN_PROGRESS = (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN, getattr(errno, 'WSAEWOULDBLOCK', 10035))
+
+
+def system_lookup(hostname):
+    # [(family, sockaddr)] in the system's preferred order (RFC 6724 via getaddrinfo)
+    return [(family, sockaddr) for family, _, _, _, sockaddr in socket.getaddrinfo(hostname, 0, 0, socket.SOCK_STREAM)]
+
+
+def interleave(addresses):
+    # RFC 8305: start with the preferred family, then alternate between families
+    if not addresses:
+        return []
+    first = addresses[0][0]
+    preferred = [address for address in addresses if address[0] == first]
+    others = [address for address in addresses if address[0] != first]
+    ordered = []
+    for index in range(max(len(preferred), len(others))):
+        ordered += preferred[index:index + 1] + others[index:index + 1]
+    return ordered
+
+
+def with_port(sockaddr, port):
+    return (sockaddr[0], int(port)) + tuple(sockaddr[2:])
+
+
+def happy_eyeballs_connect(addresses, port, timeout=10, attempt_delay=0.25):
+    # Starts a connect to the next address every attempt_delay seconds (or as soon
+    # as one fails) without cancelling the earlier ones; the first to succeed wins
+    pending = list(interleave(addresses))
+    selector = selectors.DefaultSelector()
+    attempts = {}
+    deadline = time.monotonic() + timeout
+    next_start = 0
+    error = None
+    try:
+        while pending or attempts:
+            now = time.monotonic()
+            if now >= deadline:
+                raise socket.timeout(f'timed out connecting to port {port}')
+            if pending and now >= next_start:
+                family, sockaddr = pending.pop(0)
+                sock = socket.socket(family, socket.SOCK_STREAM)
+                sock.setblocking(False)
+                result = sock.connect_ex(with_port(sockaddr, port))
+                if result == 0:
+                    sock.settimeout(timeout)
+                    return sock
+                if result in IN_PROGRESS:
+                    attempts[sock] = sockaddr
+                    selector.register(sock, selectors.EVENT_WRITE)
+                    next_start = now + attempt_delay
+                else:
+                    error = OSError(result, f'{os.strerror(result)} ({sockaddr[0]})')
+                    sock.close()
+                continue
+            wait = deadline - now
+            if pending:
+                wait = min(wait, next_start - now)
+            for key, _ in selector.select(max(wait, 0)):
+                sock = key.fileobj
+                selector.unregister(sock)
+                sockaddr = attempts.pop(sock)
+                result = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if result == 0:
+                    sock.settimeout(timeout)
+                    return sock
+                error = OSError(result, f'{os.strerror(result)} ({sockaddr[0]})')
+                sock.close()
+                # A failed attempt lets the next address start right away
+                next_start = 0
+        raise error or OSError(f'no addresses to connect to on port {port}')
+    finally:
+        for sock in attempts:
+            sock.close()
+        selector.close()
+
+
+class CachedAddresses:
+    # error is the failed lookup's (exception type, args), raised afresh on each hit
+    def __init__(self, addresses, ttl, error=None):
+        self.addresses = addresses
+        self.error = error
+        self.resolved_at = time.monotonic()
+        self.expires_at = self.resolved_at + ttl
+
+    def age(self):
+        return time.monotonic() - self.resolved_at
+
+
+class Resolver:
+    # Caches A/AAAA lookups for ttl seconds (failures for negative_ttl). Entries
+    # past refresh_ahead of their ttl are refreshed in the background while the
+    # cached answer is still served, and an expired answer may be served for up
+    # to stale_ttl more while a refresh runs, so a slow DNS server only delays
+    # the first lookup of a host. lookup(hostname) -> [(family, sockaddr)] can be
+    # swapped for a stub.
+    def __init__(self, ttl=300, negative_ttl=30, stale_ttl=3600, refresh_ahead=0.8, workers=16,
+                 attempt_delay=0.25, lookup=None):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.refresh_ahead = refresh_ahead
+        self.attempt_delay = attempt_delay
+        self.lookup = lookup or system_lookup
+        self._cache = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='resolver')
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._cache)
+
+    def resolve(self, hostname, timeout=None):
+        # [(family, sockaddr)] with port 0; raises socket.gaierror like getaddrinfo
+        hostname = hostname.lower()
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(hostname)
+        if cached and now < cached.expires_at:
+            self.hits += 1
+            if cached.error is None and cached.age() >= self.ttl * self.refresh_ahead:
+                self._refresh(hostname)
+            return self._answer(cached)
+        if cached and cached.error is None and now < cached.expires_at + self.stale_ttl:
+            self.hits += 1
+            self._refresh(hostname)
+            return self._answer(cached)
+        self.misses += 1
+        try:
+            return self._answer(self._refresh(hostname).result(timeout))
+        except FutureTimeout:
+            raise socket.timeout(f'timed out resolving {hostname}')
+
+    def connect(self, hostname, port, timeout=10):
+        return happy_eyeballs_connect(self.resolve(hostname, timeout), port, timeout, self.attempt_delay)
+
+    def prefetch(self, hostnames, batch_size=256):
+        # Resolves in the background, batch by batch, so a large inventory does not queue everything at once
+        hostnames = [hostname for hostname in dict.fromkeys(hostname.lower() for hostname in hostnames if hostname)
+                     if not self._is_fresh(hostname)]
+        if not hostnames:
+            return None
+
+        def run():
+            for start in range(0, len(hostnames), batch_size):
+                for future in [self._refresh(hostname) for hostname in hostnames[start:start + batch_size]]:
+                    future.exception()
+            self.evict_expired()
+        thread = threading.Thread(target=run, name='resolver-prefetch', daemon=True)
+        thread.start()
+        return thread
+
+    def evict_expired(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                hostname for hostname, cached in self._cache.items()
+                if now >= cached.expires_at + (0 if cached.error else self.stale_ttl)
+            ]
+            for hostname in expired:
+                del self._cache[hostname]
+        return expired
+
+    def forget(self, hostname=None):
+        with self._lock:
+            if hostname is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(hostname.lower(), None)
+
+    def _is_fresh(self, hostname):
+        with self._lock:
+            cached = self._cache.get(hostname)
+        return bool(cached and time.monotonic() < cached.expires_at)
+
+    def _answer(self, cached):
+        if cached.error:
+            # A new instance per lookup; raising the cached one again would keep
+            # appending frames to its __traceback__
+            error_type, args = cached.error
+            raise error_type(*args)
+        return cached.addresses
+
+    def _refresh(self, hostname):
+        # One lookup per host at a time; concurrent callers share its future
+        with self._lock:
+            future = self._inflight.get(hostname)
+            if future:
+                return future
+            future = self._inflight[hostname] = Future()
+        self._executor.submit(self._lookup, hostname, future)
+        return future
+
+    def _lookup(self, hostname, future):
+        try:
+            cached = CachedAddresses(self.lookup(hostname), self.ttl)
+            if not cached.addresses:
+                raise socket.gaierror(socket.EAI_NONAME, f'{hostname} has no addresses')
+        except Exception as e:
+            # getaddrinfo raises UnicodeError rather than OSError for names like 'a..b'
+            # or labels over 63 characters; cached as not found like any other failure
+            if not isinstance(e, OSError):
+                e = socket.gaierror(socket.EAI_NONAME, f'{hostname}: {e}')
+            cached = CachedAddresses([], self.negative_ttl, (type(e), e.args))
+        try:
+            with self._lock:
+                previous = self._cache.get(hostname)
+                # A failed refresh keeps serving the last good answer until it goes stale
+                if cached.error is None or previous is None or previous.error is not None:
+                    self._cache[hostname] = cached
+                else:
+                    cached = previous
+        finally:
+            # Callers waiting on the future, and the next refresh, must never be left hanging
+            with self._lock:
+                self._inflight.pop(hostname, None)
+            future.set_result(cached)
+
+
+_default_resolver = None
+_default_resolver_lock = threading.Lock()
+
+
+def get_default_resolver():
+    global _default_resolver
+    with _default_resolver_lock:
+        if _default_resolver is None:
+            _default_resolver = Resolver()
+        return _default_resolver
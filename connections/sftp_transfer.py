@@ -0,0 +1,260 @@
+# connections/sftp_transfer.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.file_utils import atomic_write
+
+
+class TransferCancelled(Exception):
+    pass
+
+
+class TransferProgress:
+    def __init__(self):
+        self.total = 0
+        self.transferred = 0
+        self.resumed_from = 0
+        self.channels = 1
+        # Set once verification is done and data starts flowing
+        self.started = None
+        self.finished = False
+        self.error = None
+        # cancelled is the user's; stopping is also set when another channel failed
+        self.cancelled = threading.Event()
+        self.stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def add(self, count):
+        with self._lock:
+            self.transferred += count
+
+    def cancel(self):
+        self.cancelled.set()
+        self.stopping.set()
+
+    def elapsed(self):
+        return time.monotonic() - self.started if self.started is not None else 0.0
+
+    def rate(self):
+        elapsed = self.elapsed()
+        return (self.transferred - self.resumed_from) / elapsed if elapsed > 0 else 0.0
+
+
+class SFTPTransfer:
+    # Files are split into byte ranges, one SFTP channel per range on the pooled
+    # transport. Each channel keeps a window of requests in flight: readv() for
+    # downloads, pipelined writes for uploads. Completed offsets are recorded per
+    # range so an interrupted transfer resumes once its last block is verified.
+    def __init__(self, ssh_manager, block_size=32768, window_blocks=256, channels=4,
+                 parallel_threshold=32 * 1024 * 1024, verify_bytes=1024 * 1024, state_dir='transfers'):
+        self.ssh_manager = ssh_manager
+        self.block_size = block_size
+        self.window_size = block_size * window_blocks
+        self.channels = channels
+        self.parallel_threshold = parallel_threshold
+        self.verify_bytes = verify_bytes
+        self.state_dir = state_dir
+
+    def download(self, remote_path, local_path, progress=None):
+        progress = progress or TransferProgress()
+        sftp = self.ssh_manager.open_sftp()
+        try:
+            stat = sftp.stat(remote_path)
+            part_path = local_path + '.part'
+            state = self._load_state('download', remote_path, local_path, stat.st_size, stat.st_mtime)
+            part_size = os.path.getsize(part_path) if os.path.exists(part_path) else None
+            if state['resumed'] and part_size == stat.st_size:
+                with sftp.open(remote_path, 'rb') as source, open(part_path, 'rb') as destination:
+                    self._verify_ranges(state, source, destination)
+            else:
+                # Nothing to resume, or a .part left from another version of the
+                # source: truncated, so no stale bytes survive past the new size
+                state['ranges'] = self._split(stat.st_size)
+                with open(part_path, 'wb') as f:
+                    f.truncate(stat.st_size)
+            self._run(state, progress, lambda r: self._download_range(remote_path, part_path, r, state, progress))
+            os.replace(part_path, local_path)
+        finally:
+            sftp.close()
+        self._finish(state, progress)
+        return progress
+
+    def upload(self, local_path, remote_path, progress=None):
+        progress = progress or TransferProgress()
+        stat = os.stat(local_path)
+        part_path = remote_path + '.part'
+        sftp = self.ssh_manager.open_sftp()
+        try:
+            state = self._load_state('upload', remote_path, local_path, stat.st_size, stat.st_mtime)
+            try:
+                part_size = sftp.stat(part_path).st_size
+            except IOError:
+                part_size = None
+            if state['resumed'] and part_size == stat.st_size:
+                with open(local_path, 'rb') as source, sftp.open(part_path, 'rb') as destination:
+                    self._verify_ranges(state, source, destination)
+            else:
+                state['ranges'] = self._split(stat.st_size)
+                sftp.open(part_path, 'wb').close()
+                sftp.truncate(part_path, stat.st_size)
+            self._run(state, progress, lambda r: self._upload_range(local_path, part_path, r, state, progress))
+            try:
+                sftp.posix_rename(part_path, remote_path)
+            except IOError:
+                # Servers without the posix-rename extension refuse to overwrite
+                try:
+                    sftp.remove(remote_path)
+                except IOError:
+                    pass
+                sftp.rename(part_path, remote_path)
+        finally:
+            sftp.close()
+        self._finish(state, progress)
+        return progress
+
+    def _run(self, state, progress, transfer_range):
+        ranges = state['ranges']
+        progress.total = state['size']
+        progress.resumed_from = progress.transferred = sum(done - start for start, _, done in ranges)
+        progress.channels = len(ranges)
+        progress.started = time.monotonic()
+        pending = [r for r in ranges if r[2] < r[1]]
+        if not pending:
+            return
+        with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+            futures = [executor.submit(transfer_range, r) for r in pending]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException as e:
+                # Stop the other channels; their finished windows are already recorded.
+                # Not a cancel, so a failure is still reported as one.
+                progress.stopping.set()
+                if isinstance(e, TransferCancelled) and not progress.cancelled.is_set():
+                    # This channel was stopped by another one's failure; raise that instead
+                    for future in futures:
+                        error = future.exception()
+                        if error is not None and not isinstance(error, TransferCancelled):
+                            raise error from None
+                raise
+
+    def _download_range(self, remote_path, part_path, byte_range, state, progress):
+        sftp = self.ssh_manager.open_sftp()
+        try:
+            with sftp.open(remote_path, 'rb') as source, open(part_path, 'r+b') as destination:
+                _, end, offset = byte_range
+                while offset < end:
+                    self._check_cancelled(progress)
+                    window_end = min(end, offset + self.window_size)
+                    blocks = [
+                        (position, min(self.block_size, window_end - position))
+                        for position in range(offset, window_end, self.block_size)
+                    ]
+                    destination.seek(offset)
+                    for data in source.readv(blocks):
+                        destination.write(data)
+                    destination.flush()
+                    os.fsync(destination.fileno())
+                    self._advance(state, byte_range, window_end, progress)
+                    offset = window_end
+        finally:
+            sftp.close()
+
+    def _upload_range(self, local_path, part_path, byte_range, state, progress):
+        sftp = self.ssh_manager.open_sftp()
+        try:
+            with open(local_path, 'rb') as source, sftp.open(part_path, 'r+b') as destination:
+                _, end, offset = byte_range
+                source.seek(offset)
+                destination.seek(offset)
+                while offset < end:
+                    self._check_cancelled(progress)
+                    data = source.read(min(self.window_size, end - offset))
+                    tail = len(data) - min(self.block_size, len(data))
+                    destination.set_pipelined(True)
+                    destination.write(data[:tail])
+                    destination.flush()
+                    # A synchronous write collects every outstanding ack, so the window
+                    # is on the server (or has raised) before its offset is recorded
+                    destination.set_pipelined(False)
+                    destination.write(data[tail:])
+                    destination.flush()
+                    offset += len(data)
+                    self._advance(state, byte_range, offset, progress)
+        finally:
+            sftp.close()
+
+    def _advance(self, state, byte_range, offset, progress):
+        progress.add(offset - byte_range[2])
+        byte_range[2] = offset
+        self._save_state(state)
+
+    def _check_cancelled(self, progress):
+        if progress.stopping.is_set():
+            raise TransferCancelled()
+
+    def _verify_ranges(self, state, source, destination):
+        # Resume each range only if the last block before its offset matches on both sides
+        for byte_range in state['ranges']:
+            start, _, done = byte_range
+            if done <= start:
+                continue
+            verify_from = max(start, done - self.verify_bytes)
+            if self._digest(source, verify_from, done) != self._digest(destination, verify_from, done):
+                byte_range[2] = start
+
+    def _digest(self, f, start, end):
+        digest = hashlib.sha256()
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            data = f.read(min(self.window_size, remaining))
+            if not data:
+                break
+            digest.update(data)
+            remaining -= len(data)
+        return digest.hexdigest()
+
+    def _split(self, size):
+        count = self.channels if size >= self.parallel_threshold else 1
+        step = -(-size // count) if size else 0
+        return [[start, min(size, start + step), start] for start in range(0, size, step)] if size else []
+
+    def _state_path(self, direction, remote_path, local_path):
+        manager = self.ssh_manager
+        key = f"{direction}|{manager.username}@{manager.hostname}:{manager.port}|{remote_path}|{os.path.abspath(local_path)}"
+        return os.path.join(self.state_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def _load_state(self, direction, remote_path, local_path, size, mtime):
+        path = self._state_path(direction, remote_path, local_path)
+        state = {'path': path, 'size': size, 'mtime': mtime, 'ranges': [], 'resumed': False}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                saved = json.load(f)
+            # A changed source invalidates whatever was transferred before
+            if saved.get('size') == size and saved.get('mtime') == mtime:
+                state['ranges'] = saved['ranges']
+                state['resumed'] = bool(saved['ranges'])
+        if not state['ranges']:
+            state['ranges'] = self._split(size)
+        state['lock'] = threading.Lock()
+        return state
+
+    def _save_state(self, state):
+        with state['lock']:
+            data = json.dumps({key: state[key] for key in ('size', 'mtime', 'ranges')})
+            os.makedirs(self.state_dir, exist_ok=True)
+            atomic_write(state['path'], data)
+
+    def _finish(self, state, progress):
+        progress.finished = True
+        self.ssh_manager.observe_throughput(
+            progress.transferred - progress.resumed_from, progress.elapsed(), progress.channels
+        )
+        if os.path.exists(state['path']):
+            os.remove(state['path'])
@@ -2,24 +2,125 @@ import paramiko
 import threading
 import subprocess
 
+from connections.ssh_pool import get_default_pool
+from connections.transport_tuning import TransportProfile
+
+def parse_jump_hosts(spec):
+    # ProxyJump syntax: "[user@]host[:port],..." in the order the hops are made
+    hops = []
+    for part in (spec or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        username, _, address = part.rpartition('@')
+        hostname, port = address, 22
+        if address.startswith('['):
+            hostname, _, rest = address[1:].partition(']')
+            if rest.startswith(':') and rest[1:].isdigit():
+                port = int(rest[1:])
+        elif address.count(':') == 1:
+            hostname, _, port_text = address.partition(':')
+            port = int(port_text) if port_text.isdigit() else 22
+        hops.append({'hostname': hostname, 'port': port, 'username': username or None})
+    return hops
+
 class SSHConnectionManager:
-    def __init__(self, hostname, username, password, port=22, ssh_options=None):
+    def __init__(self, hostname, username, password, port=22, ssh_options=None, pool=None,
+                 key_filename=None, allow_agent=False, jump_hosts=None, transport_profile=None):
         self.hostname = hostname
         self.username = username
         self.password = password
         self.port = port
-        self.ssh_options = ssh_options if ssh_options else []
-        self.client = None
+        self.key_filename = key_filename or None
+        self.allow_agent = allow_agent
+        # Hops as dicts of get_transport() arguments (hostname, port, username, password, ...)
+        self.jump_hosts = jump_hosts or []
+        self.ssh_options = [option for option in (ssh_options or []) if option.strip()]
+        self.pool = pool if pool else get_default_pool()
+        self.transport = None
+        # A calibrated profile stored with the connection; the pool applies it to new transports
+        if transport_profile:
+            self.pool.profiles.set(self.pool_key(), TransportProfile.from_dict(transport_profile))
+
+    def transport_profile(self):
+        return self.pool.profiles.get(self.pool_key())
+
+    def observe_throughput(self, transferred, seconds, channels=1):
+        # Per-channel rate of a finished transfer, for drift detection; small
+        # transfers mostly measure round trips, so they are left out
+        if transferred >= 4 * 1024 * 1024 and seconds > 0:
+            self.pool.profiles.observe(self.pool_key(), transferred / seconds / max(1, channels))
 
     def connect(self):
+        # Reuses the pooled transport for this host/port/user when one is alive
+        try:
+            self.transport = self.pool.get_transport(
+                self.hostname, self.port, self.username, self.password, self.key_filename, self.allow_agent,
+                self.jump_hosts
+            )
+            return True
+        except (paramiko.SSHException, OSError) as e:
+            print(f"SSH connection failed: {e}")
+            return False
+
+    def launch_terminal(self):
         command = [
             'ssh',
             f'{self.username}@{self.hostname}',
             '-p', str(self.port)
-        ] + self.ssh_options
+        ] + (['-i', self.key_filename] if self.key_filename else [])
+        if self.jump_hosts:
+            command += ['-J', ','.join(
+                f"{hop['username']}@{hop['hostname']}:{hop.get('port', 22)}" for hop in self.jump_hosts
+            )]
+        profile = self.transport_profile()
+        if profile:
+            # Unless the connection's own options already choose
+            options = ' '.join(self.ssh_options)
+            if profile.cipher and '-c' not in self.ssh_options and 'Ciphers' not in options:
+                command += ['-c', profile.cipher]
+            if profile.compression and '-C' not in self.ssh_options and 'Compression' not in options:
+                command += ['-C']
+        command += self.ssh_options
         try:
             subprocess.Popen(command)
             return True
         except Exception as e:
-            print(f"SSH connection failed: {e}")
+            print(f"SSH terminal launch failed: {e}")
             return False
+
+    def open_session(self):
+        return self.pool.open_session(
+            self.hostname, self.port, self.username, self.password, self.key_filename, self.allow_agent,
+            self.jump_hosts
+        )
+
+    def open_sftp(self):
+        return self.pool.open_sftp(
+            self.hostname, self.port, self.username, self.password, self.key_filename, self.allow_agent,
+            self.jump_hosts
+        )
+
+    def open_channel(self, destination, origin=('127.0.0.1', 0)):
+        return self.pool.open_channel(
+            self.hostname, self.port, self.username, self.password, self.key_filename, self.allow_agent,
+            self.jump_hosts, destination=destination, origin=origin
+        )
+
+    def pool_key(self):
+        return self.pool.make_key(self.hostname, self.port, self.username, self.jump_hosts)
+
+    def exec_command(self, command, timeout=None):
+        channel = self.open_session()
+        try:
+            channel.settimeout(timeout)
+            channel.exec_command(command)
+            stdout = channel.makefile('rb').read()
+            stderr = channel.makefile_stderr('rb').read()
+            return channel.recv_exit_status(), stdout, stderr
+        finally:
+            channel.close()
+
+    def close(self):
+        # The transport stays in the pool for the next session to this host
+        self.transport = None
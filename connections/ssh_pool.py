@@ -0,0 +1,321 @@
+# connections/ssh_pool.py
+
+import os
+import threading
+import time
+import weakref
+
+import paramiko
+
+from connections.connect_metrics import ConnectMetrics, get_default_metrics
+from connections.key_cache import agent_keys, get_default_key_cache
+from connections.resolver import get_default_resolver, happy_eyeballs_connect
+from connections.transport_tuning import get_default_profiles
+
+
+class PooledTransport:
+    def __init__(self, key, transport):
+        self.key = key
+        self.transport = transport
+        self.last_used = time.monotonic()
+        self.channels = weakref.WeakSet()
+        # The first channel is timed as part of the connect, later ones apart
+        self.first_channel = True
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    def open_channels(self):
+        return sum(1 for channel in list(self.channels) if not channel.closed)
+
+    def is_idle(self, idle_timeout):
+        if self.open_channels():
+            return False
+        return time.monotonic() - self.last_used >= idle_timeout
+
+
+class SSHTransportPool:
+    # One authenticated paramiko transport per (host, port, user); sessions,
+    # commands and SFTP open new channels on it instead of reconnecting. A tuned
+    # TransportProfile for the key sets its cipher, compression and window sizes.
+    def __init__(self, keepalive_interval=30, idle_timeout=300, connect_timeout=10,
+                 known_hosts_file='~/.ssh/known_hosts', metrics=None, key_cache=None, resolver=None, profiles=None):
+        self.metrics = metrics or get_default_metrics()
+        self.key_cache = key_cache if key_cache is not None else get_default_key_cache()
+        self.resolver = resolver if resolver is not None else get_default_resolver()
+        self.profiles = profiles if profiles is not None else get_default_profiles()
+        self.keepalive_interval = keepalive_interval
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.known_hosts_file = os.path.expanduser(known_hosts_file)
+        self._transports = {}
+        self._key_locks = {}
+        self._pins = {}
+        self._lock = threading.Lock()
+        self._known_hosts_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._reaper = None
+
+    @staticmethod
+    def make_key(hostname, port, username, jump_hosts=None):
+        # The same target reached through different bastions is a different transport
+        via = tuple((hop['hostname'], int(hop.get('port', 22)), hop['username']) for hop in jump_hosts or [])
+        return (hostname, int(port), username, via)
+
+    def get_transport(self, hostname, port, username, password=None, key_filename=None, allow_agent=False,
+                      jump_hosts=None):
+        key = self.make_key(hostname, port, username, jump_hosts)
+        while True:
+            with self._lock:
+                key_lock = self._key_locks.setdefault(key, threading.Lock())
+            # Concurrent callers for the same key wait for a single handshake
+            with key_lock:
+                with self._lock:
+                    if self._key_locks.get(key) is not key_lock:
+                        # Dropped with its transport while this caller waited
+                        continue
+                    entry = self._transports.get(key)
+                if entry and entry.transport.is_active():
+                    entry.touch()
+                    return entry.transport
+                if entry:
+                    with self._lock:
+                        self._transports.pop(key, None)
+                    entry.transport.close()
+                try:
+                    transport = self._open_transport(
+                        hostname, port, username, password, key_filename, allow_agent, jump_hosts
+                    )
+                except Exception:
+                    # Nothing is pooled for the key, so its lock is not kept either
+                    with self._lock:
+                        self._key_locks.pop(key, None)
+                    raise
+                with self._lock:
+                    self._transports[key] = PooledTransport(key, transport)
+                self._start_reaper()
+                return transport
+
+    def open_session(self, hostname, port, username, password=None, key_filename=None, allow_agent=False,
+                     jump_hosts=None):
+        transport = self.get_transport(hostname, port, username, password, key_filename, allow_agent, jump_hosts)
+        key = self.make_key(hostname, port, username, jump_hosts)
+        with self.metrics.timer(hostname, 'SSH').phase(self._channel_phase(key)):
+            channel = transport.open_session(timeout=self.connect_timeout)
+        self._track(key, channel)
+        return channel
+
+    def open_sftp(self, hostname, port, username, password=None, key_filename=None, allow_agent=False,
+                  jump_hosts=None):
+        transport = self.get_transport(hostname, port, username, password, key_filename, allow_agent, jump_hosts)
+        key = self.make_key(hostname, port, username, jump_hosts)
+        with self.metrics.timer(hostname, 'SSH').phase(self._channel_phase(key)):
+            sftp = paramiko.SFTPClient.from_transport(transport)
+        self._track(key, sftp.get_channel())
+        return sftp
+
+    def open_channel(self, hostname, port, username, password=None, key_filename=None, allow_agent=False,
+                     jump_hosts=None, destination=None, origin=('127.0.0.1', 0)):
+        # A direct-tcpip channel from the host to destination, for port forwards
+        transport = self.get_transport(hostname, port, username, password, key_filename, allow_agent, jump_hosts)
+        channel = transport.open_channel('direct-tcpip', destination, origin, timeout=self.connect_timeout)
+        self._track(self.make_key(hostname, port, username, jump_hosts), channel)
+        return channel
+
+    def open_unpooled(self, hostname, port, username, password=None, key_filename=None, allow_agent=False,
+                      jump_hosts=None, profile=None):
+        # A transport of its own, set up with profile instead of the stored one, e.g.
+        # to calibrate; the caller closes it. Its connect times stay out of the metrics.
+        return self._open_transport(
+            hostname, port, username, password, key_filename, allow_agent, jump_hosts,
+            profile=profile, metrics=ConnectMetrics()
+        )
+
+    def pin(self, key):
+        # Pinned transports are kept even when idle, e.g. while port forwards listen on them
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, key):
+        with self._lock:
+            if self._pins.get(key, 0) <= 1:
+                self._pins.pop(key, None)
+            else:
+                self._pins[key] -= 1
+
+    def close(self, key):
+        with self._lock:
+            entry = self._transports.pop(key, None)
+            # The key's lock goes with its transport, unless a handshake holds it
+            key_lock = self._key_locks.get(key)
+            if key_lock and not key_lock.locked():
+                del self._key_locks[key]
+        if entry:
+            entry.transport.close()
+
+    def close_all(self):
+        self._stopped.set()
+        with self._lock:
+            keys = list(self._transports)
+        for key in keys:
+            self.close(key)
+
+    def evict_idle(self):
+        with self._lock:
+            stale = [
+                key for key, entry in self._transports.items()
+                if not entry.transport.is_active()
+                or (key not in self._pins and entry.is_idle(self.idle_timeout))
+            ]
+        for key in stale:
+            self.close(key)
+        return stale
+
+    def _channel_phase(self, key):
+        # Sessions on a reused transport would otherwise flood the connect breakdown
+        with self._lock:
+            entry = self._transports.get(key)
+            if entry is None or not entry.first_channel:
+                return 'reused_channel'
+            entry.first_channel = False
+            return 'channel'
+
+    def _track(self, key, channel):
+        with self._lock:
+            entry = self._transports.get(key)
+        if entry:
+            entry.channels.add(channel)
+            entry.touch()
+
+    def _open_transport(self, hostname, port, username, password, key_filename=None, allow_agent=False,
+                        jump_hosts=None, profile=None, metrics=None):
+        # Each phase is timed separately so slow DNS, slow networks and slow auth backends stand apart
+        timer = (metrics or self.metrics).timer(hostname, 'SSH')
+        if profile is None:
+            profile = self.profiles.get(self.make_key(hostname, port, username, jump_hosts))
+        if jump_hosts:
+            # The last hop forwards to the target; it is itself reached through the hops
+            # before it, so every target behind a bastion shares the bastion's transport
+            hop = jump_hosts[-1]
+            bastion = self.get_transport(
+                hop['hostname'], hop.get('port', 22), hop['username'], hop.get('password'),
+                hop.get('key_filename'), hop.get('allow_agent', False), jump_hosts[:-1]
+            )
+            with timer.phase('tcp'):
+                sock = bastion.open_channel(
+                    'direct-tcpip', (hostname, int(port)), ('127.0.0.1', 0), timeout=self.connect_timeout
+                )
+            self._track(self.make_key(hop['hostname'], hop.get('port', 22), hop['username'], jump_hosts[:-1]), sock)
+        else:
+            # Usually a cache hit: the inventory is resolved in the background at startup
+            with timer.phase('dns'):
+                addresses = self.resolver.resolve(hostname, self.connect_timeout)
+            with timer.phase('tcp'):
+                sock = happy_eyeballs_connect(addresses, port, self.connect_timeout, self.resolver.attempt_delay)
+        if profile is not None:
+            transport = paramiko.Transport(sock, **profile.transport_options())
+            profile.apply(transport)
+        else:
+            transport = paramiko.Transport(sock)
+        try:
+            with timer.phase('kex'):
+                transport.start_client(timeout=self.connect_timeout)
+                self._check_host_key(hostname, port, transport.get_remote_server_key())
+            with timer.phase('auth'):
+                self._authenticate(transport, username, password, key_filename, allow_agent)
+        except Exception:
+            transport.close()
+            raise
+        timer.finish()
+        transport.set_keepalive(self.keepalive_interval)
+        return transport
+
+    def _authenticate(self, transport, username, password, key_filename, allow_agent):
+        # Key file first (unlocked once per process by the key cache), then the
+        # agent's keys, then the password
+        error = None
+        if key_filename:
+            try:
+                transport.auth_publickey(username, self.key_cache.get(key_filename))
+                return
+            except paramiko.PasswordRequiredException:
+                error = paramiko.AuthenticationException(f"Key {key_filename} is locked; unlock it first")
+            except paramiko.AuthenticationException as e:
+                error = e
+        if allow_agent:
+            agent, keys = agent_keys()
+            try:
+                for key in keys:
+                    try:
+                        transport.auth_publickey(username, key)
+                        return
+                    except paramiko.AuthenticationException as e:
+                        error = e
+            finally:
+                agent.close()
+        if password:
+            transport.auth_password(username, password)
+        elif error:
+            raise error
+        else:
+            transport.auth_none(username)
+
+    def _check_host_key(self, hostname, port, server_key):
+        lookup = hostname if int(port) == 22 else f'[{hostname}]:{port}'
+        if self._known_host_key(lookup, server_key):
+            return
+        # Unknown hosts are accepted and recorded, as paramiko's AutoAddPolicy does,
+        # so a changed key is caught from the next connection on
+        with self._known_hosts_lock:
+            # Another handshake to the same host may have recorded it meanwhile
+            if self._known_host_key(lookup, server_key):
+                return
+            directory = os.path.dirname(self.known_hosts_file)
+            if directory:
+                os.makedirs(directory, mode=0o700, exist_ok=True)
+            line = paramiko.hostkeys.HostKeyEntry([lookup], server_key).to_line().encode('utf-8')
+            with open(self.known_hosts_file, 'ab+') as f:
+                # Starts a line of its own even after a hand-edited last line
+                if f.seek(0, os.SEEK_END):
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        line = b'\n' + line
+                f.write(line)
+
+    def _known_host_key(self, lookup, server_key):
+        # True if known_hosts has this key for the host, False if it has none of its type
+        host_keys = paramiko.HostKeys()
+        if os.path.exists(self.known_hosts_file):
+            host_keys.load(self.known_hosts_file)
+        known = host_keys.lookup(lookup)
+        if not known or server_key.get_name() not in known:
+            return False
+        if known[server_key.get_name()] != server_key:
+            raise paramiko.BadHostKeyException(lookup, server_key, known[server_key.get_name()])
+        return True
+
+    def _start_reaper(self):
+        if self._reaper and self._reaper.is_alive():
+            return
+        self._stopped.clear()
+        self._reaper = threading.Thread(target=self._reap, name='ssh-pool-reaper', daemon=True)
+        self._reaper.start()
+
+    def _reap(self):
+        interval = max(1, min(self.keepalive_interval, self.idle_timeout) // 2)
+        while not self._stopped.wait(interval):
+            self.evict_idle()
+            self.key_cache.evict_expired()
+            self.resolver.evict_expired()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool():
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = SSHTransportPool()
+        return _default_pool
@@ -0,0 +1,110 @@
+# connections/terminal_session.py
+
+import queue
+import threading
+import time
+from collections import deque
+
+from connections.connect_metrics import get_default_metrics
+
+class TerminalSession:
+    # A worker thread reads the channel into a byte-capped ring buffer; the UI
+    # drains it on its own schedule, and the oldest output is dropped if it falls behind.
+    # A recorder, if given, receives every byte read, including output the UI dropped.
+    # Input is queued to a writer thread, so a full send window (a large paste) or a
+    # channel the peer closed never blocks or raises in the UI.
+    def __init__(self, channel, max_buffer_bytes=4 * 1024 * 1024, read_size=65536, recorder=None, host=None):
+        self.channel = channel
+        self.recorder = recorder
+        # Time from the shell request to its first output byte is recorded against host
+        self.host = host
+        self.started = time.perf_counter()
+        self.max_buffer_bytes = max_buffer_bytes
+        self.read_size = read_size
+        self.dropped_bytes = 0
+        self.closed = False
+        self.error = ''
+        self._writes = queue.SimpleQueue()
+        self._chunks = deque()
+        self._buffered = 0
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_loop, name='terminal-reader', daemon=True)
+        self._writer = threading.Thread(target=self._write_loop, name='terminal-writer', daemon=True)
+
+    @classmethod
+    def open(cls, ssh_manager, width=120, height=40, term='xterm', **options):
+        channel = ssh_manager.open_session()
+        started = time.perf_counter()
+        channel.get_pty(term=term, width=width, height=height)
+        channel.invoke_shell()
+        session = cls(channel, host=ssh_manager.hostname, **options)
+        session.started = started
+        session.start()
+        return session
+
+    def start(self):
+        self._reader.start()
+        self._writer.start()
+
+    def drain(self):
+        with self._lock:
+            if not self._chunks:
+                return b''
+            data = b''.join(self._chunks)
+            self._chunks.clear()
+            self._buffered = 0
+        return data
+
+    def send(self, data):
+        if not self.closed:
+            self._writes.put(data)
+
+    def resize(self, width, height):
+        if not self.closed:
+            self.channel.resize_pty(width=width, height=height)
+
+    def close(self):
+        self.closed = True
+        self._writes.put(None)
+        self.channel.close()
+
+    def _write_loop(self):
+        while True:
+            data = self._writes.get()
+            if data is None:
+                return
+            try:
+                self.channel.sendall(data)
+            except (OSError, EOFError) as e:
+                self.error = self.error or str(e) or type(e).__name__
+                self.closed = True
+                return
+
+    def _read_loop(self):
+        first = True
+        try:
+            while True:
+                data = self.channel.recv(self.read_size)
+                if not data:
+                    break
+                if first and self.host:
+                    get_default_metrics().record(self.host, 'SSH', 'first_byte', time.perf_counter() - self.started)
+                first = False
+                if self.recorder:
+                    self.recorder.write(data)
+                self._append(data)
+        except OSError:
+            pass
+        finally:
+            self.closed = True
+            if self.recorder:
+                self.recorder.close()
+
+    def _append(self, data):
+        with self._lock:
+            self._chunks.append(data)
+            self._buffered += len(data)
+            while self._buffered > self.max_buffer_bytes and len(self._chunks) > 1:
+                dropped = self._chunks.popleft()
+                self._buffered -= len(dropped)
+                self.dropped_bytes += len(dropped)
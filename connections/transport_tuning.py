@@ -0,0 +1,262 @@
+# connections/transport_tuning.py
+
+import base64
+import os
+import threading
+import time
+
+import paramiko
+from paramiko.common import DEFAULT_MAX_PACKET_SIZE, DEFAULT_WINDOW_SIZE
+
+# Tried in this order; names the installed paramiko does not implement are
+# skipped (2.11 has neither AES-GCM nor ChaCha20-Poly1305, leaving the CTR modes)
+CANDIDATE_CIPHERS = ('aes128-gcm@openssh.com', 'aes256-gcm@openssh.com', 'chacha20-poly1305@openssh.com',
+                     'aes128-ctr', 'aes256-ctr')
+# (channel window, max packet) pairs tried with the winning cipher: paramiko's
+# default, then larger windows for links with a large bandwidth-delay product
+WINDOW_CANDIDATES = (
+    (DEFAULT_WINDOW_SIZE, DEFAULT_MAX_PACKET_SIZE),
+    (8 * 1024 * 1024, DEFAULT_MAX_PACKET_SIZE),
+    (16 * 1024 * 1024, 2 * DEFAULT_MAX_PACKET_SIZE),
+)
+# Reads the sample from stdin, then repeats it until the channel is closed
+SOURCE_COMMAND = "sh -c 'seed=$(cat); while printf \"%s\" \"$seed\"; do :; done'"
+
+
+def available_ciphers():
+    supported = paramiko.Transport._preferred_ciphers
+    return [cipher for cipher in CANDIDATE_CIPHERS if cipher in supported]
+
+
+def sample_payload(size=65536):
+    # Log-like lines around random tokens: compresses about as well as terminal
+    # output and text files do, unlike zeros or random bytes
+    lines = []
+    total = 0
+    count = 0
+    while total < size:
+        token = base64.b64encode(os.urandom(24)).decode('ascii')
+        line = f"2026-01-01T00:{count // 60 % 60:02d}:{count % 60:02d} INFO worker-{count % 8} " \
+               f"request {token} served in {count * 7 % 500} ms\n"
+        lines.append(line)
+        total += len(line)
+        count += 1
+    return ''.join(lines).encode('ascii')[:size]
+
+
+class TransportProfile:
+    # How to set up a paramiko transport to one host, and what calibration measured
+    # with it. Stored with the connection as a plain dict (to_dict/from_dict).
+    def __init__(self, cipher=None, compression=False, window_size=DEFAULT_WINDOW_SIZE,
+                 max_packet_size=DEFAULT_MAX_PACKET_SIZE, handshake_ms=None, throughput=None, tuned_at=None):
+        self.cipher = cipher
+        self.compression = compression
+        self.window_size = window_size
+        self.max_packet_size = max_packet_size
+        self.handshake_ms = handshake_ms
+        # Bytes per second received during calibration, after decompression
+        self.throughput = throughput
+        self.tuned_at = tuned_at
+
+    def transport_options(self):
+        # Keyword arguments for paramiko.Transport; channels opened on it use these sizes
+        return {'default_window_size': self.window_size, 'default_max_packet_size': self.max_packet_size}
+
+    def apply(self, transport):
+        # Call before start_client. The cipher is only moved to the front, so a server
+        # without it still negotiates one of the others.
+        if self.cipher:
+            options = transport.get_security_options()
+            ciphers = tuple(options.ciphers)
+            if self.cipher in ciphers:
+                options.ciphers = (self.cipher,) + tuple(cipher for cipher in ciphers if cipher != self.cipher)
+        transport.use_compression(self.compression)
+
+    def to_dict(self):
+        return {
+            'cipher': self.cipher,
+            'compression': self.compression,
+            'window_size': self.window_size,
+            'max_packet_size': self.max_packet_size,
+            'handshake_ms': self.handshake_ms,
+            'throughput': self.throughput,
+            'tuned_at': self.tuned_at,
+        }
+
+    @staticmethod
+    def from_dict(data):
+        return TransportProfile(
+            data.get('cipher'), data.get('compression', False), data.get('window_size', DEFAULT_WINDOW_SIZE),
+            data.get('max_packet_size', DEFAULT_MAX_PACKET_SIZE), data.get('handshake_ms'),
+            data.get('throughput'), data.get('tuned_at')
+        )
+
+    def describe(self):
+        text = f"{self.cipher or 'default cipher'}, {'zlib' if self.compression else 'no compression'}, " \
+               f"{self.window_size // 1024} KB window"
+        if self.throughput:
+            text += f", {self.throughput / 1e6:.1f} MB/s"
+        if self.handshake_ms is not None:
+            text += f", {self.handshake_ms:.0f} ms handshake"
+        return text
+
+
+class TransportCalibrator:
+    # Measures candidate profiles against one host: a fresh, unpooled transport per
+    # candidate (handshake time), then a sample repeated back by the host for about
+    # duration seconds (throughput). Downloads are measured since that is where the
+    # client's window applies; uploads are bounded by the server's.
+    def __init__(self, duration=1.0, sample_bytes=32 * 1024 * 1024, source_command=SOURCE_COMMAND,
+                 tie_margin=0.05):
+        self.duration = duration
+        self.sample_bytes = sample_bytes
+        self.source_command = source_command
+        # Throughputs this close to the best count as a tie
+        self.tie_margin = tie_margin
+        self._payload = sample_payload()
+
+    def calibrate(self, ssh_manager):
+        # Ciphers with and without compression first, then window sizes for the
+        # winner. Returns the best profile and every candidate measured.
+        results = []
+        for cipher in available_ciphers():
+            for compression in (False, True):
+                result = self.measure(ssh_manager, TransportProfile(cipher, compression))
+                if result:
+                    results.append(result)
+        if not results:
+            raise paramiko.SSHException("No transport profile could be measured")
+        best = self.pick(results)
+        for window_size, max_packet_size in WINDOW_CANDIDATES[1:]:
+            result = self.measure(
+                ssh_manager, TransportProfile(best.cipher, best.compression, window_size, max_packet_size)
+            )
+            if result:
+                results.append(result)
+        best = self.pick(results)
+        best.tuned_at = time.time()
+        return best, results
+
+    def pick(self, results):
+        # Compression costs CPU and larger windows memory, so a tie goes to the
+        # lighter settings, then to the faster handshake
+        fastest = max(result.throughput for result in results)
+        close = [result for result in results if result.throughput >= fastest * (1 - self.tie_margin)]
+        return min(close, key=lambda result: (result.compression, result.window_size, result.handshake_ms))
+
+    def measure(self, ssh_manager, profile):
+        # None when the server did not agree to the candidate's cipher or compression
+        started = time.perf_counter()
+        transport = ssh_manager.pool.open_unpooled(
+            ssh_manager.hostname, ssh_manager.port, ssh_manager.username, ssh_manager.password,
+            ssh_manager.key_filename, ssh_manager.allow_agent, ssh_manager.jump_hosts, profile=profile
+        )
+        try:
+            handshake_ms = (time.perf_counter() - started) * 1000
+            if transport.local_cipher != profile.cipher:
+                return None
+            if profile.compression and transport.local_compression in (None, 'none'):
+                return None
+            throughput = self.download(transport)
+        finally:
+            transport.close()
+        return TransportProfile(profile.cipher, profile.compression, profile.window_size, profile.max_packet_size,
+                                handshake_ms, throughput)
+
+    def download(self, transport):
+        # Bytes per second the host repeats back over a new channel on transport
+        channel = transport.open_session(timeout=10)
+        try:
+            channel.exec_command(self.source_command)
+            channel.sendall(self._payload)
+            channel.shutdown_write()
+            channel.settimeout(self.duration + 10)
+            # The clock starts at the first byte, so the command's startup is not counted
+            started = None
+            received = 0
+            while True:
+                data = channel.recv(262144)
+                if not data:
+                    break
+                if started is None:
+                    started = time.perf_counter()
+                    continue
+                received += len(data)
+                if received >= self.sample_bytes or time.perf_counter() - started >= self.duration:
+                    break
+            elapsed = time.perf_counter() - started if started else 0
+        finally:
+            channel.close()
+        if not received or not elapsed:
+            raise paramiko.SSHException(f"'{self.source_command}' sent no data back")
+        return received / elapsed
+
+
+class TransportProfiles:
+    # Profiles by pool key, applied by SSHTransportPool when it opens a transport.
+    # Throughput seen on real transfers is averaged per key: the first min_samples
+    # after a profile is set become its baseline, and once the average moves more
+    # than drift (a fraction) away from it, listeners are told so it can be re-tuned.
+    def __init__(self, drift=0.5, min_samples=3, smoothing=0.3):
+        self.drift = drift
+        self.min_samples = min_samples
+        self.smoothing = smoothing
+        self.listeners = []
+        self._profiles = {}
+        self._observed = {}
+        self._lock = threading.Lock()
+
+    def set(self, key, profile):
+        with self._lock:
+            current = self._profiles.get(key)
+            if current is not None and current.to_dict() == profile.to_dict():
+                return
+            self._profiles[key] = profile
+            self._observed.pop(key, None)
+
+    def get(self, key):
+        with self._lock:
+            return self._profiles.get(key)
+
+    def remove(self, key):
+        with self._lock:
+            self._profiles.pop(key, None)
+            self._observed.pop(key, None)
+
+    def add_listener(self, listener):
+        # Called as listener(key, profile, rate, baseline) on the thread that observed the drift
+        self.listeners.append(listener)
+
+    def observe(self, key, rate):
+        # rate in bytes per second; True when it tipped the key into drift
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is None:
+                return False
+            state = self._observed.setdefault(key, {'samples': 0, 'rate': rate, 'baseline': None, 'drifted': False})
+            state['samples'] += 1
+            state['rate'] += self.smoothing * (rate - state['rate'])
+            if state['baseline'] is None:
+                if state['samples'] >= self.min_samples:
+                    state['baseline'] = state['rate']
+                return False
+            if state['drifted'] or abs(state['rate'] / state['baseline'] - 1) <= self.drift:
+                return False
+            # Reported once; set() with the re-tuned profile starts a new baseline
+            state['drifted'] = True
+            average, baseline = state['rate'], state['baseline']
+        for listener in self.listeners:
+            listener(key, profile, average, baseline)
+        return True
+
+
+_default_profiles = None
+_default_profiles_lock = threading.Lock()
+
+
+def get_default_profiles():
+    global _default_profiles
+    with _default_profiles_lock:
+        if _default_profiles is None:
+            _default_profiles = TransportProfiles()
+        return _default_profiles
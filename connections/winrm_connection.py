@@ -0,0 +1,295 @@
+# connections/winrm_connection.py
+
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from winrm.exceptions import WinRMError, WinRMOperationTimeoutError, WinRMTransportError
+from winrm.protocol import Protocol
+from winrm.transport import Transport
+
+from connections.connect_metrics import get_default_metrics
+from connections.resolver import get_default_resolver
+
+WINRM_ERRORS = (WinRMError, WinRMTransportError, requests.RequestException, OSError)
+
+
+class _ResolvingConnectionMixin:
+    # urllib3 connections that take addresses from the shared resolver and race them
+    resolver = None
+
+    def _new_conn(self):
+        timeout = self.timeout if isinstance(self.timeout, (int, float)) else None
+        try:
+            sock = self.resolver.connect(self._dns_host, self.port, timeout)
+        except socket.timeout as e:
+            raise ConnectTimeoutError(self, f"Connection to {self.host} timed out. (connect timeout={timeout})") from e
+        except OSError as e:
+            raise NewConnectionError(self, f"Failed to establish a new connection: {e}") from e
+        for option in self.socket_options or []:
+            sock.setsockopt(*option)
+        return sock
+
+
+class ResolvingAdapter(HTTPAdapter):
+    def __init__(self, resolver, **kwargs):
+        self.resolver = resolver
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        pools = {}
+        for scheme, pool_class, connection_class in (('http', HTTPConnectionPool, HTTPConnection),
+                                                     ('https', HTTPSConnectionPool, HTTPSConnection)):
+            connection = type(f'Resolving{connection_class.__name__}', (_ResolvingConnectionMixin, connection_class),
+                              {'resolver': self.resolver})
+            pools[scheme] = type(f'Resolving{pool_class.__name__}', (pool_class,), {'ConnectionCls': connection})
+        self.poolmanager.pool_classes_by_scheme = pools
+
+
+class _ResolvingTransport(Transport):
+    # Mounts the resolver's adapter on pywinrm's session before its first request,
+    # which for NTLM over HTTP is the encryption handshake inside build_session()
+    def __init__(self, resolver, **options):
+        super().__init__(**options)
+        self.resolver = resolver
+
+    def build_session(self):
+        super().build_session()
+        self._mount()
+
+    def setup_encryption(self):
+        self._mount()
+        super().setup_encryption()
+
+    def _mount(self):
+        if not isinstance(self.session.get_adapter(self.endpoint), ResolvingAdapter):
+            adapter = ResolvingAdapter(self.resolver)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+
+
+class PooledShell:
+    def __init__(self, key, protocol, shell_id):
+        self.key = key
+        self.protocol = protocol
+        self.shell_id = shell_id
+        # One command at a time per shell; hosts run in parallel, not commands on a host
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    def is_idle(self, idle_timeout):
+        if self.lock.locked():
+            return False
+        return time.monotonic() - self.last_used >= idle_timeout
+
+
+class WinRMShellPool:
+    # One remote shell per (endpoint, user), kept open across commands. Its
+    # protocol keeps a requests session, so the HTTP connection (and its NTLM or
+    # Kerberos auth) is reused too; a command costs Command/Receive/Signal
+    # instead of also creating and deleting a shell.
+    def __init__(self, idle_timeout=120, operation_timeout=20, read_timeout=30, transport='ntlm',
+                 server_cert_validation='validate', metrics=None, resolver=None):
+        self.metrics = metrics or get_default_metrics()
+        self.resolver = resolver if resolver is not None else get_default_resolver()
+        self.idle_timeout = idle_timeout
+        self.operation_timeout = operation_timeout
+        self.read_timeout = read_timeout
+        self.transport = transport
+        self.server_cert_validation = server_cert_validation
+        self._shells = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._reaper = None
+
+    def get_shell(self, hostname, endpoint, username, password):
+        key = (endpoint, username)
+        while True:
+            with self._lock:
+                key_lock = self._key_locks.setdefault(key, threading.Lock())
+            # Concurrent callers for the same host wait for a single shell
+            with key_lock:
+                with self._lock:
+                    if self._key_locks.get(key) is not key_lock:
+                        # Dropped with its shell while this caller waited
+                        continue
+                    shell = self._shells.get(key)
+                if shell:
+                    shell.touch()
+                    return shell
+                try:
+                    shell = self._open_shell(key, hostname, endpoint, username, password)
+                except Exception:
+                    # Nothing is pooled for the key, so its lock is not kept either
+                    with self._lock:
+                        self._key_locks.pop(key, None)
+                    raise
+                with self._lock:
+                    self._shells[key] = shell
+                self._start_reaper()
+                return shell
+
+    def _open_shell(self, key, hostname, endpoint, username, password):
+        protocol = Protocol(
+            endpoint, transport=self.transport, username=username, password=password,
+            server_cert_validation=self.server_cert_validation,
+            read_timeout_sec=self.read_timeout, operation_timeout_sec=self.operation_timeout
+        )
+        # The same transport Protocol made, but its HTTP connections resolve through the shared cache
+        protocol.transport = _ResolvingTransport(
+            self.resolver, endpoint=endpoint, username=username, password=password,
+            read_timeout_sec=protocol.read_timeout_sec, server_cert_validation=self.server_cert_validation,
+            auth_method=self.transport
+        )
+        timer = self.metrics.timer(hostname, 'WinRM')
+        # The first request also makes the TCP connection and authenticates
+        with timer.phase('channel'):
+            # The server drops the shell after the same idle time we do
+            shell_id = protocol.open_shell(idle_timeout=self.idle_timeout + self.operation_timeout)
+        timer.finish()
+        return PooledShell(key, protocol, shell_id)
+
+    def run(self, hostname, endpoint, username, password, command, on_output=None, deadline=None, cancelled=None):
+        # Returns (exit_status, stdout, stderr); on_output(stream, data) gets chunks as they arrive.
+        # A shell the server has already dropped is replaced once before the command starts.
+        for attempt in (1, 2):
+            shell = self.get_shell(hostname, endpoint, username, password)
+            with shell.lock:
+                try:
+                    command_id = shell.protocol.run_command(shell.shell_id, command)
+                except WINRM_ERRORS:
+                    self.close(shell.key)
+                    if attempt == 2:
+                        raise
+                    continue
+                try:
+                    return self._receive(shell, command_id, on_output, deadline, cancelled)
+                finally:
+                    shell.touch()
+
+    def close(self, key):
+        with self._lock:
+            shell = self._shells.pop(key, None)
+            # The key's lock goes with its shell, unless a caller is opening one
+            key_lock = self._key_locks.get(key)
+            if key_lock and not key_lock.locked():
+                del self._key_locks[key]
+        if shell:
+            try:
+                shell.protocol.close_shell(shell.shell_id)
+            except WINRM_ERRORS:
+                pass
+
+    def close_all(self):
+        self._stopped.set()
+        with self._lock:
+            keys = list(self._shells)
+        for key in keys:
+            self.close(key)
+
+    def evict_idle(self):
+        with self._lock:
+            stale = [key for key, shell in self._shells.items() if shell.is_idle(self.idle_timeout)]
+        for key in stale:
+            self.close(key)
+        return stale
+
+    def _receive(self, shell, command_id, on_output, deadline, cancelled):
+        stdout, stderr = [], []
+        exit_status, done = None, False
+        try:
+            while not done:
+                if cancelled and cancelled.is_set():
+                    raise WinRMError('cancelled')
+                if deadline and time.monotonic() > deadline:
+                    raise WinRMError('timed out')
+                try:
+                    # One Receive request; the public get_command_output loops until the
+                    # command ends, which would leave nothing to stream. Private, hence the
+                    # exact pywinrm pin in requirements.txt.
+                    out, err, exit_status, done = shell.protocol._raw_get_command_output(shell.shell_id, command_id)
+                except WinRMOperationTimeoutError:
+                    # Nothing new within operation_timeout; the command is still running
+                    continue
+                stdout.append(out)
+                stderr.append(err)
+                if on_output:
+                    if out:
+                        on_output('stdout', out)
+                    if err:
+                        on_output('stderr', err)
+        finally:
+            try:
+                shell.protocol.cleanup_command(shell.shell_id, command_id)
+            except WINRM_ERRORS:
+                self.close(shell.key)
+        return exit_status, b''.join(stdout), b''.join(stderr)
+
+    def _start_reaper(self):
+        if self._reaper and self._reaper.is_alive():
+            return
+        self._stopped.clear()
+        self._reaper = threading.Thread(target=self._reap, name='winrm-pool-reaper', daemon=True)
+        self._reaper.start()
+
+    def _reap(self):
+        while not self._stopped.wait(max(1, self.idle_timeout // 2)):
+            self.evict_idle()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_winrm_pool():
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = WinRMShellPool()
+        return _default_pool
+
+
+class WinRMConnectionManager:
+    def __init__(self, hostname, username, password, port=5985, use_ssl=None, pool=None):
+        self.hostname = hostname
+        self.username = username
+        self.password = password
+        self.port = port
+        # 5986 is the HTTPS listener unless told otherwise
+        self.use_ssl = int(port) == 5986 if use_ssl is None else use_ssl
+        self.pool = pool if pool else get_default_winrm_pool()
+
+    @property
+    def endpoint(self):
+        scheme = 'https' if self.use_ssl else 'http'
+        return f'{scheme}://{self.hostname}:{self.port}/wsman'
+
+    def connect(self):
+        # Opens (or reuses) this host's shell
+        try:
+            self.pool.get_shell(self.hostname, self.endpoint, self.username, self.password)
+            return True
+        except WINRM_ERRORS as e:
+            print(f"WinRM connection failed: {e}")
+            return False
+
+    def exec_command(self, command, timeout=None, on_output=None, cancelled=None):
+        deadline = time.monotonic() + timeout if timeout else None
+        return self.pool.run(
+            self.hostname, self.endpoint, self.username, self.password, command,
+            on_output=on_output, deadline=deadline, cancelled=cancelled
+        )
+
+    def close(self):
+        # The shell stays in the pool for the next command to this host
+        pass
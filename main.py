@@ -1,11 +1,17 @@
 # main.py
 
 import sys
-import subprocess
+from importlib import metadata
+
+from utils.startup_profiler import StartupProfiler
 
 REQUIRED_PACKAGES = ['PyQt5==5.15.6', 'paramiko==2.11.0', 'pywinrm==0.4.2']
 
+# Run with --profile-startup to print per-phase and per-import timings once the window is up
+profiler = StartupProfiler(enabled='--profile-startup' in sys.argv)
+
 def install_missing_packages(missing_packages):
+    import subprocess
     try:
         print("Installing required packages...")
         subprocess.check_call([sys.executable, '-m', 'pip', 'install'] + missing_packages)
@@ -16,40 +22,51 @@ def install_missing_packages(missing_packages):
         sys.exit(1)
 
 def check_and_install_packages():
+    # Looks packages up by distribution metadata so nothing gets imported just to be checked
     missing_packages = []
     for package in REQUIRED_PACKAGES:
         package_name = package.split('==')[0]
         try:
-            __import__(package_name)
-        except ImportError:
+            metadata.distribution(package_name)
+        except metadata.PackageNotFoundError:
             missing_packages.append(package)
     if missing_packages:
         print(f"The following packages are missing: {', '.join(missing_packages)}")
         install_missing_packages(missing_packages)
 
 # Check and install packages before importing other modules
-check_and_install_packages()
+with profiler.phase('dependency check'):
+    check_and_install_packages()
 
-from PyQt5.QtWidgets import QApplication
-from gui.main_window import MainWindow
-from gui.license_dialog import LicenseDialog
-from utils.log_manager import LogManager
-from utils.settings_manager import SettingsManager
+with profiler.phase('application imports'):
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+    from gui.main_window import MainWindow
+    from gui.license_dialog import LicenseDialog
+    from utils.log_manager import LogManager
+    from utils.settings_manager import SettingsManager
 
 def main():
     # Initialize the log manager
-    log_manager = LogManager()
+    with profiler.phase('log manager'):
+        log_manager = LogManager()
 
     # Initialize the settings manager
-    settings_manager = SettingsManager()
+    with profiler.phase('settings'):
+        settings_manager = SettingsManager()
 
     # Create the application
-    app = QApplication([])
+    with profiler.phase('QApplication'):
+        app = QApplication([])
 
     # Set application name and icon for macOS dock
     app.setApplicationName("Connection Manager")
     app.setWindowIcon(None)  # You can set an icon file here if you have one
 
+    # Write out any settings still waiting in the write-back window, then drain the log queue
+    app.aboutToQuit.connect(settings_manager.close)
+    app.aboutToQuit.connect(log_manager.close)
+
     # Check if the license has been accepted
     if not settings_manager.get_setting('license_accepted', False):
         license_dialog = LicenseDialog()
@@ -60,8 +77,16 @@ def main():
             return  # Exit the application
 
     # Create and show the main window
-    main_window = MainWindow(log_manager, settings_manager)
-    main_window.show()
+    with profiler.phase('main window'):
+        main_window = MainWindow(log_manager, settings_manager)
+        main_window.show()
+
+    if profiler.enabled:
+        # Fires on the first event loop iteration, once the window has been painted
+        def report_startup():
+            profiler.mark('first event loop iteration (total)')
+            profiler.report()
+        QTimer.singleShot(0, report_startup)
 
     # Start the application event loop
     log_manager.log('info', 'Application started')
@@ -0,0 +1,154 @@
+# tests/test_connections_manager.py
+#
+#   python -m unittest discover tests
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from connections.connections_manager import ConnectionManager
+from connections.records import to_json
+
+
+def tree(manager):
+    # The tree as connections.json would hold it
+    return json.loads(json.dumps(manager.get_all_items(), default=to_json))
+
+
+def names(manager, parent_id=None):
+    return [item['name'] for item in manager.get_children(parent_id)]
+
+
+class ConnectionManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'connections.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def open(self, **options):
+        options.setdefault('compact_threshold', 1000)
+        manager = ConnectionManager(self.path, **options)
+        self.addCleanup(manager.journal.close)
+        return manager
+
+    def populate(self, manager):
+        servers = manager.add_folder('servers')
+        web = manager.add_folder('web', servers['id'])
+        db = manager.add_folder('db', servers['id'])
+        for name in ('web1', 'web2', 'web3'):
+            manager.add_connection({'name': name, 'host': f'{name}.example', 'username': 'deploy',
+                                    'port': 22, 'connection_type': 'SSH', 'tags': ['web']}, web['id'])
+        manager.add_connection({'name': 'db1', 'host': 'db1.example', 'username': 'postgres',
+                                'connection_type': 'SSH'}, db['id'])
+        manager.add_connection({'name': 'jump', 'host': 'jump.example', 'username': 'ops',
+                                'connection_type': 'SSH'})
+        return servers, web, db
+
+    def test_journal_replays_every_change(self):
+        manager = self.open()
+        servers, web, db = self.populate(manager)
+        web1, web2, web3 = manager.get_children(web['id'])
+        manager.update_item(web1['id'], {'port': 2222, 'tags': ['web', 'canary']})
+        manager.move_item(web3['id'], web['id'], 0)
+        manager.move_item(web2['id'], db['id'])
+        manager.remove_item(manager.get_children()[1]['id'])
+        manager.update_item(db['id'], {'name': 'databases'})
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(manager.journal.count, 13)
+
+        reloaded = self.open()
+        self.assertEqual(tree(reloaded), tree(manager))
+        self.assertEqual(reloaded.sequence, manager.sequence)
+        self.assertEqual(names(reloaded, web['id']), ['web3', 'web1'])
+        self.assertEqual(names(reloaded, db['id']), ['db1', 'web2'])
+        self.assertEqual(reloaded.get_item(web1['id'])['port'], 2222)
+        self.assertEqual(list(reloaded.get_item(web1['id'])['tags']), ['web', 'canary'])
+        self.assertEqual(reloaded.get_parent_id(web2['id']), db['id'])
+
+    def test_compaction_writes_snapshot_and_empties_journal(self):
+        manager = self.open(compact_threshold=5)
+        servers, web, db = self.populate(manager)
+        # 8 records with a threshold of 5: compacted once, 3 since
+        self.assertTrue(os.path.exists(self.path))
+        self.assertEqual(manager.journal.count, 3)
+        manager.close()
+        self.assertEqual(os.path.getsize(manager.journal.path), 0)
+        with open(self.path) as f:
+            snapshot = json.load(f)
+        self.assertEqual(snapshot['sequence'], manager.sequence)
+        self.assertEqual(snapshot['connections'], tree(manager))
+
+        reloaded = self.open()
+        self.assertEqual(tree(reloaded), tree(manager))
+        # Changes after a compaction land on top of the snapshot
+        reloaded.move_item(manager.get_children()[1]['id'], db['id'], 0)
+        again = self.open()
+        self.assertEqual(names(again), ['servers'])
+        self.assertEqual(names(again, db['id']), ['jump', 'db1'])
+
+    def test_torn_final_record_is_dropped(self):
+        manager = self.open()
+        self.populate(manager)
+        expected = tree(manager)
+        manager.journal.close()
+        size = os.path.getsize(manager.journal.path)
+        with open(manager.journal.path, 'ab') as f:
+            f.write(b'{"op":"add","parent":null,"item":{"id":"x"')
+
+        reloaded = self.open()
+        self.assertEqual(tree(reloaded), expected)
+        self.assertEqual(os.path.getsize(reloaded.journal.path), size)
+        # And appends after it stay readable
+        reloaded.add_folder('after')
+        self.assertEqual(names(self.open()), ['servers', 'jump', 'after'])
+
+    def test_move_into_own_subtree_is_rejected(self):
+        manager = self.open()
+        servers, web, db = self.populate(manager)
+        nested = manager.add_folder('nested', web['id'])
+        before = tree(manager)
+        sequence, count = manager.sequence, manager.journal.count
+        for parent_id in (servers['id'], web['id'], nested['id']):
+            with self.assertRaises(ValueError):
+                manager.move_item(servers['id'], parent_id)
+        with self.assertRaises(ValueError):
+            manager.move_item(web['id'], manager.get_children(web['id'])[0]['id'])
+        with self.assertRaises(KeyError):
+            manager.move_item('missing', db['id'])
+        self.assertEqual(tree(manager), before)
+        self.assertEqual((manager.sequence, manager.journal.count), (sequence, count))
+
+        # Moving a folder up, or next to itself, is fine
+        manager.move_item(nested['id'])
+        manager.move_item(db['id'], servers['id'], 0)
+        self.assertEqual(names(manager), ['servers', 'jump', 'nested'])
+        self.assertEqual(names(self.open()), ['servers', 'jump', 'nested'])
+        self.assertEqual(names(self.open(), servers['id']), ['db', 'web'])
+
+    def test_other_process_changes_are_picked_up(self):
+        manager = self.open()
+        servers, web, db = self.populate(manager)
+        other = self.open()
+        other.move_item(db['id'])
+        other.update_item(manager.get_children()[1]['id'], {'host': 'bastion.example'})
+
+        changes = manager.external_changes()
+        self.assertEqual([record['op'] for record in changes.records], ['move', 'update'])
+        manager.apply_external(changes)
+        self.assertEqual(tree(manager), tree(other))
+        self.assertIsNone(manager.external_changes())
+
+        # After the other side compacts, the rewritten snapshot is diffed in
+        other.remove_item(web['id'])
+        other.save_connections()
+        manager.apply_external(manager.external_changes())
+        self.assertEqual(tree(manager), tree(other))
+        self.assertEqual(tree(self.open()), tree(other))
+
+
+if __name__ == '__main__':
+    unittest.main()
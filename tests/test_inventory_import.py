@@ -0,0 +1,189 @@
+# tests/test_inventory_import.py
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from connections.inventory_import import (
+    detect_format, parse_ansible_ini, parse_ansible_yaml, parse_csv, parse_ssh_config
+)
+
+
+class InventoryParserTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def by_name(self, entries):
+        return {entry['name']: entry for entry in entries if 'error' not in entry}
+
+    def test_ssh_config_takes_each_option_from_the_first_matching_block(self):
+        extra = self.write('extra.conf', 'Host db1\n    HostName 10.0.0.5\n    User postgres\n')
+        path = self.write('config', f"""
+Host web1 web2
+    HostName %h.prod.example
+    Port 2222
+    ProxyJump bastion
+
+Include {extra}
+
+Host *.internal !legacy.internal
+    User ops
+
+Host legacy.internal app.internal
+    ProxyJump none
+
+Host *
+    User deploy
+    Port 2200
+    IdentityFile ~/.ssh/%h.key
+""")
+        self.assertEqual(detect_format(path), 'ssh_config')
+        hosts = self.by_name(parse_ssh_config(path))
+        self.assertEqual(sorted(hosts), ['app.internal', 'db1', 'legacy.internal', 'web1', 'web2'])
+        web2 = hosts['web2']
+        self.assertEqual((web2['host'], web2['port'], web2['username'], web2['proxy_jump']),
+                         ('web2.prod.example', 2222, 'deploy', 'bastion'))
+        self.assertEqual(web2['key_file'], os.path.expanduser('~/.ssh/web2.key'))
+        self.assertEqual((hosts['db1']['host'], hosts['db1']['username'], hosts['db1']['port']),
+                         ('10.0.0.5', 'postgres', 2200))
+        self.assertEqual((hosts['app.internal']['username'], hosts['app.internal']['proxy_jump']), ('ops', ''))
+        self.assertEqual(hosts['legacy.internal']['username'], 'deploy')
+
+    def test_csv_columns_are_matched_loosely(self):
+        path = self.write('hosts.csv', '\ufeffAlias,Address,User,Protocol,Port,Folder\n'
+                                       'web1,10.0.0.1,deploy,ssh,,emea/web\n'
+                                       'dc1,10.0.0.2,admin,WinRM,,emea\\windows\n'
+                                       ',,,,,\n'
+                                       'bad,10.0.0.3,,ssh,twenty,\n'
+                                       '10.0.0.4\n')
+        self.assertEqual(detect_format(path), 'csv')
+        entries = list(parse_csv(path))
+        hosts = self.by_name(entries)
+        self.assertEqual(sorted(hosts), ['10.0.0.4', 'dc1', 'web1'])
+        self.assertEqual((hosts['web1']['host'], hosts['web1']['port'], hosts['web1']['group']),
+                         ('10.0.0.1', 22, ('emea', 'web')))
+        self.assertEqual((hosts['dc1']['connection_type'], hosts['dc1']['port'], hosts['dc1']['group']),
+                         ('WinRM', 5985, ('emea', 'windows')))
+        self.assertEqual(hosts['10.0.0.4']['host'], '10.0.0.4')
+        self.assertEqual([entry['error'] for entry in entries if 'error' in entry], ["bad: invalid port 'twenty'"])
+
+        headless = self.write('other.csv', 'colour,size\nred,1\n')
+        with self.assertRaises(ValueError):
+            list(parse_csv(headless))
+
+    def test_ansible_ini_groups_ranges_and_vars(self):
+        path = self.write('inventory', """
+jump.example ansible_user=ops
+
+[web]
+web[01:03].example ansible_port=2222
+web-[a:b].example ansible_ssh_common_args='-o ProxyJump=bastion.example'
+
+[windows]
+dc1 ansible_host=10.0.0.9
+
+[emea:children]
+web
+windows
+
+[emea:vars]
+ansible_user=deploy
+
+[windows:vars]
+ansible_connection=winrm
+
+[all:vars]
+ansible_user=root
+""")
+        self.assertEqual(detect_format(path), 'ini')
+        hosts = self.by_name(parse_ansible_ini(path))
+        self.assertEqual(sorted(hosts), ['dc1', 'jump.example', 'web-a.example', 'web-b.example',
+                                         'web01.example', 'web02.example', 'web03.example'])
+        self.assertEqual((hosts['web02.example']['port'], hosts['web02.example']['username'],
+                          hosts['web02.example']['group']), (2222, 'deploy', ('emea', 'web')))
+        self.assertEqual(hosts['web-b.example']['proxy_jump'], 'bastion.example')
+        self.assertEqual((hosts['dc1']['host'], hosts['dc1']['connection_type'], hosts['dc1']['port']),
+                         ('10.0.0.9', 'WinRM', 5985))
+        self.assertEqual((hosts['jump.example']['username'], hosts['jump.example']['group']), ('ops', ()))
+
+    def test_ansible_ini_reports_a_bad_host_line_and_goes_on(self):
+        path = self.write('inventory', '[web]\nweb1 ansible_user="unbalanced\nweb2\n')
+        entries = list(parse_ansible_ini(path))
+        self.assertEqual(len([entry for entry in entries if 'error' in entry]), 1)
+        self.assertEqual(sorted(self.by_name(entries)), ['web2'])
+
+    def test_ansible_yaml_nested_groups_and_vars(self):
+        path = self.write('inventory.yml', """
+all:
+  vars:
+    ansible_user: root
+  children:
+    emea:
+      vars:
+        ansible_user: deploy
+      children:
+        web:
+          hosts:
+            web[1:2].example:
+              ansible_port: 2222
+            web3.example:
+              ansible_ssh_common_args: ['-J', 'bastion.example']
+        windows:
+          vars:
+            ansible_connection: winrm
+          hosts:
+            dc1:
+  hosts:
+    jump.example:
+""")
+        self.assertEqual(detect_format(path), 'yaml')
+        hosts = self.by_name(parse_ansible_yaml(path))
+        self.assertEqual(sorted(hosts), ['dc1', 'jump.example', 'web1.example', 'web2.example', 'web3.example'])
+        self.assertEqual((hosts['web2.example']['port'], hosts['web2.example']['username'],
+                          hosts['web2.example']['group']), (2222, 'deploy', ('emea', 'web')))
+        # A list is not what Ansible expects here, but must not stop the import
+        self.assertEqual(hosts['web3.example']['proxy_jump'], '')
+        self.assertEqual((hosts['dc1']['connection_type'], hosts['dc1']['group']), ('WinRM', ('emea', 'windows')))
+        self.assertEqual((hosts['jump.example']['username'], hosts['jump.example']['group']), ('root', ()))
+
+    def test_ansible_yaml_reports_malformed_parts(self):
+        path = self.write('inventory.yml', """
+web:
+  vars:
+    ansible_user: deploy
+    1: one
+    2.5: half
+  hosts:
+    web1:
+      ansible_port: 2200
+      22: ssh
+    web2: [not, a, mapping]
+    web3:
+db:
+  hosts: db1
+""")
+        entries = list(parse_ansible_yaml(path))
+        errors = [entry['error'] for entry in entries if 'error' in entry]
+        self.assertEqual(len(errors), 4, errors)
+        self.assertIn("vars of group web has names that are not strings: 1, 2.5", errors[0])
+        self.assertIn("vars of host web1 has names that are not strings: 22", errors[1])
+        hosts = self.by_name(entries)
+        self.assertEqual(sorted(hosts), ['web1', 'web3'])
+        self.assertEqual((hosts['web1']['port'], hosts['web1']['username']), (2200, 'deploy'))
+
+        with self.assertRaises(ValueError):
+            list(parse_ansible_yaml(self.write('list.yml', '- web1\n- web2\n')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+# tests/test_port_forwarding.py
+
+import socket
+import threading
+import time
+import unittest
+from unittest import mock
+
+from connections.port_forwarding import ForwardingEngine, parse_forward
+
+
+class EchoChannel:
+    # Stands in for a direct-tcpip channel to a server that echoes what it gets
+    def __init__(self):
+        self.near, self.far = socket.socketpair()
+        self.closed = False
+        threading.Thread(target=self._echo, daemon=True).start()
+
+    def _echo(self):
+        try:
+            while True:
+                data = self.far.recv(65536)
+                if not data:
+                    break
+                self.far.sendall(data)
+            self.far.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+    def fileno(self):
+        return self.near.fileno()
+
+    def setblocking(self, flag):
+        self.near.setblocking(flag)
+
+    def recv(self, size):
+        return self._call(self.near.recv, size)
+
+    def send_ready(self):
+        return True
+
+    def send(self, data):
+        return self._call(self.near.send, data)
+
+    @staticmethod
+    def _call(function, *args):
+        # A non-blocking paramiko channel raises socket.timeout where a socket would block
+        try:
+            return function(*args)
+        except BlockingIOError:
+            raise socket.timeout()
+
+    def shutdown_write(self):
+        self.near.shutdown(socket.SHUT_WR)
+
+    def close(self):
+        self.closed = True
+        self.near.close()
+        self.far.close()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('timed out')
+        time.sleep(0.01)
+
+
+class ParseForwardTest(unittest.TestCase):
+    def test_local_and_remote_specs(self):
+        self.assertEqual(parse_forward('L 8080:intranet:80'),
+                         {'kind': 'L', 'bind_host': 'localhost', 'bind_port': 8080, 'host': 'intranet', 'port': 80})
+        self.assertEqual(parse_forward(' -r 0.0.0.0:9000:localhost:3000 '),
+                         {'kind': 'R', 'bind_host': '0.0.0.0', 'bind_port': 9000, 'host': 'localhost', 'port': 3000})
+        self.assertEqual(parse_forward('L :5432:db:5432')['bind_host'], 'localhost')
+
+    def test_invalid_specs(self):
+        for spec in ('', 'D 1080', 'L 8080:intranet', 'L http:intranet:80', 'L 8080:intranet:http',
+                     'L a:b:8080:intranet:80', '8080:intranet:80'):
+            with self.assertRaises(ValueError, msg=spec):
+                parse_forward(spec)
+
+
+class ForwardingEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = ForwardingEngine()
+        self.addCleanup(self.engine.stop)
+        self.channels = []
+
+    def open_channel(self, destination, origin):
+        channel = EchoChannel()
+        self.channels.append(channel)
+        return channel
+
+    def test_local_forward_relays_both_ways(self):
+        forward = self.engine.add_local(parse_forward('L 127.0.0.1:0:echo:7'), self.open_channel)
+        payload = bytes(range(256)) * 4096
+        with socket.create_connection(('127.0.0.1', forward.bound_port), timeout=5) as client:
+            sender = threading.Thread(target=lambda: (client.sendall(payload), client.shutdown(socket.SHUT_WR)))
+            sender.start()
+            received = bytearray()
+            while True:
+                data = client.recv(65536)
+                if not data:
+                    break
+                received += data
+            sender.join()
+        self.assertEqual(bytes(received), payload)
+        wait_for(lambda: forward.active == 0)
+        self.assertEqual((forward.total, forward.errors, forward.bytes_in, forward.bytes_out),
+                         (1, 0, len(payload), len(payload)))
+        self.assertTrue(self.channels[0].closed)
+
+    def test_failed_tunnel_setup_closes_both_ends(self):
+        forward = self.engine.add_local(parse_forward('L 127.0.0.1:0:echo:7'), self.open_channel)
+        with mock.patch('connections.port_forwarding._Tunnel', side_effect=RuntimeError('no tunnel')):
+            with socket.create_connection(('127.0.0.1', forward.bound_port), timeout=5) as client:
+                # The engine closes its end of the connection, so the client sees EOF
+                self.assertEqual(client.recv(1), b'')
+        wait_for(lambda: self.channels and self.channels[0].closed)
+        self.assertEqual((forward.errors, forward.last_error, forward.active), (1, 'no tunnel', 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+# tests/test_resolver.py
+
+import socket
+import threading
+import unittest
+
+from connections.resolver import Resolver, happy_eyeballs_connect, interleave
+
+V4 = (socket.AF_INET, ('192.0.2.10', 0))
+V6 = (socket.AF_INET6, ('2001:db8::10', 0, 0, 0))
+
+
+class StubLookup:
+    # Answers from a dict; a missing name fails like getaddrinfo does
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+
+    def __call__(self, hostname):
+        self.calls.append(hostname)
+        answer = self.answers[hostname]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+class ResolverTest(unittest.TestCase):
+    def resolver(self, answers, **options):
+        lookup = StubLookup(answers)
+        resolver = Resolver(lookup=lookup, **options)
+        self.addCleanup(resolver._executor.shutdown)
+        return resolver, lookup
+
+    def test_answers_are_cached(self):
+        resolver, lookup = self.resolver({'web1.example': [V4, V6]})
+        self.assertEqual(resolver.resolve('WEB1.example'), [V4, V6])
+        self.assertEqual(resolver.resolve('web1.example'), [V4, V6])
+        self.assertEqual(lookup.calls, ['web1.example'])
+        self.assertEqual((resolver.hits, resolver.misses), (1, 1))
+        resolver.forget('web1.example')
+        resolver.resolve('web1.example')
+        self.assertEqual(len(lookup.calls), 2)
+
+    def test_failures_raise_a_fresh_exception_each_time(self):
+        resolver, lookup = self.resolver({'gone.example': socket.gaierror(socket.EAI_NONAME, 'not known'),
+                                          'empty.example': []})
+        raised = []
+        for _ in range(3):
+            with self.assertRaises(socket.gaierror) as context:
+                resolver.resolve('gone.example')
+            raised.append(context.exception)
+        self.assertEqual(lookup.calls, ['gone.example'])
+        self.assertEqual(len({id(error) for error in raised}), 3)
+        self.assertEqual(raised[-1].args, (socket.EAI_NONAME, 'not known'))
+        depth = []
+        for error in raised:
+            traceback, frames = error.__traceback__, 0
+            while traceback:
+                traceback, frames = traceback.tb_next, frames + 1
+            depth.append(frames)
+        self.assertEqual(depth[1], depth[2])
+        with self.assertRaises(socket.gaierror):
+            resolver.resolve('empty.example')
+
+    def test_lookup_errors_that_are_not_os_errors_become_gaierror(self):
+        resolver, lookup = self.resolver({'a..b': UnicodeError('label empty or too long')})
+        with self.assertRaises(socket.gaierror) as context:
+            resolver.resolve('a..b')
+        self.assertIn('label empty', str(context.exception))
+
+    def test_failed_refresh_keeps_the_last_good_answer(self):
+        resolver, lookup = self.resolver({'web1.example': [V4]}, ttl=0)
+        self.assertEqual(resolver.resolve('web1.example'), [V4])
+        lookup.answers['web1.example'] = socket.gaierror(socket.EAI_AGAIN, 'temporary failure')
+        # Expired, so served stale while a refresh runs; the refresh fails and changes nothing
+        self.assertEqual(resolver.resolve('web1.example'), [V4])
+        resolver._refresh('web1.example').result(5)
+        self.assertEqual(resolver.resolve('web1.example'), [V4])
+        self.assertEqual(resolver.evict_expired(), [])
+
+    def test_interleave_alternates_families(self):
+        other_v4 = (socket.AF_INET, ('192.0.2.11', 0))
+        other_v6 = (socket.AF_INET6, ('2001:db8::11', 0, 0, 0))
+        self.assertEqual(interleave([V6, other_v6, V4, other_v4]), [V6, V4, other_v6, other_v4])
+        self.assertEqual(interleave([V4, V6, other_v6]), [V4, V6, other_v6])
+        self.assertEqual(interleave([]), [])
+
+    def test_connect_returns_a_connected_socket_or_the_error(self):
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen(1)
+        self.addCleanup(server.close)
+        port = server.getsockname()[1]
+        # A port that was just freed has nothing listening and refuses straight away
+        closed = socket.socket()
+        closed.bind(('127.0.0.1', 0))
+        refused = closed.getsockname()[1]
+        closed.close()
+        accepted = []
+        thread = threading.Thread(target=lambda: accepted.append(server.accept()[0]), daemon=True)
+        thread.start()
+        sock = happy_eyeballs_connect([(socket.AF_INET, ('127.0.0.1', 0))], port, timeout=5)
+        sock.close()
+        thread.join(5)
+        accepted[0].close()
+        with self.assertRaises(OSError):
+            happy_eyeballs_connect([(socket.AF_INET, ('127.0.0.1', 0))], refused, timeout=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# tests/test_search_index.py
+
+import unittest
+
+from utils.search_index import SearchIndex
+
+
+def connection(item_id, name, host, username='deploy', tags=()):
+    return {'id': item_id, 'type': 'connection', 'name': name, 'host': host, 'username': username,
+            'tags': list(tags)}
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.items = [connection('1', 'web1', 'web1.prod.example', tags=['nginx']),
+                      connection('2', 'web2', 'web2.prod.example', tags=['nginx']),
+                      connection('3', 'db1', 'db1.prod.example', 'postgres'),
+                      connection('4', 'Jump', 'bastion.example', 'ops')]
+        self.index = self.build()
+
+    def build(self):
+        index = SearchIndex()
+        for item in self.items:
+            index.add(item)
+        return index
+
+    def search(self, query, **options):
+        return sorted(self.index.search(query, **options))
+
+    def test_terms_of_any_length_match_substrings(self):
+        self.assertEqual(self.search('eb1'), ['1'])
+        self.assertEqual(self.search('eb'), ['1', '2'])
+        self.assertEqual(self.search('b1'), ['1', '3'])
+        self.assertEqual(self.search('j'), ['4'])
+        self.assertEqual(self.search('WEB'), ['1', '2'])
+        self.assertEqual(self.search('postgres'), ['3'])
+        self.assertEqual(self.search('nginx 2'), ['2'])
+        self.assertEqual(self.search('zz'), [])
+        self.assertEqual(self.search('  '), [])
+
+    def test_remove_and_rename(self):
+        self.index.remove('2')
+        self.assertNotIn('2', self.index)
+        self.assertEqual(self.search('web'), ['1'])
+        self.index.remove('2')
+        # Adding an indexed id again replaces what was indexed for it
+        self.index.add(connection('1', 'api1', 'api1.prod.example'))
+        self.assertEqual(self.search('web'), [])
+        self.assertEqual(self.search('api'), ['1'])
+        self.assertEqual(self.search('ngi'), [])
+        self.assertEqual(len(self.index), 3)
+        self.index.clear()
+        self.assertEqual(self.search('api'), [])
+
+    def test_typing_narrows_the_previous_matches(self):
+        for query, expected in (('w', ['1', '2']), ('we', ['1', '2']), ('web', ['1', '2']), ('web1', ['1']),
+                                ('web', ['1', '2']), ('e', ['1', '2', '3', '4']), ('e b', ['1', '2', '3', '4']),
+                                ('e b1', ['1', '3']), ('e b1 ', ['1', '3']), ('e b1 pg', [])):
+            self.assertEqual(self.search(query), expected, query)
+            # The same as searching from scratch
+            self.assertEqual(sorted(self.build().search(query)), expected, query)
+
+    def test_index_changes_reset_narrowing(self):
+        self.assertEqual(self.search('web'), ['1', '2'])
+        self.index.add(connection('5', 'web5', 'web5.prod.example'))
+        self.assertEqual(self.search('web'), ['1', '2', '5'])
+        self.assertEqual(self.search('web5'), ['5'])
+
+    def test_truncation_is_reported(self):
+        self.index.search('web', limit=1)
+        self.assertTrue(self.index.truncated)
+        self.index.search('web', limit=2)
+        self.assertFalse(self.index.truncated)
+        # Past rank_limit candidates are not ranked, only cut at limit
+        index = SearchIndex(rank_limit=10)
+        for number in range(30):
+            index.add(connection(str(number), f'host{number}', f'host{number}.example'))
+        self.assertEqual(len(index.search('host', limit=20)), 20)
+        self.assertTrue(index.truncated)
+        self.assertEqual(len(index.search('host2', limit=20)), 11)
+        self.assertFalse(index.truncated)
+
+
+if __name__ == '__main__':
+    unittest.main()
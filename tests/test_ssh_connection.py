@@ -0,0 +1,29 @@
+# tests/test_ssh_connection.py
+
+import unittest
+
+from connections.ssh_connection import parse_jump_hosts
+
+
+def hop(hostname, port=22, username=None):
+    return {'hostname': hostname, 'port': port, 'username': username}
+
+
+class ParseJumpHostsTest(unittest.TestCase):
+    def test_hops_in_order(self):
+        self.assertEqual(parse_jump_hosts('ops@bastion.example:2222, inner.example ,admin@10.0.0.5'),
+                         [hop('bastion.example', 2222, 'ops'), hop('inner.example'), hop('10.0.0.5', 22, 'admin')])
+
+    def test_ipv6_addresses(self):
+        self.assertEqual(parse_jump_hosts('[2001:db8::1]:2200,ops@[fe80::1],fe80::2'),
+                         [hop('2001:db8::1', 2200), hop('fe80::1', 22, 'ops'), hop('fe80::2')])
+
+    def test_empty_and_odd_parts(self):
+        self.assertEqual(parse_jump_hosts(None), [])
+        self.assertEqual(parse_jump_hosts(' , '), [])
+        # The last @ separates the user; a port that is not a number is ignored
+        self.assertEqual(parse_jump_hosts('me@corp@bastion:ssh'), [hop('bastion', 22, 'me@corp')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+# tests/test_transcript_store.py
+
+import shutil
+import tempfile
+import unittest
+
+from utils.transcript_store import TOKEN_LENGTH, TranscriptStore, tokenize
+
+
+class TranscriptStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = TranscriptStore(self.directory)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def record(self, *lines):
+        writer = self.store.open_session('web1', 'web1.example', 'SSH')
+        for line in lines:
+            writer.write(line + '\r\n')
+        writer.close()
+        # Flushes the writer thread
+        self.store.close()
+
+    def lines(self, query):
+        return [match.line for match in self.store.search(query)]
+
+    def test_long_runs_are_found_whole_and_in_part(self):
+        digest = 'a' * 40 + 'b' * 40
+        path = '/var/lib/' + '/'.join(f'dir{index:02}' for index in range(30)) + '/config.yaml'
+        self.record(f'sha {digest} done', f'open {path}', 'unrelated output')
+        self.assertEqual(self.lines(digest), [f'sha {digest} done'])
+        self.assertEqual(self.lines('b' * 30), [f'sha {digest} done'])
+        self.assertEqual(self.lines('a' * 35 + 'b' * 5), [f'sha {digest} done'])
+        self.assertEqual(self.lines(path), [f'open {path}'])
+        self.assertEqual(self.lines('dir14/dir15/dir16'), [f'open {path}'])
+        self.assertEqual(self.lines('b' * 41), [])
+
+    def test_terms_match_inside_tokens(self):
+        self.record('Accepted publickey for deploy', 'sshd[812]: session opened', 'ok')
+        self.assertEqual(self.lines('ssh'), ['sshd[812]: session opened'])
+        self.assertEqual(self.lines('PUBLICKEY deploy'), ['Accepted publickey for deploy'])
+        self.assertEqual(self.lines('session closed'), [])
+
+    def test_long_runs_index_as_overlapping_windows(self):
+        run = ''.join(chr(ord('a') + index % 26) for index in range(150))
+        tokens = tokenize(f'x {run} yz')
+        self.assertIn('yz', tokens)
+        windows = [token for token in tokens if len(token) == TOKEN_LENGTH]
+        self.assertTrue(all(window in run for window in windows))
+        # Every substring up to half a window long is inside one window
+        for start in range(len(run) - 33):
+            self.assertTrue(any(run[start:start + 33] in window for window in windows), start)
+
+
+if __name__ == '__main__':
+    unittest.main()
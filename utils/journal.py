@@ -0,0 +1,80 @@
+# utils/journal.py
+
+import hashlib
+import json
+import os
+
+def read_records(data):
+    # Records in journal bytes read elsewhere; stops at a torn or partly synced final record
+    for line in data.splitlines(keepends=True):
+        if not line.endswith(b'\n'):
+            return
+        try:
+            yield json.loads(line)
+        except ValueError:
+            return
+
+class Journal:
+    # Append-only JSON-lines log; each append costs one small write and fsync
+    def __init__(self, path, default=None):
+        # default is passed to json.dumps for values it cannot serialize itself
+        self.path = path
+        self.default = default
+        self.count = 0
+        # SHA-1 of the journal bytes this process has read or written, so a file
+        # replaced by a sync tool can be checked for still starting with them
+        self.digest = hashlib.sha1()
+        self._file = None
+
+    def replay(self):
+        self.count = 0
+        self.digest = hashlib.sha1()
+        if not os.path.exists(self.path):
+            return
+        good_offset = 0
+        torn = False
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('incomplete record')
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn final record from a crash mid-append; everything before it is intact
+                    torn = True
+                    break
+                good_offset += len(line)
+                self.digest.update(line)
+                self.count += 1
+                yield record
+        if torn:
+            os.truncate(self.path, good_offset)
+
+    def append(self, record, sync=True):
+        if self._file is None:
+            self._file = open(self.path, 'ab')
+        data = json.dumps(record, separators=(',', ':'), default=self.default).encode('utf-8') + b'\n'
+        self._file.write(data)
+        self._file.flush()
+        self.digest.update(data)
+        if sync:
+            os.fsync(self._file.fileno())
+        self.count += 1
+
+    def sync(self):
+        # Makes appends written with sync=False durable in one fsync
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def truncate(self):
+        self.close()
+        with open(self.path, 'wb') as f:
+            os.fsync(f.fileno())
+        self.count = 0
+        self.digest = hashlib.sha1()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
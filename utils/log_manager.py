@@ -1,24 +1,83 @@
+# utils/log_manager.py
+
+import atexit
+import gzip
+import json
 import logging
-from logging.handlers import TimedRotatingFileHandler
 import os
+import queue
+import shutil
+import time
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+LOGGER_NAME = "ConnectionManager"
+
+# One listener per process, shared by every LogManager; the logger is global too
+_listener = None
+_queue = None
+
+class JsonFormatter(logging.Formatter):
+    # One JSON object per line; per-connection fields (host, protocol, duration, ...) sit at the top level
+    def format(self, record):
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+def gzip_namer(name):
+    return name + '.gz'
+
+def gzip_rotator(source, destination):
+    # Runs on the listener thread, so compressing never blocks a caller of log()
+    with open(source, 'rb') as f_in, gzip.open(destination, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
 
 class LogManager:
     def __init__(self, log_file='logs/app.log', when="D", interval=1, backup_count=7):
-        if not os.path.exists('logs'):
-            os.makedirs('logs')
-        self.logger = logging.getLogger("ConnectionManager")
+        global _listener, _queue
+        log_dir = os.path.dirname(log_file)
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+        self.logger = logging.getLogger(LOGGER_NAME)
         self.logger.setLevel(logging.DEBUG)
-        handler = TimedRotatingFileHandler(
-            log_file, when=when, interval=interval, backupCount=backup_count
-        )
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
-        self.logger.addHandler(handler)
-
-    def log(self, level, message):
-        if level == 'info':
-            self.logger.info(message)
-        elif level == 'error':
-            self.logger.error(message)
-        else:
-            self.logger.debug(message)
+        self.logger.propagate = False
+
+        if _listener is None:
+            # Callers only enqueue; a single background thread formats and writes
+            handler = TimedRotatingFileHandler(
+                log_file, when=when, interval=interval, backupCount=backup_count, encoding='utf-8'
+            )
+            handler.setFormatter(JsonFormatter())
+            handler.namer = gzip_namer
+            handler.rotator = gzip_rotator
+            _queue = queue.SimpleQueue()
+            _listener = QueueListener(_queue, handler, respect_handler_level=True)
+            _listener.start()
+            self.logger.addHandler(QueueHandler(_queue))
+            atexit.register(self.close)
+
+    def log(self, level, message, **fields):
+        # Accepts any standard level name ('warning', 'critical', ...); unknown names log as debug
+        log_level = getattr(logging, str(level).upper(), None)
+        if not isinstance(log_level, int):
+            log_level = logging.DEBUG
+        self.logger.log(log_level, message, extra={'fields': fields})
+
+    def close(self):
+        # Writes out whatever is still queued and stops the listener thread
+        global _listener
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            self.logger.handlers = [h for h in self.logger.handlers if not isinstance(h, QueueHandler)]
+            _listener = None
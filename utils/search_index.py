@@ -0,0 +1,160 @@
+# utils/search_index.py
+
+import heapq
+from collections import defaultdict
+
+class SearchIndex:
+    # Every term matches substrings of the indexed fields. Terms of three or more
+    # characters go through a trigram index and are verified against the text;
+    # shorter ones are checked against the text of the candidates directly.
+    def __init__(self, fields=('name', 'host', 'username', 'tags'), rank_limit=5000):
+        self.fields = fields
+        self.rank_limit = rank_limit
+        self.texts = {}
+        self.names = {}
+        self.trigrams = defaultdict(set)
+        # Whether the last search had more matches than it returned
+        self.truncated = False
+        self._last_query = ''
+        self._last_matches = None
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __contains__(self, item_id):
+        return item_id in self.texts
+
+    def add(self, item):
+        item_id = item['id']
+        if item_id in self.texts:
+            self.remove(item_id)
+        values = []
+        for field in self.fields:
+            value = item.get(field)
+            if isinstance(value, (list, tuple)):
+                values.extend(str(v) for v in value)
+            elif value:
+                values.append(str(value))
+        text = '\x00'.join(values).lower()
+        name = str(item.get('name', '')).lower()
+        self.texts[item_id] = text
+        self.names[item_id] = name
+        trigrams = self.trigrams
+        for trigram in self._trigrams(text):
+            trigrams[trigram].add(item_id)
+        self._invalidate()
+
+    def remove(self, item_id):
+        text = self.texts.pop(item_id, None)
+        if text is None:
+            return
+        self.names.pop(item_id)
+        for trigram in self._trigrams(text):
+            self._discard(self.trigrams, trigram, item_id)
+        self._invalidate()
+
+    def clear(self):
+        self.texts.clear()
+        self.names.clear()
+        self.trigrams.clear()
+        self._invalidate()
+
+    def search(self, query, limit=500):
+        query = query.lower()
+        terms = query.split()
+        self.truncated = False
+        if not terms:
+            self._invalidate()
+            return []
+        if self._can_narrow(query):
+            # Earlier terms are unchanged and the previous matches already satisfy
+            # the old last term, so only its newly added trigrams need intersecting
+            previous_terms = self._last_query.split()
+            candidates = self._candidates(
+                terms[len(previous_terms) - 1:], self._last_matches, previous_terms[-1]
+            )
+        else:
+            candidates = self._candidates(terms)
+        self._last_query, self._last_matches = query, candidates
+        return self._rank(candidates, terms, limit)
+
+    def _candidates(self, terms, within=None, satisfied=None):
+        # Set intersections for the trigram terms; trigram hits for terms longer than
+        # three characters are a superset and get verified lazily while ranking. Short
+        # terms then filter what is left, or every text if nothing narrowed it first.
+        candidates = within
+        known = self._trigrams(satisfied) if satisfied else set()
+        short = [term for term in set(terms) if len(term) < 3 and term != satisfied]
+        for term in sorted({term for term in terms if len(term) >= 3}, key=len):
+            keys = self._trigrams(term) - known
+            postings = sorted((self.trigrams.get(key, set()) for key in keys), key=len)
+            for posting in postings:
+                candidates = set(posting) if candidates is None else candidates & posting
+                if not candidates:
+                    return set()
+        texts = self.texts
+        for term in short:
+            if candidates is None or len(candidates) * 4 > len(texts):
+                # Scanning every text beats looking up most of them one by one
+                matching = {item_id for item_id, text in texts.items() if term in text}
+                candidates = matching if candidates is None else candidates & matching
+            else:
+                candidates = {item_id for item_id in candidates if term in texts[item_id]}
+        return candidates
+
+    def _rank(self, candidates, terms, limit):
+        long_terms = [term for term in terms if len(term) > 3]
+        texts = self.texts
+
+        def verified(item_id):
+            text = texts[item_id]
+            return all(term in text for term in long_terms)
+
+        if len(candidates) > self.rank_limit:
+            # Too broad to score usefully; any page of matches will do until the query narrows
+            results = []
+            for item_id in candidates:
+                if verified(item_id):
+                    if len(results) >= limit:
+                        self.truncated = True
+                        break
+                    results.append(item_id)
+            return sorted(results, key=self.names.get)
+
+        first = terms[0]
+        whole = ' '.join(terms)
+        names = self.names
+
+        def rank(item_id):
+            name = names[item_id]
+            if name == whole:
+                return 0, name
+            if name.startswith(first):
+                return 1, name
+            if first in name:
+                return 2, name
+            return 3, name
+
+        matches = [item_id for item_id in candidates if verified(item_id)] if long_terms else candidates
+        self.truncated = len(matches) > limit
+        return heapq.nsmallest(limit, matches, key=rank)
+
+    def _can_narrow(self, query):
+        previous = self._last_query
+        # Every term is a substring match, so a longer term or an extra one only narrows
+        return self._last_matches is not None and bool(previous.strip()) and query.startswith(previous)
+
+    def _invalidate(self):
+        self._last_query, self._last_matches = '', None
+
+    @staticmethod
+    def _trigrams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    @staticmethod
+    def _discard(postings, key, item_id):
+        bucket = postings.get(key)
+        if bucket is not None:
+            bucket.discard(item_id)
+            if not bucket:
+                del postings[key]
@@ -1,36 +1,106 @@
 # utils/settings_manager.py
 
+import atexit
 import json
 import os
+import threading
+from contextlib import contextmanager
+
+from utils.file_utils import atomic_write
 
 class SettingsManager:
-    def __init__(self, settings_file='app_settings.json'):
+    def __init__(self, settings_file='app_settings.json', write_back=True, debounce=0.5):
         self.settings_file = settings_file
         self.settings = {}
+        # With write_back, updates only mark the settings dirty and a background
+        # thread writes them out once per debounce window
+        self.write_back = write_back
+        self.debounce = debounce
+        self.dirty = False
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._batch_depth = 0
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._flusher = None
         self.load_settings()
+        atexit.register(self.close)
 
     def load_settings(self):
         if os.path.exists(self.settings_file):
             with open(self.settings_file, 'r') as f:
                 self.settings = json.load(f)
+            # Connections live in connections.json; older settings files carried
+            # unused copies of the tree, dropped on the next save
+            for key in ('connections', 'folders'):
+                if self.settings.pop(key, None) is not None:
+                    self.dirty = True
         else:
             self.settings = {
-                'connections': [],
-                'folders': [],
                 'background_color': '#000000',
                 'font_color': '#00FF00',
                 'license_accepted': False  # Add default license status
             }
 
     def save_settings(self):
-        with open(self.settings_file, 'w') as f:
-            json.dump(self.settings, f, indent=4)
+        # The snapshot is taken inside the write lock, so writes land in the order
+        # their snapshots were taken and an older one can never replace a newer one
+        with self._write_lock:
+            with self._lock:
+                data = json.dumps(self.settings, indent=4)
+                self.dirty = False
+            atomic_write(self.settings_file, data)
+
+    def flush(self):
+        if self.dirty:
+            self.save_settings()
+
+    def close(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._flusher and self._flusher is not threading.current_thread():
+            self._flusher.join()
+        self.flush()
 
     def update_setting(self, key, value):
-        self.settings[key] = value
-        self.save_settings()
+        with self._lock:
+            self.settings[key] = value
+            self.dirty = True
+            if self._batch_depth:
+                return
+        self._schedule_save()
 
     def get_setting(self, key, default=None):
         return self.settings.get(key, default)
 
-    # Existing methods for managing connections and folders...
+    @contextmanager
+    def batch(self):
+        # Updates made inside the block are saved together once it exits
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                pending = self.dirty and not self._batch_depth
+            if pending:
+                self._schedule_save()
+
+    def _schedule_save(self):
+        if not self.write_back or self._stopped.is_set():
+            self.save_settings()
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run_flusher, name='settings-flusher', daemon=True)
+                self._flusher.start()
+        self._wakeup.set()
+
+    def _run_flusher(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+            # Everything updated during the window goes out in the same write
+            self._stopped.wait(self.debounce)
+            self.flush()
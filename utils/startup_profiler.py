@@ -0,0 +1,110 @@
+# utils/startup_profiler.py
+
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from importlib.abc import MetaPathFinder
+
+class _TimedLoader:
+    def __init__(self, loader, name, profiler):
+        self._loader = loader
+        self._name = name
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler.import_started(self._name)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler.import_finished(self._name)
+
+    def __getattr__(self, name):
+        # Resource readers, get_data and friends go straight to the real loader
+        return getattr(self._loader, name)
+
+class _ImportTimer(MetaPathFinder):
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _TimedLoader(spec.loader, fullname, self.profiler)
+        return spec
+
+class StartupProfiler:
+    # Records wall time per startup phase and per imported module (inclusive and self time)
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.phases = []
+        self.imports = {}
+        # Background threads import while the main thread does; each nests its own imports
+        self._local = threading.local()
+        self._finder = None
+        if enabled:
+            self._finder = _ImportTimer(self)
+            sys.meta_path.insert(0, self._finder)
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def mark(self, name):
+        # A point in time measured from process start rather than a timed block
+        if self.enabled:
+            self.phases.append((name, time.perf_counter() - self.started))
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def import_started(self, name):
+        self._stack().append([name, time.perf_counter(), 0.0])
+
+    def import_finished(self, name):
+        stack = self._stack()
+        _, start, children = stack.pop()
+        elapsed = time.perf_counter() - start
+        if stack:
+            stack[-1][2] += elapsed
+        self.imports[name] = (elapsed, elapsed - children)
+
+    def stop(self):
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+
+    def report(self, top=25, stream=None):
+        if not self.enabled:
+            return
+        self.stop()
+        stream = stream or sys.stderr
+        print("Startup phases:", file=stream)
+        for name, elapsed in self.phases:
+            print(f"  {elapsed * 1000:9.1f} ms  {name}", file=stream)
+        total_self = sum(own for _, own in self.imports.values())
+        print(f"Imports: {len(self.imports)} modules, {total_self * 1000:.1f} ms", file=stream)
+        print(f"  {'cumulative':>12}  {'self':>9}  module", file=stream)
+        slowest = sorted(self.imports.items(), key=lambda entry: entry[1][0], reverse=True)[:top]
+        for name, (cumulative, own) in slowest:
+            print(f"  {cumulative * 1000:9.1f} ms  {own * 1000:6.1f} ms  {name}", file=stream)
@@ -0,0 +1,319 @@
+# utils/transcript_store.py
+
+import json
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+
+TOKEN = re.compile(r'[a-z0-9_][a-z0-9_.:/@-]*[a-z0-9_]')
+# The parts of a search term that can only occur inside a single run of token characters
+TERM_PIECE = re.compile(r'[a-z0-9_](?:[a-z0-9_.:/@-]*[a-z0-9_])?')
+TOKEN_LENGTH = 64
+# Longer runs (hashes, base64, long paths) are indexed as windows of TOKEN_LENGTH
+# overlapping by half, so any piece up to PIECE_LENGTH lies inside one of them
+WINDOW_STEP = TOKEN_LENGTH // 2
+PIECE_LENGTH = TOKEN_LENGTH - WINDOW_STEP + 1
+ESCAPE_SEQUENCE = re.compile(r'\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)|\x1b[@-Z\\-_]')
+
+def tokenize(text):
+    tokens = set()
+    for run in TOKEN.findall(text.lower()):
+        if len(run) <= TOKEN_LENGTH:
+            tokens.add(run)
+        else:
+            tokens.update(run[start:start + TOKEN_LENGTH] for start in range(0, len(run) - TOKEN_LENGTH, WINDOW_STEP))
+            tokens.add(run[-TOKEN_LENGTH:])
+    return tokens
+
+def term_pieces(term):
+    # What a term's pieces narrow the search by: each must be inside some token of a
+    # chunk holding the term. Pieces longer than PIECE_LENGTH may span windows, so
+    # their first and last PIECE_LENGTH characters stand in for them.
+    for piece in TERM_PIECE.findall(term):
+        if len(piece) > PIECE_LENGTH:
+            yield piece[:PIECE_LENGTH]
+            yield piece[-PIECE_LENGTH:]
+        elif len(piece) >= 2:
+            yield piece
+
+def clean_text(data):
+    return ESCAPE_SEQUENCE.sub('', data.decode('utf-8', 'replace')).replace('\r', '')
+
+
+class TranscriptMatch:
+    def __init__(self, session, chunk, line_number, line):
+        self.session = session
+        self.chunk = chunk
+        self.line_number = line_number
+        self.line = line
+
+    def describe(self):
+        started = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.chunk['start']))
+        name = self.session['name']
+        if self.session['host']:
+            name += f" ({self.session['host']})"
+        return f"{started}  {name}: {self.line.strip()}"
+
+
+class TranscriptWriter:
+    # Handed to whatever produces session output; write() only enqueues
+    def __init__(self, store, session):
+        self.store = store
+        self.session = session
+        self.closed = False
+
+    def write(self, data):
+        if data and not self.closed:
+            if isinstance(data, str):
+                data = data.encode('utf-8')
+            self.store._queue.put((self, data, time.time()))
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.store._queue.put((self, None, time.time()))
+
+
+class TranscriptStore:
+    # Session output is kept as independently zlib-compressed chunks, one file per
+    # session under a per-day directory:
+    #   <session>.chunks  - concatenated compressed chunks
+    #   <session>.index   - JSON lines: session metadata, then one entry per chunk
+    #                       with its offset, length and first/last timestamps
+    #   postings.jsonl    - per day, the distinct tokens of every chunk
+    # Searches intersect the postings of the query terms and only decompress the
+    # chunks that may contain all of them.
+    def __init__(self, root='logs/transcripts', chunk_bytes=256 * 1024, flush_interval=5.0):
+        self.root = root
+        self.chunk_bytes = chunk_bytes
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._open = {}
+        self._postings = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def open_session(self, name, host='', protocol=''):
+        started = time.time()
+        day = time.strftime('%Y-%m-%d', time.localtime(started))
+        session = {
+            'id': uuid.uuid4().hex,
+            'name': name,
+            'host': host,
+            'protocol': protocol,
+            'started': started,
+            'day': day,
+        }
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._write_loop, name='transcripts', daemon=True)
+                self._thread.start()
+        return TranscriptWriter(self, session)
+
+    def close(self):
+        # Flushes every open session and stops the writer thread
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread:
+            self._queue.put(None)
+            thread.join()
+
+    def _session_path(self, session, extension):
+        return os.path.join(self.root, session['day'], f"{session['id']}.{extension}")
+
+    def _write_loop(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = False
+            if item is None:
+                for state in list(self._open.values()):
+                    self._write_chunk(state, final=True)
+                self._open.clear()
+                return
+            if item is False:
+                # Idle: push out partially filled chunks so a crash loses at most flush_interval
+                now = time.time()
+                for state in self._open.values():
+                    if state['buffer'] and now - state['last'] >= self.flush_interval:
+                        self._write_chunk(state, final=True)
+                continue
+            writer, data, timestamp = item
+            state = self._open.get(writer.session['id'])
+            if state is None:
+                if data is None:
+                    continue
+                state = self._start_session(writer.session)
+            if data is None:
+                self._write_chunk(state, final=True)
+                del self._open[writer.session['id']]
+                continue
+            if not state['buffer']:
+                state['first'] = timestamp
+            state['buffer'] += data
+            state['last'] = timestamp
+            # Where each write ends, so a chunk cut mid-buffer gets its own first/last times
+            state['marks'].append((state['cut'] + len(state['buffer']), timestamp))
+            while len(state['buffer']) >= self.chunk_bytes:
+                self._write_chunk(state)
+
+    def _start_session(self, session):
+        os.makedirs(os.path.join(self.root, session['day']), exist_ok=True)
+        with open(self._session_path(session, 'index'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(session) + '\n')
+        state = {'session': session, 'buffer': b'', 'chunk': 0, 'offset': 0, 'first': 0.0, 'last': 0.0,
+                 'marks': deque(), 'cut': 0}
+        self._open[session['id']] = state
+        return state
+
+    def _write_chunk(self, state, final=False):
+        buffer = state['buffer']
+        if not buffer:
+            return
+        size = len(buffer)
+        if not final:
+            # Cut at a line break when there is one, so lines are not split across chunks
+            size = min(size, self.chunk_bytes)
+            newline = buffer.rfind(b'\n', 0, size)
+            if newline > 0:
+                size = newline + 1
+        data, state['buffer'] = buffer[:size], buffer[size:]
+        first, state['cut'] = state['first'], state['cut'] + size
+        marks = state['marks']
+        while marks and marks[0][0] < state['cut']:
+            marks.popleft()
+        # The write holding the chunk's last byte
+        last = marks[0][1] if marks else state['last']
+        if marks and marks[0][0] == state['cut']:
+            marks.popleft()
+        if state['buffer']:
+            # The rest starts in the first write not wholly in this chunk
+            state['first'] = marks[0][1]
+        session = state['session']
+        compressed = zlib.compress(data, 6)
+        with open(self._session_path(session, 'chunks'), 'ab') as f:
+            f.write(compressed)
+        entry = {
+            'chunk': state['chunk'],
+            'offset': state['offset'],
+            'length': len(compressed),
+            'bytes': len(data),
+            'start': first,
+            'end': last,
+        }
+        with open(self._session_path(session, 'index'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+        with open(os.path.join(self.root, session['day'], 'postings.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'s': session['id'], 'c': state['chunk'], 't': sorted(tokenize(clean_text(data)))}) + '\n')
+        state['chunk'] += 1
+        state['offset'] += len(compressed)
+
+    def days(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted((d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d))), reverse=True)
+
+    def load_session(self, day, session_id):
+        # Returns the session metadata and its chunk entries
+        session, chunks = None, []
+        with open(os.path.join(self.root, day, f"{session_id}.index"), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash; the chunk it described is ignored
+                    break
+                if session is None:
+                    session = record
+                else:
+                    chunks.append(record)
+        return session, chunks
+
+    def read_chunk(self, session, chunk):
+        with open(self._session_path(session, 'chunks'), 'rb') as f:
+            f.seek(chunk['offset'])
+            return clean_text(zlib.decompress(f.read(chunk['length'])))
+
+    def _day_postings(self, day):
+        # The inverted index of a day is built once and then extended from where
+        # the postings file was last read. Alongside token -> chunks it keeps
+        # trigram -> tokens, to find the tokens a term is part of.
+        path = os.path.join(self.root, day, 'postings.jsonl')
+        postings = self._postings.setdefault(day, {'position': 0, 'tokens': {}, 'grams': {}, 'chunks': set()})
+        if not os.path.exists(path) or os.path.getsize(path) == postings['position']:
+            return postings
+        tokens, grams = postings['tokens'], postings['grams']
+        with open(path, 'rb') as f:
+            f.seek(postings['position'])
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                postings['position'] += len(line)
+                record = json.loads(line)
+                key = (record['s'], record['c'])
+                postings['chunks'].add(key)
+                for token in record['t']:
+                    keys = tokens.get(token)
+                    if keys is None:
+                        keys = tokens[token] = set()
+                        for index in range(len(token) - 2):
+                            grams.setdefault(token[index:index + 3], set()).add(token)
+                    keys.add(key)
+        return postings
+
+    def _chunks_containing(self, postings, piece):
+        # Chunks with a token that contains piece; lines are matched by substring,
+        # so "ssh" has to find the chunks that only have "sshd" too
+        tokens = postings['tokens']
+        if len(piece) < 3:
+            names = [token for token in tokens if piece in token]
+        else:
+            sets = sorted((postings['grams'].get(piece[index:index + 3], ()) for index in range(len(piece) - 2)),
+                          key=len)
+            names = [token for token in sets[0] if piece in token and all(token in other for other in sets[1:])]
+        keys = set()
+        for token in names:
+            keys |= tokens[token]
+        return keys
+
+    def search(self, query, days=None, limit=200):
+        terms = [term for term in query.lower().split() if term]
+        if not terms:
+            return []
+        matches = []
+        # Single characters and other punctuation are not indexed, so a term made only
+        # of those narrows nothing
+        pieces = {piece for term in terms for piece in term_pieces(term)}
+        for day in (days or self.days()):
+            postings = self._day_postings(day)
+            candidates = None
+            for piece in sorted(pieces, key=len, reverse=True):
+                keys = self._chunks_containing(postings, piece)
+                candidates = keys if candidates is None else candidates & keys
+                if not candidates:
+                    break
+            if candidates is None:
+                candidates = postings['chunks']
+            if not candidates:
+                continue
+            sessions = {}
+            for session_id, chunk_number in sorted(candidates):
+                if session_id not in sessions:
+                    sessions[session_id] = self.load_session(day, session_id)
+                session, chunks = sessions[session_id]
+                if chunk_number >= len(chunks):
+                    continue
+                chunk = chunks[chunk_number]
+                for line_number, line in enumerate(self.read_chunk(session, chunk).split('\n')):
+                    lowered = line.lower()
+                    if all(term in lowered for term in terms):
+                        matches.append(TranscriptMatch(session, chunk, line_number, line))
+                        if len(matches) >= limit:
+                            return matches
+        return matches